@@ -1,12 +1,25 @@
+import time
+
+# Début du rendu de la page (mesure du temps de réexécution du script)
+RENDER_START = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 import json
 import os
 from pathlib import Path
-import time
 import shutil
-from logic.receipt_analyzer import ReceiptAnalyzer
-from logic.receipt_matcher import ReceiptMatcher
+import uuid
+from collections import deque
+from logic.extraction_cache import ExtractionCache
+from logic.receipt_store import ReceiptStore
+from logic.job_runner import Job, JobRunner
+from logic.upload_store import UploadStore
+from logic.telemetry import Telemetry
+from logic.log_buffer import ERROR, INFO, LEVEL_ICONS, LEVELS, LogBuffer
+from logic.pipeline import analyze_receipts, detect_duplicates, ingest_receipts, match_receipts, sweep_parameters
+from logic.workspace import Workspace, WorkspaceCleaner
+from config import Config
+from utils import Utils
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -68,32 +81,71 @@ if 'receipts_analyzed' not in st.session_state:
     st.session_state.receipts_analyzed = False
 if 'matching_completed' not in st.session_state:
     st.session_state.matching_completed = False
-if 'matching_results' not in st.session_state:
-    st.session_state.matching_results = None
-if 'analysis_log' not in st.session_state:
-    st.session_state.analysis_log = []
-if 'matching_log' not in st.session_state:
-    st.session_state.matching_log = []
-
-# Fonction pour créer les dossiers nécessaires
-def ensure_directories():
-    directories = ["uploads/receipts", "uploads/bank_statements", "uploads/prompts", "output/receipts", "output/matching"]
-    for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
-    
+if 'matching_json_path' not in st.session_state:
+    st.session_state.matching_json_path = None
+if 'workspace_id' not in st.session_state:
+    st.session_state.workspace_id = uuid.uuid4().hex
+if 'workspace_root' not in st.session_state:
+    st.session_state.workspace_root = None
+if 'log_buffer' not in st.session_state:
+    session_logs_dir = Workspace.for_session(st.session_state.workspace_id).logs_dir
+    st.session_state.log_buffer = LogBuffer(spill_path=str(session_logs_dir / "session.jsonl"))
+if 'upload_hashes' not in st.session_state:
+    st.session_state.upload_hashes = {}
+if 'receipt_duplicates' not in st.session_state:
+    st.session_state.receipt_duplicates = {}
+if 'first_render_seconds' not in st.session_state:
+    st.session_state.first_render_seconds = None
+if 'rerun_seconds' not in st.session_state:
+    st.session_state.rerun_seconds = deque(maxlen=Config.RENDER_TIMINGS_LIMIT)
+
+# Nettoyage des workspaces de session inactifs, partagé par toutes les sessions du serveur
+@st.cache_resource
+def get_workspace_cleaner():
+    return WorkspaceCleaner().start()
+
+# Workspace de la session : privé, ou partagé si un nom de projet est saisi
+def get_workspace():
+    project = st.session_state.get("project_name", "").strip()
+    if project:
+        return Workspace.for_project(project)
+    return Workspace.for_session(st.session_state.workspace_id)
+
+# Fonction pour reprendre l'état d'un workspace lorsque la session en change
+def switch_workspace(workspace):
+    if st.session_state.workspace_root == str(workspace.root):
+        return
+    st.session_state.workspace_root = str(workspace.root)
+    workspace.ensure()
+    st.session_state.receipts_uploaded = any(item.is_file() for item in workspace.receipts_dir.iterdir())
+    st.session_state.bank_statements_uploaded = any(item.is_file() for item in workspace.bank_statements_dir.iterdir())
+    st.session_state.receipts_analyzed = workspace.receipts_json.exists()
+    st.session_state.matching_completed = False
+    st.session_state.matching_json_path = None
+    st.session_state.receipt_duplicates = {}
+
+# Clé API lue une fois par processus (relue seulement si le fichier .env change)
+@st.cache_resource(max_entries=1)
+def load_api_key(env_path, mtime_ns):
+    return Utils.load_api_key(env_path)
+
+def get_api_key(env_path=".env"):
+    try:
+        return load_api_key(env_path, Path(env_path).stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+# Fonction pour vérifier la configuration au démarrage
+def check_environment():
     # Créer un fichier .env par défaut s'il n'existe pas
-    env_path = Path(".env")
-    if not env_path.exists():
+    if get_api_key() is None:
         st.exception("Votre Clé API est manquante, veuillez contacter votre administrateur")
         # with open(env_path, "w") as f:
         #     f.write("MISTRAL_API_KEY=votre_clé_api_ici\n")
 
-# Fonction pour ajouter un message au log
-def add_to_log(log_type, message):
-    if log_type == "analysis":
-        st.session_state.analysis_log.append(message)
-    elif log_type == "matching":
-        st.session_state.matching_log.append(message)
+# Fonction pour ajouter une entrée au log de la session
+def add_to_log(stage, message, level=INFO):
+    st.session_state.log_buffer.log(level, stage, message)
 
 # Fonction pour effacer les fichiers d'un dossier
 def clear_directory(directory):
@@ -103,99 +155,297 @@ def clear_directory(directory):
         elif item.is_dir():
             shutil.rmtree(item)
 
+# Index des images et vignettes des factures d'un workspace, partagé par les sessions qui l'utilisent
+# (les vignettes sont générées par un pool commun : un store évincé ne laisse pas de threads)
+@st.cache_resource(max_entries=16)
+def get_thumbnail_store(receipts_dir, thumbnails_dir):
+    from logic.thumbnails import ThumbnailStore
+    return ThumbnailStore(receipts_dir=receipts_dir, thumbnails_dir=thumbnails_dir)
+
+# Fonction pour enregistrer les fichiers téléchargés sans réécrire ceux déjà sur disque
+def persist_uploads(uploaded_files, directory):
+    store = UploadStore(directory)
+    written = 0
+    for uploaded_file in uploaded_files:
+        # Le hash d'un fichier n'est calculé qu'une fois par session
+        session_key = (directory, getattr(uploaded_file, "file_id", None) or uploaded_file.name, uploaded_file.size)
+        digest = st.session_state.upload_hashes.get(session_key)
+        if digest is not None and store.contains(uploaded_file.name, digest):
+            continue
+        if digest is None:
+            digest = UploadStore.hash_bytes(uploaded_file.getbuffer())
+            st.session_state.upload_hashes[session_key] = digest
+        if store.save(uploaded_file.name, uploaded_file.getbuffer(), digest):
+            written += 1
+    return written
+
+# Fonction pour repérer les doublons probables parmi les factures téléchargées (pool de processus, hors du script)
+def run_duplicate_detection(job, workspace_root):
+    return detect_duplicates(Workspace(workspace_root), log=job.log, report=job.report)
+
+# Fonction pour importer en masse une archive ZIP ou un dossier
+def run_ingestion(job, workspace_root, source, remove_source):
+    return ingest_receipts(Workspace(workspace_root), source, log=job.log, report=job.report, remove_source=remove_source)
+
 # Fonction pour traiter les factures
-def process_receipts(prompt_content):
-    try:
-        # Charger la clé API du fichier .env
-        api_key = ""
-        try:
-            with open(".env", "r") as f:
-                for line in f:
-                    if line.startswith("MISTRAL_API_KEY="):
-                        api_key = line.split("=")[1].strip()
-                        break
-            
-            if not api_key or api_key == "votre_clé_api_ici":
-                add_to_log("analysis", "❌ Aucune clé API valide trouvée dans le fichier .env")
-                return False, 0
-        except Exception as e:
-            add_to_log("analysis", f"❌ Erreur lors de la lecture du fichier .env: {str(e)}")
-            return False, 0
-        
-        # Enregistrer le contenu du prompt dans un fichier
-        prompt_path = "uploads/prompts/prompt.txt"
-        with open(prompt_path, "w", encoding="utf-8") as f:
-            f.write(prompt_content)
-        
-        add_to_log("analysis", "Démarrage de l'analyse des factures...")
-        
-        # Initialiser l'analyseur de reçus
-        analyzer = ReceiptAnalyzer(
-            prompt_path=prompt_path,
-            receipts_dir="uploads/receipts",
-            output_dir="output/receipts",
-            consolidated_output="all_receipts.json"
-        )
-        
-        # Effectuer l'analyse
-        results = analyzer.batch_process()
-        
-        add_to_log("analysis", f"✅ Analyse terminée : {len(results)} factures traitées")
-        
-        st.session_state.receipts_analyzed = True
-        
-        return True, len(results)
-    except Exception as e:
-        add_to_log("analysis", f"❌ Erreur lors de l'analyse : {str(e)}")
-        return False, 0
+def process_receipts(job, workspace_root, prompt_content):
+    return analyze_receipts(Workspace(workspace_root), prompt_content, log=job.log, report=job.report)
 
 # Fonction pour exécuter le matching
-def run_matching(matching_params):
+def run_matching(job, workspace_root, matching_params):
+    return match_receipts(Workspace(workspace_root), matching_params, log=job.log, report=job.report)
+
+# Fonction pour évaluer une grille de paramètres de matching
+def run_sweep(job, workspace_root, sweep_values, mode):
+    return sweep_parameters(Workspace(workspace_root), sweep_values, mode=mode, log=job.log, report=job.report)
+
+# Exécuteur des tâches de fond, partagé par toutes les sessions du serveur
+@st.cache_resource
+def get_job_runner():
+    return JobRunner()
+
+# Fonction pour décrire le contenu d'un dossier (clé de déduplication des tâches)
+def directory_fingerprint(directory):
+    return sorted(
+        (item.name, item.stat().st_size, item.stat().st_mtime_ns)
+        for item in Path(directory).glob("*") if item.is_file()
+    )
+
+# Fonction pour rattacher la session à une tâche (nouvelle ou déjà en cours)
+def start_job(job_kind, job):
+    if st.session_state.get(f"{job_kind}_job_id") != job.id:
+        st.session_state[f"{job_kind}_job_id"] = job.id
+        st.session_state[f"{job_kind}_job_log_cursor"] = 0
+
+# Onglet de logs de chaque tâche (comme leurs messages : import et doublons avec l'analyse, grille avec le matching)
+JOB_LOG_STAGES = {"ingestion": "analysis", "duplicates": "analysis", "analysis": "analysis", "matching": "matching", "sweep": "matching"}
+
+# Fonction pour reporter l'état d'une tâche de fond dans la session
+def sync_job(job_kind):
+    job = get_job_runner().get(st.session_state.get(f"{job_kind}_job_id"))
+    if job is None:
+        return None
+    
+    # Recopier les nouveaux messages de log de la tâche
+    cursor_key = f"{job_kind}_job_log_cursor"
+    new_logs, st.session_state[cursor_key] = job.logs_since(st.session_state.get(cursor_key, 0))
+    for record in new_logs:
+        st.session_state.log_buffer.append(record)
+    
+    # Appliquer le résultat une seule fois, à la fin de la tâche
+    if not job.active and st.session_state.get(f"{job_kind}_job_handled") != job.id:
+        st.session_state[f"{job_kind}_job_handled"] = job.id
+        if job.status == Job.FAILED:
+            add_to_log(JOB_LOG_STAGES.get(job_kind, job_kind), f"Erreur inattendue : {job.error}", level=ERROR)
+        elif job_kind == "analysis" and job.result[0]:
+            st.session_state.receipts_analyzed = True
+        elif job_kind == "ingestion" and job.result[0]:
+            st.session_state.receipts_uploaded = True
+            st.session_state.receipt_duplicates = job.result[1].get("duplicates", {})
+            get_thumbnail_store(str(workspace.receipts_dir), str(workspace.thumbnails_dir)).schedule_missing()
+        elif job_kind == "duplicates" and job.result[0]:
+            st.session_state.receipt_duplicates = job.result[1]
+        elif job_kind == "matching" and job.result[0]:
+            st.session_state.matching_json_path = job.result[2]
+            st.session_state.matching_completed = True
+    
+    return job
+
+# Graphe des candidats aux bornes larges des curseurs, partagé entre sessions et réexécutions
+@st.cache_resource(max_entries=4)
+def load_candidate_graph(receipts_json, bank_statements_dir, inputs_fingerprint):
+    from logic.candidate_graph import CandidateGraph
+    return CandidateGraph.load(receipts_json, bank_statements_dir)
+
+def get_candidate_graph():
+    if not workspace.receipts_json.exists():
+        return None
+    inputs_fingerprint = (workspace.receipts_json.stat().st_mtime_ns, directory_fingerprint(workspace.bank_statements_dir))
     try:
-        add_to_log("matching", "Démarrage du processus de matching...")
-        
-        # Initialiser le matcher avec les paramètres fournis
-        matcher = ReceiptMatcher(
-            receipts_json_path="output/receipts/all_receipts.json",
-            bank_statements_dir="uploads/bank_statements",
-            output_dir="output/matching",
-            days_delta=matching_params["days_delta"],
-            amount_tolerance_tier1=matching_params["amount_tolerance_tier1"],
-            amount_tolerance_tier2=matching_params["amount_tolerance_tier2"],
-            similarity_threshold=matching_params["similarity_threshold"]
+        return load_candidate_graph(str(workspace.receipts_json), str(workspace.bank_statements_dir), inputs_fingerprint)
+    except (OSError, ValueError, KeyError) as e:
+        st.warning(f"Aperçu du matching indisponible : {str(e)}")
+        return None
+
+# Résultats du matching en table colonne, partagés entre sessions et réexécutions
+@st.cache_resource(max_entries=4)
+def load_results_view(matching_json_path, mtime_ns):
+    from logic.results_view import ResultsView
+    return ResultsView.from_json(matching_json_path)
+
+def get_results_view(matching_json_path):
+    if not matching_json_path or not Path(matching_json_path).exists():
+        return None
+    try:
+        return load_results_view(matching_json_path, Path(matching_json_path).stat().st_mtime_ns)
+    except ValueError:
+        return None
+
+# Fonction pour afficher l'image (vignette par défaut) d'une facture
+def show_receipt_image(receipt_filename, key):
+    store = get_thumbnail_store(str(workspace.receipts_dir), str(workspace.thumbnails_dir))
+    image_path = store.image_path(receipt_filename)
+    if image_path is None:
+        return st.warning(f"Image de la facture '{receipt_filename}' introuvable.")
+    
+    # La pleine résolution n'est chargée que sur demande
+    show_full = st.checkbox("Afficher en pleine résolution", key=f"{key}_full_resolution")
+    thumbnail_path = None if show_full else store.thumbnail_path(receipt_filename)
+    return st.image(str(thumbnail_path or image_path), caption=f"Facture: {receipt_filename}")
+
+# Stockage des factures extraites d'un workspace (index chargé une fois, complété à la lecture)
+@st.cache_resource(max_entries=16)
+def get_receipt_store(store_path):
+    return ReceiptStore(store_path)
+
+# Fonction pour afficher les données extraites d'une facture
+def show_receipt_data(receipt_filename):
+    receipt_data = get_receipt_store(str(workspace.receipt_store_path)).get(receipt_filename)
+    if receipt_data:
+        with st.expander("Données extraites"):
+            st.json(receipt_data)
+
+# Fonction pour afficher une table de résultats paginée (filtre, tri et export côté serveur)
+def show_results_table(results_view, matched, key, csv_file_name):
+    columns = results_view.columns(matched)
+    
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search = st.text_input("Rechercher (fichier ou vendeur)", key=f"{key}_search").strip()
+    with col2:
+        sort_by = st.selectbox("Trier par", options=list(columns), format_func=columns.get, key=f"{key}_sort")
+    with col3:
+        ascending = st.radio("Ordre", ["↑", "↓"], horizontal=True, key=f"{key}_order") == "↑"
+    
+    page_size = st.session_state.get(f"{key}_page_size", Config.RESULTS_PAGE_SIZES[1])
+    page = st.session_state.get(f"{key}_page", 1)
+    page_df, total = results_view.query(matched, search, sort_by, ascending, page - 1, page_size)
+    page_count = max(1, -(-total // page_size))
+    if page > page_count:
+        # La recherche a réduit le nombre de pages : revenir à la dernière
+        page = st.session_state[f"{key}_page"] = page_count
+        page_df, total = results_view.query(matched, search, sort_by, ascending, page - 1, page_size)
+    
+    # Seule la page courante est envoyée au navigateur
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        st.number_input("Page", min_value=1, max_value=page_count, key=f"{key}_page")
+    with col2:
+        st.selectbox("Lignes par page", Config.RESULTS_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    with col3:
+        st.caption(f"{total} ligne(s) — page {page}/{page_count}")
+    
+    # Sélecteur limité aux factures correspondant à la recherche
+    options = results_view.filenames(matched, search, Config.RESULTS_SELECTOR_LIMIT)
+    if total > len(options):
+        st.caption(f"{len(options)} premières factures sur {total} : affinez la recherche pour voir les autres.")
+    selected_receipt = st.selectbox(
+        "Sélectionnez une facture pour voir l'image:",
+        options=options,
+        key=f"{key}_receipt_selector"
+    )
+    
+    if selected_receipt:
+        show_receipt_image(selected_receipt, key)
+        show_receipt_data(selected_receipt)
+    
+    # Le CSV n'est généré que sur demande
+    if st.button("Préparer l'export CSV", key=f"{key}_prepare_csv"):
+        st.session_state[f"{key}_csv"] = results_view.to_csv(matched, search)
+    if st.session_state.get(f"{key}_csv") is not None:
+        st.download_button(
+            label=f"📥 Télécharger {csv_file_name}",
+            data=st.session_state[f"{key}_csv"],
+            file_name=csv_file_name,
+            mime="text/csv",
+            key=f"{key}_download_csv"
         )
-        
-        # Exécuter le processus complet
-        results = matcher.run_complete_process()
-        
-        if results["success"]:
-            add_to_log("matching", f"✅ Matching terminé : {results['matching_count']}/{results['matching_total']} factures matchées")
-            add_to_log("matching", f"✅ {len(results['enriched_files'])} relevés bancaires enrichis")
-            
-            # Charger les résultats du matching pour affichage
-            if results["matching_json"]:
-                with open(results["matching_json"], "r", encoding="utf-8") as f:
-                    matching_data = json.load(f)
-                st.session_state.matching_results = matching_data
-                st.session_state.matching_completed = True
-                return True, results
-            else:
-                add_to_log("matching", "⚠️ Aucun fichier de résultats généré")
-                return False, None
-        else:
-            add_to_log("matching", f"❌ Erreur : {results.get('error', 'Erreur inconnue')}")
-            return False, None
-    except Exception as e:
-        add_to_log("matching", f"❌ Erreur lors du matching : {str(e)}")
-        return False, None
 
-# Créer les dossiers nécessaires au démarrage
-ensure_directories()
+# Fonction pour afficher le résumé de télémétrie de la dernière exécution d'une étape
+def show_telemetry(run):
+    report = Telemetry.load_report(run, str(workspace.telemetry_dir))
+    if not report:
+        return
+    
+    st.markdown(f"#### ⏱️ Télémétrie de la dernière exécution ({report['started_at']})")
+    counters = report.get("counters", {})
+    latency = report.get("histograms", {}).get("api_latency_seconds", {})
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Durée totale", f"{sum(s['duration'] for s in report['spans'] if s['parent'] is None):.1f} s")
+    col2.metric("Appels API", int(counters.get("api_calls", 0)), delta=f"{int(counters.get('api_retry_attempts_total', 0))} reprises", delta_color="off")
+    col3.metric("Latence API p50 / p95", f"{latency['p50']:.2f} / {latency['p95']:.2f} s" if latency.get("count") else "-")
+    col4.metric("Tokens", int(counters.get("api_tokens_consumed_total", 0)))
+    
+    if report.get("stages"):
+        import pandas as pd
+        stages = pd.DataFrame({"Durée (s)": report["stages"]})
+        st.bar_chart(stages, horizontal=True)
+    
+# Fonction pour afficher une page filtrable du log d'une étape
+def show_logs(stage):
+    log_buffer = st.session_state.log_buffer
+    counts = log_buffer.counts(stage)
+    if not sum(counts.values()):
+        return st.info("Aucun log disponible pour cette étape")
+    
+    columns = st.columns(len(LEVELS))
+    for column, level in zip(columns, LEVELS):
+        column.metric(f"{LEVEL_ICONS[level]} {level.capitalize()}", counts[level])
+    
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        levels = st.multiselect("Niveaux", LEVELS, default=LEVELS, format_func=lambda level: f"{LEVEL_ICONS[level]} {level}", key=f"{stage}_log_levels")
+    with col2:
+        search = st.text_input("Rechercher (message ou facture)", key=f"{stage}_log_search").strip()
+    with col3:
+        page = st.number_input("Page", min_value=1, value=1, key=f"{stage}_log_page")
+    
+    import pandas as pd
+    records, total = log_buffer.query(stage, levels, search, page - 1, Config.LOG_PAGE_SIZE)
+    page_count = max(1, -(-total // Config.LOG_PAGE_SIZE))
+    st.caption(f"{total} entrée(s) — page {min(page, page_count)}/{page_count}, les plus récentes en premier")
+    
+    # Une seule table (rendu virtualisé) au lieu d'un bloc HTML par entrée
+    st.dataframe(
+        pd.DataFrame({
+            "Heure": [time.strftime("%H:%M:%S", time.localtime(r.timestamp)) for r in records],
+            "Niveau": [LEVEL_ICONS.get(r.level, "") for r in records],
+            "Facture": [r.receipt or "" for r in records],
+            "Message": [r.message for r in records],
+            "Durée (s)": [round(r.duration, 2) if r.duration is not None else None for r in records],
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+# Fonction pour afficher la progression d'une tâche en cours
+def show_job_progress(job):
+    if job.total:
+        text = f"{job.message} ({job.done}/{job.total})"
+    else:
+        text = job.message or "En attente..."
+    st.progress(job.progress, text=text)
 
 # Affichage du titre de l'application
 st.markdown("<h1 class='main-title'>Analyseur de Factures et Matching Bancaire</h1>", unsafe_allow_html=True)
 
 # Barre latérale
+with st.sidebar:
+    st.text_input("Projet (optionnel)", key="project_name", help="Sans nom de projet, les fichiers de la session sont privés et supprimés après inactivité. Les sessions d'un même projet partagent ses fichiers.")
+
+# Créer les dossiers du workspace de la session (une fois par workspace)
+get_workspace_cleaner()
+workspace = get_workspace()
+workspace.touch()
+switch_workspace(workspace)
+check_environment()
+
+# Import en masse en cours ou terminé (affiché dans la barre latérale)
+ingestion_job = sync_job("ingestion")
+duplicates_job = sync_job("duplicates")
+
 with st.sidebar:
     st.markdown("<h2 class='section-title'>Téléchargement des données</h2>", unsafe_allow_html=True)
     
@@ -206,21 +456,69 @@ with st.sidebar:
     if uploaded_receipts:
         clear_btn_receipts = st.button("Effacer les factures")
         if clear_btn_receipts:
-            clear_directory("uploads/receipts")
+            clear_directory(workspace.receipts_dir)
             st.session_state.receipts_uploaded = False
+            st.session_state.receipt_duplicates = {}
             st.session_state.receipts_analyzed = False
             st.success("Les factures ont été effacées.")
             st.rerun()
         
-        for uploaded_file in uploaded_receipts:
-            # Sauvegarder le fichier dans le dossier uploads/receipts
-            file_path = Path("uploads/receipts") / uploaded_file.name
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        # Sauvegarder uniquement les fichiers dont le contenu n'est pas déjà dans le workspace
+        if persist_uploads(uploaded_receipts, str(workspace.receipts_dir)):
+            # Générer les vignettes des nouvelles factures en arrière-plan
+            get_thumbnail_store(str(workspace.receipts_dir), str(workspace.thumbnails_dir)).schedule_missing()
+            # Doublons probables recherchés en arrière-plan : la page reste réactive
+            job_key = JobRunner.fingerprint("duplicates", str(workspace.root), directory_fingerprint(workspace.receipts_dir))
+            duplicates_job = get_job_runner().submit("duplicates", job_key, run_duplicate_detection, str(workspace.root))
+            start_job("duplicates", duplicates_job)
         
         st.session_state.receipts_uploaded = True
         st.success(f"{len(uploaded_receipts)} factures téléchargées")
     
+    # Import en masse : archive ZIP (copiée sur disque) ou dossier / archive déjà sur le serveur
+    with st.expander("📦 Import en masse (ZIP ou dossier)"):
+        uploaded_archive = st.file_uploader("Archive ZIP de factures", type=["zip"])
+        server_source = st.text_input("Ou chemin d'une archive / d'un dossier sur le serveur", help=f"Dossiers autorisés : {', '.join(Config.BULK_IMPORT_ROOTS)}").strip()
+        
+        if st.button("📥 Importer"):
+            source, remove_source = None, False
+            if uploaded_archive is not None:
+                # L'archive est recopiée par blocs puis lue entrée par entrée
+                source = str(workspace.root / ".imports" / f"{uuid.uuid4().hex}.zip")
+                Path(source).parent.mkdir(parents=True, exist_ok=True)
+                with open(source, "wb") as f:
+                    shutil.copyfileobj(uploaded_archive, f, 1024 * 1024)
+                remove_source = True
+            elif server_source:
+                from logic.bulk_ingestion import resolve_source
+                try:
+                    source = str(resolve_source(server_source))
+                except ValueError as e:
+                    st.error(str(e))
+            else:
+                st.warning("Choisissez une archive ZIP ou saisissez un chemin.")
+            
+            if source:
+                job_key = JobRunner.fingerprint("ingestion", str(workspace.root), source)
+                ingestion_job = get_job_runner().submit("ingestion", job_key, run_ingestion, str(workspace.root), source, remove_source)
+                start_job("ingestion", ingestion_job)
+        
+        if ingestion_job:
+            if ingestion_job.active:
+                show_job_progress(ingestion_job)
+            elif ingestion_job.status == Job.DONE and ingestion_job.result[0]:
+                stats = ingestion_job.result[1]
+                st.success(f"{stats['written']} nouvelles factures importées ({stats['unchanged']} déjà présentes, {stats['skipped']} fichiers ignorés, {stats['errors']} en erreur)")
+            else:
+                st.error("Erreur lors de l'import. Consultez les logs pour plus de détails.")
+    
+    # Doublons probables parmi les factures du workspace (téléchargement ou import)
+    duplicates = st.session_state.receipt_duplicates
+    if duplicates:
+        st.warning(f"{len(duplicates)} doublons probables : ils ne seront pas envoyés à l'API et reprendront les données de la facture d'origine.")
+        with st.expander("Voir les doublons"):
+            st.dataframe({"Doublon": list(duplicates), "Facture d'origine": list(duplicates.values())}, hide_index=True)
+    
     # Section téléchargement des relevés bancaires
     st.markdown("### 🏦 Relevés Bancaires")
     uploaded_statements = st.file_uploader("Télécharger des relevés bancaires", accept_multiple_files=True, type=["csv"])
@@ -228,17 +526,14 @@ with st.sidebar:
     if uploaded_statements:
         clear_btn_statements = st.button("Effacer les relevés")
         if clear_btn_statements:
-            clear_directory("uploads/bank_statements")
+            clear_directory(workspace.bank_statements_dir)
             st.session_state.bank_statements_uploaded = False
             st.session_state.matching_completed = False
             st.success("Les relevés bancaires ont été effacés.")
             st.rerun()
         
-        for uploaded_file in uploaded_statements:
-            # Sauvegarder le fichier dans le dossier uploads/bank_statements
-            file_path = Path("uploads/bank_statements") / uploaded_file.name
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        # Sauvegarder uniquement les fichiers dont le contenu n'est pas déjà dans le workspace
+        persist_uploads(uploaded_statements, str(workspace.bank_statements_dir))
         
         st.session_state.bank_statements_uploaded = True
         st.success(f"{len(uploaded_statements)} relevés bancaires téléchargés")
@@ -250,6 +545,11 @@ with st.sidebar:
     st.info(f"Analyse des factures: {'✅ Terminée' if st.session_state.receipts_analyzed else '❌ Non effectuée'}")
     st.info(f"Matching: {'✅ Terminé' if st.session_state.matching_completed else '❌ Non effectué'}")
 
+# État des tâches de fond de la session
+analysis_job = sync_job("analysis")
+matching_job = sync_job("matching")
+sweep_job = sync_job("sweep")
+
 # Zone principale
 tabs = st.tabs(["Analyse des Factures", "Matching", "Résultats", "Logs"])
 
@@ -266,20 +566,13 @@ with tabs[0]:
             st.markdown("### 🔑 Configuration API")
             st.info("La clé API Mistral est chargée depuis le fichier .env")
             
-            # Charger la clé API depuis .env pour l'utilisation interne
-            api_key = ""
-            try:
-                with open(".env", "r") as f:
-                    for line in f:
-                        if line.startswith("MISTRAL_API_KEY="):
-                            api_key = line.split("=")[1].strip()
-                            break
-                
-                if not api_key or api_key == "votre_clé_api_ici":
-                    st.warning("⚠️ Aucune clé API valide trouvée dans le fichier .env. Veuillez éditer ce fichier directement.")
-            except Exception as e:
-                st.error(f"Erreur lors de la lecture du fichier .env: {e}")
+            # Clé API chargée depuis .env (en cache, partagée par les sessions)
+            api_key = get_api_key()
+            if api_key is None:
+                st.error("Le fichier .env est introuvable.")
                 st.warning("Assurez-vous que le fichier .env existe avec la variable MISTRAL_API_KEY correctement définie.")
+            elif not api_key:
+                st.warning("⚠️ Aucune clé API valide trouvée dans le fichier .env. Veuillez éditer ce fichier directement.")
         
         with col2:
             st.markdown("### 📝 Prompt")
@@ -304,7 +597,7 @@ with tabs[0]:
 }"""
             
             # Charger le prompt depuis un fichier s'il existe
-            prompt_path = Path("uploads/prompts/prompt.txt")
+            prompt_path = workspace.prompt_path
             if prompt_path.exists():
                 try:
                     with open(prompt_path, "r", encoding="utf-8") as f:
@@ -319,29 +612,21 @@ with tabs[0]:
         
         if analyze_button:
             # Vérifier que le fichier .env contient une clé API valide
-            api_key_valid = False
-            try:
-                with open(".env", "r") as f:
-                    for line in f:
-                        if line.startswith("MISTRAL_API_KEY="):
-                            key = line.split("=")[1].strip()
-                            if key and key != "votre_clé_api_ici":
-                                api_key_valid = True
-                                break
-            except:
-                pass
-            
-            if not api_key_valid:
+            if not get_api_key():
                 st.error("Aucune clé API valide trouvée dans le fichier .env. Veuillez éditer ce fichier directement.")
             else:
-                # Afficher un spinner pendant l'analyse
-                with st.spinner("Analyse des factures en cours..."):
-                    success, count = process_receipts(prompt_content)
-                
-                if success:
-                    st.markdown(f"<div class='success-box'>✅ Analyse terminée avec succès ! {count} factures ont été analysées.</div>", unsafe_allow_html=True)
-                else:
-                    st.markdown("<div class='error-box'>❌ Erreur lors de l'analyse des factures. Consultez les logs pour plus de détails.</div>", unsafe_allow_html=True)
+                # Lancer l'analyse en arrière-plan (ou rejoindre l'analyse identique en cours)
+                job_key = JobRunner.fingerprint("analysis", str(workspace.root), prompt_content, directory_fingerprint(workspace.receipts_dir))
+                analysis_job = get_job_runner().submit("analysis", job_key, process_receipts, str(workspace.root), prompt_content)
+                start_job("analysis", analysis_job)
+        
+        if analysis_job:
+            if analysis_job.active:
+                show_job_progress(analysis_job)
+            elif analysis_job.status == Job.DONE and analysis_job.result[0]:
+                st.markdown(f"<div class='success-box'>✅ Analyse terminée avec succès ! {analysis_job.result[1]} factures ont été analysées.</div>", unsafe_allow_html=True)
+            else:
+                st.markdown("<div class='error-box'>❌ Erreur lors de l'analyse des factures. Consultez les logs pour plus de détails.</div>", unsafe_allow_html=True)
 
 # Onglet Matching
 with tabs[1]:
@@ -356,31 +641,61 @@ with tabs[1]:
         
         col1, col2 = st.columns(2)
         
+        limits = Config.CANDIDATE_GRAPH_LIMITS
         with col1:
-            days_delta = st.slider("Écart de jours maximum", min_value=0, max_value=10, value=3, help="Nombre de jours maximum d'écart entre la date de la facture et celle du relevé bancaire")
-            similarity_threshold = st.slider("Seuil de similarité des noms", min_value=50, max_value=100, value=85, help="Seuil minimum pour considérer deux noms de vendeurs comme similaires (en %)")
+            days_delta = st.slider("Écart de jours maximum", min_value=0, max_value=limits["days_delta"], value=Config.MATCHING_DEFAULTS["days_delta"], help="Nombre de jours maximum d'écart entre la date de la facture et celle du relevé bancaire")
+            similarity_threshold = st.slider("Seuil de similarité des noms", min_value=limits["similarity_threshold"], max_value=100, value=Config.MATCHING_DEFAULTS["similarity_threshold"], help="Seuil minimum pour considérer deux noms de vendeurs comme similaires (en %)")
         
         with col2:
-            amount_tolerance_tier1 = st.slider("Tolérance stricte pour les montants", min_value=0.0, max_value=0.10, value=0.05, step=0.01, format="%.2f", help="Différence acceptée pour considérer deux montants comme très proches (en %)")
-            amount_tolerance_tier2 = st.slider("Tolérance large pour les montants", min_value=0.0, max_value=0.20, value=0.10, step=0.01, format="%.2f", help="Différence maximale acceptée pour considérer deux montants comme potentiellement liés (en %)")
+            amount_tolerance_tier1 = st.slider("Tolérance stricte pour les montants", min_value=0.0, max_value=0.10, value=Config.MATCHING_DEFAULTS["amount_tolerance_tier1"], step=0.01, format="%.2f", help="Différence acceptée pour considérer deux montants comme très proches (en %)")
+            amount_tolerance_tier2 = st.slider("Tolérance large pour les montants", min_value=0.0, max_value=limits["amount_tolerance"], value=Config.MATCHING_DEFAULTS["amount_tolerance_tier2"], step=0.01, format="%.2f", help="Différence maximale acceptée pour considérer deux montants comme potentiellement liés (en %)")
+        
+        assignment_mode = st.selectbox(
+            "Mode d'affectation",
+            list(Config.ASSIGNMENT_MODES),
+            index=list(Config.ASSIGNMENT_MODES).index(Config.ASSIGNMENT_DEFAULT_MODE),
+            format_func=Config.ASSIGNMENT_MODES.get,
+            help="Affectation factures / lignes bancaires de l'aperçu et du balayage : le mode optimal maximise le nombre de factures matchées"
+        )
+        
+        # Paramètres de matching
+        matching_params = {
+            "days_delta": days_delta,
+            "amount_tolerance_tier1": amount_tolerance_tier1,
+            "amount_tolerance_tier2": amount_tolerance_tier2,
+            "similarity_threshold": similarity_threshold
+        }
+        
+        # Aperçu instantané : filtre du graphe des candidats déjà calculé. Son score
+        # (similarité, tolérances, écart de jours) n'est pas celui du ReceiptMatcher
+        # lancé par le bouton : c'est une estimation
+        with st.spinner("Préparation de l'aperçu du matching..."):
+            candidate_graph = get_candidate_graph()
+        if candidate_graph is not None:
+            preview = candidate_graph.preview(matching_params, assignment_mode)
+            st.markdown(f"<div class='info-box'>👁️ Estimation : environ {preview['matching_count']}/{preview['matching_total']} factures matchées ({preview['match_rate']:.1%}), dont {preview['tier1']} en tolérance stricte ; {preview['ambiguous']} factures ont plusieurs lignes candidates.</div>", unsafe_allow_html=True)
+            st.caption("Estimation calculée par le graphe des candidats : le matching lancé ci-dessous applique son propre score et peut donner un résultat différent.")
         
         # Bouton de matching
         matching_button = st.button("🔍 Lancer le Matching")
         
         if matching_button:
-            # Paramètres de matching
-            matching_params = {
-                "days_delta": days_delta,
-                "amount_tolerance_tier1": amount_tolerance_tier1,
-                "amount_tolerance_tier2": amount_tolerance_tier2,
-                "similarity_threshold": similarity_threshold
-            }
-            
-            # Afficher un spinner pendant le matching
-            with st.spinner("Matching en cours..."):
-                success, results = run_matching(matching_params)
-            
-            if success:
+            # Lancer le matching en arrière-plan (ou rejoindre le matching identique en cours)
+            job_key = JobRunner.fingerprint(
+                "matching",
+                str(workspace.root),
+                matching_params,
+                directory_fingerprint(workspace.receipts_output_dir),
+                directory_fingerprint(workspace.bank_statements_dir),
+            )
+            matching_job = get_job_runner().submit("matching", job_key, run_matching, str(workspace.root), matching_params)
+            start_job("matching", matching_job)
+        
+        if matching_job:
+            if matching_job.active:
+                show_job_progress(matching_job)
+            elif matching_job.status == Job.DONE and matching_job.result[0]:
+                results = matching_job.result[1]
                 matched_count = results["matching_count"]
                 total_count = results["matching_total"]
                 match_percentage = (matched_count / total_count * 100) if total_count > 0 else 0
@@ -393,6 +708,64 @@ with tabs[1]:
                     st.markdown(f"<div class='success-box'>✅ {enriched_files} relevés bancaires ont été enrichis avec les informations des factures.</div>", unsafe_allow_html=True)
             else:
                 st.markdown("<div class='error-box'>❌ Erreur lors du matching. Consultez les logs pour plus de détails.</div>", unsafe_allow_html=True)
+        
+        # Balayage d'une grille de paramètres (taux de matching de chaque combinaison)
+        with st.expander("🧪 Balayage des paramètres"):
+            st.caption("Évalue toutes les combinaisons des valeurs choisies sur les mêmes données et scores de similarité, avec le même graphe des candidats que l'estimation ci-dessus.")
+            col1, col2 = st.columns(2)
+            with col1:
+                sweep_days = st.multiselect("Écart de jours", Config.SWEEP_GRID["days_delta"], default=Config.SWEEP_GRID["days_delta"])
+                sweep_similarity = st.multiselect("Seuil de similarité", Config.SWEEP_GRID["similarity_threshold"], default=Config.SWEEP_GRID["similarity_threshold"])
+            with col2:
+                sweep_tier1 = st.multiselect("Tolérance stricte", Config.SWEEP_GRID["amount_tolerance_tier1"], default=Config.SWEEP_GRID["amount_tolerance_tier1"], format_func=lambda value: f"{value:.2f}")
+                sweep_tier2 = st.multiselect("Tolérance large", Config.SWEEP_GRID["amount_tolerance_tier2"], default=Config.SWEEP_GRID["amount_tolerance_tier2"], format_func=lambda value: f"{value:.2f}")
+            
+            if st.button("🧪 Lancer le balayage"):
+                sweep_values = {
+                    "days_delta": sweep_days,
+                    "amount_tolerance_tier1": sweep_tier1,
+                    "amount_tolerance_tier2": sweep_tier2,
+                    "similarity_threshold": sweep_similarity
+                }
+                job_key = JobRunner.fingerprint(
+                    "sweep",
+                    str(workspace.root),
+                    sweep_values,
+                    assignment_mode,
+                    directory_fingerprint(workspace.receipts_output_dir),
+                    directory_fingerprint(workspace.bank_statements_dir),
+                )
+                sweep_job = get_job_runner().submit("sweep", job_key, run_sweep, str(workspace.root), sweep_values, assignment_mode)
+                start_job("sweep", sweep_job)
+            
+            if sweep_job:
+                if sweep_job.active:
+                    show_job_progress(sweep_job)
+                elif sweep_job.status == Job.DONE and sweep_job.result[0]:
+                    from logic.parameter_sweep import ParameterSweep
+                    sweep_table = sweep_job.result[1]
+                    st.markdown("#### Factures matchées (meilleure combinaison des tolérances)")
+                    st.line_chart(ParameterSweep.chart_data(sweep_table).rename(columns=lambda value: f"similarité {value}"))
+                    st.markdown("#### Factures ambiguës (plusieurs lignes candidates)")
+                    st.line_chart(ParameterSweep.chart_data(sweep_table, value="ambiguous").rename(columns=lambda value: f"similarité {value}"))
+                    st.dataframe(
+                        sweep_table.rename(columns={
+                            "days_delta": "Jours",
+                            "amount_tolerance_tier1": "Tolérance stricte",
+                            "amount_tolerance_tier2": "Tolérance large",
+                            "similarity_threshold": "Similarité",
+                            "matched": "Matchées",
+                            "tier1": "Dont strictes",
+                            "ambiguous": "Ambiguës",
+                            "edges": "Paires candidates",
+                            "match_rate": "Taux",
+                        }),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    st.download_button("📥 Télécharger le balayage (CSV)", sweep_table.to_csv(index=False).encode("utf-8"), "parameter_sweep.csv", "text/csv")
+                else:
+                    st.markdown("<div class='error-box'>❌ Erreur lors du balayage. Consultez les logs pour plus de détails.</div>", unsafe_allow_html=True)
 
 # Onglet Résultats
 with tabs[2]:
@@ -401,136 +774,27 @@ with tabs[2]:
     if not st.session_state.matching_completed:
         st.markdown("<div class='info-box'>Aucun résultat de matching disponible. Veuillez d'abord effectuer le matching dans l'onglet précédent.</div>", unsafe_allow_html=True)
     else:
-        # Convertir les résultats en DataFrame pour affichage
-        matching_data = st.session_state.matching_results
+        results_view = get_results_view(st.session_state.matching_json_path)
         
-        if matching_data:
-            # Séparer les résultats en matchés et non matchés
-            matched_results = [r for r in matching_data if r.get("matched", False)]
-            unmatched_results = [r for r in matching_data if not r.get("matched", False)]
+        if results_view is not None and len(results_view.table):
+            matched_count, unmatched_count = results_view.counts()
             
-            # Créer des DataFrames
-            if matched_results:
-                matched_df = pd.DataFrame(matched_results)
-                
-                # Sélectionner et renommer les colonnes pour une meilleure lisibilité
-                display_columns = {
-                    "receipt_filename": "Nom du fichier",
-                    "receipt_total": "Montant facture",
-                    "receipt_date": "Date facture",
-                    "vendor_receipt": "Vendeur facture",
-                    "bank_amount": "Montant banque",
-                    "bank_date": "Date banque",
-                    "bank_vendor": "Vendeur banque"
-                }
-                # Ne pas afficher les scores et similarités comme demandé
-                
-                matched_display_df = matched_df[[col for col in display_columns.keys() if col in matched_df.columns]]
-                matched_display_df = matched_display_df.rename(columns=display_columns)
-                
-                # Onglets pour les résultats matchés et non matchés
-                results_tabs = st.tabs(["Matchés", "Non Matchés"])
-                
-                with results_tabs[0]:
-                    st.markdown(f"### ✅ Factures matchées ({len(matched_results)})")
-                    
-                    # Fonction pour afficher l'image lorsqu'on clique sur le nom du fichier
-                    def show_receipt_image(receipt_filename):
-                        # Chercher l'image correspondante dans le dossier des factures
-                        receipt_dir = Path("uploads/receipts")
-                        possible_extensions = [".jpg", ".jpeg", ".png", ".JPG", ".JPEG", ".PNG"]
-                        
-                        # Essayer de trouver le fichier avec différentes extensions
-                        image_path = None
-                        for ext in possible_extensions:
-                            potential_path = receipt_dir / f"{receipt_filename}{ext}"
-                            if potential_path.exists():
-                                image_path = potential_path
-                                break
-                        
-                        if image_path and image_path.exists():
-                            return st.image(str(image_path), caption=f"Facture: {receipt_filename}")
-                        else:
-                            return st.warning(f"Image de la facture '{receipt_filename}' introuvable.")
-                    
-                    # Créer une version interactive du DataFrame pour pouvoir cliquer sur les noms de fichiers
-                    st.dataframe(matched_display_df, use_container_width=True)
-                    
-                    # Sélection du fichier pour afficher l'image
-                    selected_receipt = st.selectbox(
-                        "Sélectionnez une facture pour voir l'image:",
-                        options=[result["receipt_filename"] for result in matched_results],
-                        key="matched_receipt_selector"
-                    )
-                    
-                    if selected_receipt:
-                        show_receipt_image(selected_receipt)
-                    
-                    # Option pour télécharger les résultats matchés
-                    csv = matched_display_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Télécharger les résultats matchés (CSV)",
-                        data=csv,
-                        file_name="resultats_matches.csv",
-                        mime="text/csv"
-                    )
-                
-                with results_tabs[1]:
-                    if unmatched_results:
-                        st.markdown(f"### ❌ Factures non matchées ({len(unmatched_results)})")
-                        
-                        unmatched_df = pd.DataFrame(unmatched_results)
-                        unmatched_display_cols = {
-                            "receipt_filename": "Nom du fichier",
-                            "receipt_total": "Montant",
-                            "receipt_date": "Date",
-                            "vendor_receipt": "Vendeur",
-                            "reason": "Raison"
-                        }
-                        
-                        unmatched_display_df = unmatched_df[[col for col in unmatched_display_cols.keys() if col in unmatched_df.columns]]
-                        unmatched_display_df = unmatched_display_df.rename(columns=unmatched_display_cols)
-                        
-                        st.dataframe(unmatched_display_df, use_container_width=True)
-                        
-                        # Sélection du fichier non matché pour afficher l'image
-                        selected_unmatched = st.selectbox(
-                            "Sélectionnez une facture non matchée pour voir l'image:",
-                            options=[result["receipt_filename"] for result in unmatched_results],
-                            key="unmatched_receipt_selector"
-                        )
-                        
-                        if selected_unmatched:
-                            # Réutilisation de la même fonction définie plus haut pour afficher l'image
-                            receipt_dir = Path("uploads/receipts")
-                            possible_extensions = [".jpg", ".jpeg", ".png", ".JPG", ".JPEG", ".PNG"]
-                            
-                            # Essayer de trouver le fichier avec différentes extensions
-                            image_path = None
-                            for ext in possible_extensions:
-                                potential_path = receipt_dir / f"{selected_unmatched}{ext}"
-                                if potential_path.exists():
-                                    image_path = potential_path
-                                    break
-                            
-                            if image_path and image_path.exists():
-                                st.image(str(image_path), caption=f"Facture: {selected_unmatched}")
-                            else:
-                                st.warning(f"Image de la facture '{selected_unmatched}' introuvable.")
-                        
-                        # Option pour télécharger les résultats non matchés
-                        csv_unmatched = unmatched_display_df.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Télécharger les factures non matchées (CSV)",
-                            data=csv_unmatched,
-                            file_name="factures_non_matchees.csv",
-                            mime="text/csv",
-                            key="download_unmatched_csv"
-                        )
-                    else:
-                        st.markdown("<div class='success-box'>Toutes les factures ont été matchées !</div>", unsafe_allow_html=True)
-            else:
-                st.markdown("<div class='warning-box'>Aucune facture matchée trouvée dans les résultats.</div>", unsafe_allow_html=True)
+            # Onglets pour les résultats matchés et non matchés
+            results_tabs = st.tabs([f"Matchés ({matched_count})", f"Non Matchés ({unmatched_count})"])
+            
+            with results_tabs[0]:
+                st.markdown(f"### ✅ Factures matchées ({matched_count})")
+                if matched_count:
+                    show_results_table(results_view, True, "matched", "resultats_matches.csv")
+                else:
+                    st.markdown("<div class='warning-box'>Aucune facture matchée trouvée dans les résultats.</div>", unsafe_allow_html=True)
+            
+            with results_tabs[1]:
+                if unmatched_count:
+                    st.markdown(f"### ❌ Factures non matchées ({unmatched_count})")
+                    show_results_table(results_view, False, "unmatched", "factures_non_matchees.csv")
+                else:
+                    st.markdown("<div class='success-box'>Toutes les factures ont été matchées !</div>", unsafe_allow_html=True)
         else:
             st.markdown("<div class='warning-box'>Les résultats du matching sont vides ou dans un format inattendu.</div>", unsafe_allow_html=True)
         
@@ -540,7 +804,7 @@ with tabs[2]:
         
         with col1:
             st.markdown("#### Fichiers de matching")
-            matching_files = list(Path("output/matching").glob("*.json")) + list(Path("output/matching").glob("*.csv"))
+            matching_files = list(workspace.matching_dir.glob("*.json")) + list(workspace.matching_dir.glob("*.csv"))
             
             if matching_files:
                 for i, file_path in enumerate(matching_files):
@@ -557,7 +821,7 @@ with tabs[2]:
         
         with col2:
             st.markdown("#### Relevés bancaires enrichis")
-            enriched_files = list(Path("output/matching").glob("*_enriched*.csv"))
+            enriched_files = list(workspace.matching_dir.glob("*_enriched*.csv"))
             
             if enriched_files:
                 for i, file_path in enumerate(enriched_files):
@@ -580,33 +844,55 @@ with tabs[3]:
     log_tabs = st.tabs(["Analyse des Factures", "Matching"])
     
     with log_tabs[0]:
-        if st.session_state.analysis_log:
-            for log_entry in st.session_state.analysis_log:
-                if "✅" in log_entry:
-                    st.markdown(f"<div class='success-box'>{log_entry}</div>", unsafe_allow_html=True)
-                elif "⚠️" in log_entry:
-                    st.markdown(f"<div class='warning-box'>{log_entry}</div>", unsafe_allow_html=True)
-                elif "❌" in log_entry:
-                    st.markdown(f"<div class='error-box'>{log_entry}</div>", unsafe_allow_html=True)
-                else:
-                    st.markdown(f"<div class='info-box'>{log_entry}</div>", unsafe_allow_html=True)
-        else:
-            st.info("Aucun log d'analyse disponible")
+        # Statistiques du cache d'extraction (compteurs enregistrés en fin d'analyse), lues à la demande
+        st.markdown("#### 🗄️ Cache d'extraction")
+        if st.toggle("Afficher les statistiques du cache", key="show_cache_stats"):
+            cache_stats = ExtractionCache.load_stats()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Hits", cache_stats["hits"])
+            col2.metric("Misses", cache_stats["misses"])
+            col3.metric("Entrées", cache_stats["entries"])
+            col4.metric("Taille", f"{cache_stats['bytes'] / (1024 * 1024):.1f} Mo")
+        
+        # Gain du pré-traitement des images
+        report_path = workspace.preprocess_report
+        if report_path.exists():
+            with open(report_path, "r", encoding="utf-8") as f:
+                preprocessing_report = json.load(f)
+            preprocessing = preprocessing_report.get("preprocessing") or {}
+            latency = preprocessing_report.get("latency_per_receipt")
+            previous_latency = preprocessing_report.get("previous_latency_per_receipt")
+            
+            st.markdown("#### 🖼️ Pré-traitement des images")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Octets économisés", f"{preprocessing.get('bytes_saved', 0) / (1024 * 1024):.1f} Mo")
+            col2.metric("Taille envoyée", f"{preprocessing.get('ratio', 1.0):.0%}")
+            if latency is not None:
+                delta = f"{latency - previous_latency:+.2f} s" if previous_latency is not None else None
+                col3.metric("Latence par facture", f"{latency:.2f} s", delta=delta, delta_color="inverse")
+        
+        show_telemetry("analysis")
+        show_logs("analysis")
     
     with log_tabs[1]:
-        if st.session_state.matching_log:
-            for log_entry in st.session_state.matching_log:
-                if "✅" in log_entry:
-                    st.markdown(f"<div class='success-box'>{log_entry}</div>", unsafe_allow_html=True)
-                elif "⚠️" in log_entry:
-                    st.markdown(f"<div class='warning-box'>{log_entry}</div>", unsafe_allow_html=True)
-                elif "❌" in log_entry:
-                    st.markdown(f"<div class='error-box'>{log_entry}</div>", unsafe_allow_html=True)
-                else:
-                    st.markdown(f"<div class='info-box'>{log_entry}</div>", unsafe_allow_html=True)
-        else:
-            st.info("Aucun log de matching disponible")
+        show_telemetry("matching")
+        show_logs("matching")
 
 # Pied de page
 st.markdown("---")
 st.markdown("📊 **Analyseur de Factures et Matching Bancaire** | Développé avec Streamlit")
+
+# Durée des rendus de la session : premier affichage puis réexécutions
+render_seconds = time.perf_counter() - RENDER_START
+if st.session_state.first_render_seconds is None:
+    st.session_state.first_render_seconds = render_seconds
+else:
+    st.session_state.rerun_seconds.append(render_seconds)
+if st.session_state.rerun_seconds:
+    reruns = sorted(st.session_state.rerun_seconds)
+    st.caption(f"Rendu : premier affichage {st.session_state.first_render_seconds * 1000:.0f} ms, réexécution médiane {reruns[len(reruns) // 2] * 1000:.0f} ms")
+
+# Rafraîchir la page tant qu'une tâche de fond est en cours
+if any(job and job.active for job in (ingestion_job, duplicates_job, analysis_job, matching_job, sweep_job)):
+    time.sleep(Config.JOB_POLL_INTERVAL)
+    st.rerun()
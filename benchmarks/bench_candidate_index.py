@@ -0,0 +1,73 @@
+"""
+Génération de candidats : parcours complet vs index (date, montant).
+
+    python -m benchmarks.bench_candidate_index --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from logic.candidate_index import TransactionIndex
+
+
+def brute_force(bank_days, bank_cents, day, cents, days_delta, tolerance):
+    """Équivalent du parcours actuel : un test par transaction"""
+    result = []
+    for i in range(len(bank_days)):
+        if abs(bank_days[i] - day) <= days_delta and abs(bank_cents[i] - cents) <= tolerance * cents:
+            result.append(i)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--receipts", type=int, default=20)
+    parser.add_argument("--days-delta", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    start_day = np.datetime64("2024-01-01")
+
+    print(f"{'transactions':>12} {'construction (s)':>17} {'scan/reçu (ms)':>15} "
+          f"{'index/reçu (ms)':>16} {'accélération':>13}")
+    for size in args.sizes:
+        dates = start_day + rng.integers(0, 365, size).astype("timedelta64[D]")
+        amounts = np.round(rng.lognormal(3.5, 1.0, size), 2)
+
+        start = time.perf_counter()
+        index = TransactionIndex(dates, amounts)
+        build_time = time.perf_counter() - start
+
+        bank_days = (dates.astype("datetime64[D]").astype(np.int64)).tolist()
+        bank_cents = np.rint(amounts * 100).astype(np.int64).tolist()
+        picks = rng.integers(0, size, args.receipts)
+
+        scan_time = index_time = 0.0
+        for pick in picks:
+            day, cents = bank_days[pick], bank_cents[pick]
+            t0 = time.perf_counter()
+            expected = brute_force(bank_days, bank_cents, day, cents, args.days_delta, args.tolerance)
+            t1 = time.perf_counter()
+            candidates = index.candidates(dates[pick], amounts[pick], args.days_delta, args.tolerance)
+            t2 = time.perf_counter()
+            scan_time += t1 - t0
+            index_time += t2 - t1
+
+            # Les tests exacts appliqués aux candidats doivent redonner le même résultat
+            exact = [i for i in candidates.tolist()
+                     if abs(bank_days[i] - day) <= args.days_delta
+                     and abs(bank_cents[i] - cents) <= args.tolerance * cents]
+            assert exact == expected, "l'index a perdu des candidats"
+
+        per_scan = scan_time / len(picks) * 1000
+        per_index = index_time / len(picks) * 1000
+        print(f"{size:>12} {build_time:>17.3f} {per_scan:>15.3f} {per_index:>16.3f} "
+              f"{per_scan / per_index:>12.0f}x")
+
+
+if __name__ == "__main__":
+    main()
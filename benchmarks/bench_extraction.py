@@ -0,0 +1,57 @@
+"""
+Débit de l'extraction concurrente en fonction du nombre de workers.
+
+    python -m benchmarks.bench_extraction --receipts 200 --latency 0.3
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_mistral_server import FakeMistralServer
+from logic.extraction_engine import ExtractionEngine, MistralVisionClient
+
+
+def make_images(directory: Path, count: int, size: int):
+    paths = []
+    for i in range(count):
+        path = directory / f"receipt_{i:05d}.jpg"
+        path.write_bytes(b"\xff\xd8" + bytes(size))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--receipts", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--image-size", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    prompt = "Analysez cette facture et extrayez les informations au format JSON."
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeMistralServer(latency=args.latency, error_rate=args.error_rate) as server:
+        images = make_images(Path(tmp), args.receipts, args.image_size)
+        client = MistralVisionClient(api_key="fake", base_url=server.url)
+
+        print(f"{'workers':>8} {'durée (s)':>10} {'reçus/s':>9} {'requêtes':>9} {'erreurs':>8}")
+        for workers in args.workers:
+            engine = ExtractionEngine(
+                max_workers=workers,
+                requests_per_second=1000,
+                tokens_per_minute=10 ** 9,
+                backoff_base=0.05,
+            )
+            requests_before = server.request_count
+            start = time.perf_counter()
+            results = engine.run(images, lambda path: client.extract(str(path), prompt))
+            elapsed = time.perf_counter() - start
+            errors = sum(1 for r in results if not r.success)
+            print(f"{workers:>8} {elapsed:>10.2f} {len(results) / elapsed:>9.1f} "
+                  f"{server.request_count - requests_before:>9} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
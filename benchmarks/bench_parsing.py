@@ -0,0 +1,80 @@
+"""
+Parsing de dates et de montants : fonctions scalaires de Utils vs versions colonne.
+
+    python -m benchmarks.bench_parsing --rows 200000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from utils import Utils
+
+
+def make_dates(rows: int, rng: random.Random):
+    values = []
+    for _ in range(rows):
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2020, 2025)
+        roll = rng.random()
+        if roll < 0.90:
+            values.append(f"{day:02d}/{month:02d}/{year}")
+        elif roll < 0.97:
+            values.append(f"{year}-{month:02d}-{day:02d}")
+        elif roll < 0.99:
+            values.append(f"Paiement du {day}.{month}.{year}")
+        else:
+            values.append("")
+    return values
+
+
+def make_amounts(rows: int, rng: random.Random, distinct: int = 0):
+    """Textes de montants ; `distinct` > 0 limite le nombre de valeurs différentes"""
+    templates = ["{a} €", "€ {a}", "{a} EUR", "TOTAL {a}", "Montant: {a} € (TVA {b})", "sans montant"]
+    values = []
+    for _ in range(distinct or rows):
+        a = f"{rng.randint(0, 999)},{rng.randint(0, 99):02d}"
+        b = f"{rng.randint(0, 99)}.{rng.randint(0, 99):02d}"
+        values.append(rng.choice(templates).format(a=a, b=b))
+    if distinct:
+        values = [rng.choice(values) for _ in range(rows)]
+    return values
+
+
+def compare(label, values, scalar_fn, series_fn):
+    start = time.perf_counter()
+    scalar = [scalar_fn(v) for v in values]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    series = series_fn(pd.Series(values))
+    series_time = time.perf_counter() - start
+
+    print(f"{label:<22} {scalar_time:>13.3f} {series_time:>12.3f} {scalar_time / series_time:>12.1f}x")
+    return scalar, series
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--distinct-amounts", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    dates = make_dates(args.rows, rng)
+
+    print(f"{'étape':<22} {'scalaire (s)':>13} {'colonne (s)':>12} {'accélération':>13}")
+    scalar, series = compare("dates", dates, Utils.parse_date, Utils.parse_date_series)
+    expected = pd.to_datetime(pd.Series(scalar, dtype="object"))
+    assert expected.equals(series.astype(expected.dtype)), "dates différentes"
+
+    for label, distinct in [("montants (uniques)", 0), ("montants (répétés)", args.distinct_amounts)]:
+        amounts = make_amounts(args.rows, rng, distinct)
+        scalar, series = compare(label, amounts, Utils.extract_amount_from_string, Utils.extract_amount_series)
+        expected = pd.Series([float("nan") if v is None else v for v in scalar])
+        assert expected.equals(series), "montants différents"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Suite de benchmarks du pipeline complet sur des données synthétiques.
+
+    python -m benchmarks.bench_pipeline --sizes 100 10000 1000000
+    python -m benchmarks.bench_pipeline --update-baseline
+    python -m benchmarks.bench_pipeline --fail-on-regression
+
+Pour chaque taille (nombre de transactions bancaires), les étapes sont
+mesurées en temps et en pic mémoire (tracemalloc, allocations Python et
+numpy) ; l'extraction est mesurée une fois contre le faux serveur Mistral.
+tracemalloc ralentit le code Python pur : les durées ne sont comparables
+qu'à une baseline mesurée de la même façon.
+Les résultats sont comparés à une baseline JSON : une étape plus lente ou
+plus gourmande que la baseline au-delà de la tolérance est signalée.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_mistral_server import FakeMistralServer
+from benchmarks.synthetic_data import generate
+from logic.assignment import assign
+from logic.candidate_graph import CandidateGraph
+from logic.candidate_index import TransactionIndex
+from logic.columnar import receipts_table, results_from_pairs
+from logic.extraction_engine import ExtractionEngine, MistralVisionClient
+from logic.receipt_store import ReceiptStore
+from logic.results_view import ResultsView
+from logic.statement_ingestion import StatementIngestor
+from logic.vendor_similarity import VendorIndex
+from utils import Utils
+
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+# Écarts en dessous desquels une différence est considérée comme du bruit
+MIN_SECONDS_DELTA = 0.05
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, Dict[str, float]]:
+    """Exécute `fn` et renvoie (résultat, {seconds, peak_mb})"""
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return result, {"seconds": round(seconds, 4), "peak_mb": round(max(0, peak - before) / (1024 * 1024), 2)}
+
+
+def run_matching(bank: pd.DataFrame, receipts: pd.DataFrame, days_delta: int = 3, tolerance: float = 0.02,
+                 similarity_threshold: float = 30) -> Dict[str, Any]:
+    """
+    Candidats (index date/montant), score des vendeurs et affectation un-à-un.
+
+    Renvoie le nombre d'arêtes candidates et les paires retenues
+    {position de la facture: position de la ligne bancaire}.
+    """
+    bank_amounts = bank["amount_cents"].abs().to_numpy(dtype=float, na_value=np.nan) / 100
+    index = TransactionIndex(bank["date"].to_numpy(), bank_amounts)
+    receipt_ids, bank_ids = [], []
+    for receipt_id, (receipt_date, cents) in enumerate(zip(receipts["date"], receipts["amount_cents"])):
+        if pd.isna(receipt_date) or pd.isna(cents):
+            continue
+        candidates = index.candidates(receipt_date, cents / 100, days_delta, tolerance)
+        if candidates is not None and len(candidates):
+            receipt_ids.append(np.full(len(candidates), receipt_id, dtype=np.int64))
+            bank_ids.append(candidates)
+    if not receipt_ids:
+        return {"edges": 0, "pairs": {}}
+    receipt_ids = np.concatenate(receipt_ids)
+    bank_ids = np.concatenate(bank_ids)
+
+    labels = bank["label"].to_numpy(dtype=object)
+    vendors = receipts["vendor"].to_numpy(dtype=object)
+    scores = VendorIndex(labels).score_pairs(vendors[receipt_ids], labels[bank_ids])
+    keep = scores >= similarity_threshold
+    receipt_ids, bank_ids = receipt_ids[keep], bank_ids[keep]
+    selected, _ = assign(receipt_ids, bank_ids, scores[keep])
+    return {"edges": int(len(keep)), "pairs": dict(zip(receipt_ids[selected].tolist(), bank_ids[selected].tolist()))}
+
+
+def run_receipt_matcher(dataset: Dict[str, Any], output_dir: str) -> Optional[Dict[str, Any]]:
+    """ReceiptMatcher de l'application, s'il est disponible"""
+    try:
+        from logic.receipt_matcher import ReceiptMatcher
+    except ImportError:
+        return None
+    matcher = ReceiptMatcher(
+        receipts_json_path=dataset["receipts_json"],
+        bank_statements_dir=dataset["statements_dir"],
+        output_dir=output_dir,
+        days_delta=3,
+        amount_tolerance_tier1=0.0,
+        amount_tolerance_tier2=0.02,
+        similarity_threshold=30,
+    )
+    return matcher.run_complete_process()
+
+
+def bench_size(rows: int, seed: int, scalar_limit: int, workdir: Path) -> Dict[str, Dict[str, float]]:
+    results = {}
+    dataset, results["generate"] = measure(lambda: generate(str(workdir / "data"), rows, seed=seed))
+
+    ingestor = StatementIngestor(cache_dir=str(workdir / "cache"))
+    bank, results["ingest_cold"] = measure(lambda: ingestor.load_directory(dataset["statements_dir"]))
+    _, results["ingest_warm"] = measure(lambda: ingestor.load_directory(dataset["statements_dir"]))
+
+    with open(dataset["receipts_json"], "r", encoding="utf-8") as f:
+        records = json.load(f)
+    dates = pd.Series([r["date"] for r in records])
+    totals = pd.Series([r["total"] for r in records])
+    sample = min(scalar_limit, len(records))
+
+    _, results["parse_date_scalar"] = measure(lambda: [Utils.parse_date(d) for d in dates[:sample]])
+    _, results["parse_date_series"] = measure(lambda: Utils.parse_date_series(dates))
+    _, results["extract_amount_scalar"] = measure(
+        lambda: [Utils.extract_amount_from_string(t) for t in totals[:sample]])
+    _, results["extract_amount_series"] = measure(lambda: Utils.extract_amount_series(totals))
+
+    # Table colonne des factures (centimes, datetime64, vendeurs internés), partagée par les étapes suivantes
+    receipts, results["receipts_table"] = measure(lambda: receipts_table(records))
+    matching, results["matching"] = measure(lambda: run_matching(bank, receipts))
+    _, results["results_view"] = measure(
+        lambda: ResultsView(results_from_pairs(receipts, bank, matching["pairs"])).query(True, "a", "bank_cents"))
+
+    # Qualité par rapport aux correspondances attendues
+    with open(Path(dataset["statements_dir"]).parent / "expected_matches.json", "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    bank_keys = list(zip(bank["source_file"].astype(str), bank["row"]))
+    correct = sum(
+        1 for receipt_id, bank_id in matching["pairs"].items()
+        if expected.get(Path(records[receipt_id]["receipt_filename"]).stem)
+        == dict(zip(("source_file", "row"), bank_keys[bank_id]))
+    )
+    results["matching"]["precision"] = round(correct / max(1, len(matching["pairs"])), 3)
+    results["matching"]["recall"] = round(correct / max(1, len(expected)), 3)
+
+    # Graphe des candidats aux bornes larges, puis nouveau matching pour d'autres paramètres
+    graph, results["candidate_graph_build"] = measure(lambda: CandidateGraph.load(
+        dataset["receipts_json"], dataset["statements_dir"], cache_dir=str(workdir / "graphs"), ingestor=ingestor))
+    results["candidate_graph_build"]["edges"] = len(graph)
+    _, results["candidate_graph_load"] = measure(lambda: CandidateGraph.load(
+        dataset["receipts_json"], dataset["statements_dir"], cache_dir=str(workdir / "graphs"), ingestor=ingestor))
+    _, results["candidate_graph_rematch"] = measure(lambda: graph.match({
+        "days_delta": 3, "amount_tolerance_tier1": 0.0, "amount_tolerance_tier2": 0.02, "similarity_threshold": 60}))
+
+    store_path = workdir / "store" / "receipts.jsonl"
+    _, results["receipt_store_append"] = measure(lambda: ReceiptStore(str(store_path)).append(records))
+
+    matcher_result, stats = measure(lambda: run_receipt_matcher(dataset, str(workdir / "matching")))
+    if matcher_result is not None:
+        results["receipt_matcher"] = stats
+    return results
+
+
+def bench_extraction(receipts: int, workers: int, latency: float, workdir: Path) -> Dict[str, float]:
+    """Extraction concurrente contre le faux serveur (latence simulée)"""
+    images = []
+    for i in range(receipts):
+        path = workdir / f"receipt_{i:05d}.jpg"
+        path.write_bytes(b"\xff\xd8" + bytes(100_000))
+        images.append(path)
+
+    prompt = "Analysez cette facture et extrayez les informations au format JSON."
+    with FakeMistralServer(latency=latency) as server:
+        client = MistralVisionClient(api_key="fake", base_url=server.url)
+        engine = ExtractionEngine(max_workers=workers, requests_per_second=1000, tokens_per_minute=10 ** 9,
+                                  backoff_base=0.05)
+        results, stats = measure(lambda: engine.run(images, lambda path: client.extract(str(path), prompt)))
+    stats["receipts_per_second"] = round(receipts / stats["seconds"], 2)
+    stats["errors"] = sum(1 for r in results if not r.success)
+    return stats
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float):
+    """Liste des régressions (taille, étape, mesure, valeur, baseline)"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, stats in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference:
+                continue
+            for metric, min_delta in (("seconds", MIN_SECONDS_DELTA), ("peak_mb", MIN_MEMORY_DELTA_MB)):
+                value, base = stats.get(metric), reference.get(metric)
+                if value is None or base is None:
+                    continue
+                if value > base * (1 + tolerance) and value - base > min_delta:
+                    regressions.append((size, stage, metric, value, base))
+    return regressions
+
+
+def print_results(results: Dict[str, Any], baseline: Dict[str, Any]):
+    print(f"{'taille':>8} {'étape':<24} {'durée (s)':>10} {'baseline':>9} {'pic (Mo)':>9} {'baseline':>9}")
+    for size, stages in results.items():
+        for stage, stats in stages.items():
+            reference = baseline.get(size, {}).get(stage, {})
+            base_seconds = reference.get("seconds")
+            base_memory = reference.get("peak_mb")
+            print(f"{size:>8} {stage:<24} {stats['seconds']:>10.3f} "
+                  f"{'-' if base_seconds is None else f'{base_seconds:.3f}':>9} "
+                  f"{stats['peak_mb']:>9.1f} {'-' if base_memory is None else f'{base_memory:.1f}':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scalar-limit", type=int, default=100000,
+                        help="nombre maximum de valeurs pour les fonctions scalaires de Utils")
+    parser.add_argument("--extraction-receipts", type=int, default=50)
+    parser.add_argument("--extraction-workers", type=int, default=8)
+    parser.add_argument("--extraction-latency", type=float, default=0.2)
+    parser.add_argument("--skip-extraction", action="store_true")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="écart relatif toléré avant régression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", default="output/benchmarks/last_run.json")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    tracemalloc.start()
+    results = {}
+    try:
+        for rows in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                results[str(rows)] = bench_size(rows, args.seed, args.scalar_limit, Path(tmp))
+        if not args.skip_extraction:
+            with tempfile.TemporaryDirectory() as tmp:
+                results["extraction"] = {"extract": bench_extraction(
+                    args.extraction_receipts, args.extraction_workers, args.extraction_latency, Path(tmp))}
+    finally:
+        tracemalloc.stop()
+
+    print_results(results, baseline)
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        # Les tailles absentes de cette exécution sont conservées
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"meta": report["meta"], "results": {**baseline, **results}}, f, indent=2)
+        print(f"Baseline mise à jour : {baseline_path}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for size, stage, metric, value, base in regressions:
+        print(f"⚠️ Régression {size}/{stage} : {metric} {value} (baseline {base})")
+    if not baseline:
+        print(f"Aucune baseline ({baseline_path}) : relancer avec --update-baseline pour l'enregistrer")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
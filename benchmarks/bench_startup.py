@@ -0,0 +1,95 @@
+"""
+Démarrage de l'interface Streamlit : temps jusqu'au premier affichage et
+coût d'une réexécution du script (AppTest, sans navigateur).
+
+    python -m benchmarks.bench_startup --runs 3 --reruns 20
+
+Chaque mesure est faite dans un processus neuf (imports à froid), depuis un
+dossier temporaire : les workspaces créés par l'application n'y survivent pas.
+La liste des modules lourds chargés après le premier affichage permet de
+vérifier qu'ils ne sont importés qu'à l'usage.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "PIL", "logic.receipt_extraction", "logic.receipt_matcher",
+                 "logic.results_view"]
+
+# Script exécuté dans le processus de mesure
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app!r}, default_timeout=120)
+imported = time.perf_counter()
+app.run()
+first_paint = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+reruns = []
+for _ in range({reruns}):
+    rerun_start = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - rerun_start)
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "first_paint_seconds": first_paint - start,
+    "rerun_seconds": reruns,
+    "heavy_modules": heavy,
+    "exceptions": [str(e.value) for e in app.exception],
+}}))
+"""
+
+
+def probe(reruns: int) -> dict:
+    """Mesure un démarrage à froid dans un processus et un dossier neufs"""
+    code = PROBE.format(app=str(APP_PATH), heavy=HEAVY_MODULES, reruns=reruns)
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        Path(workdir, ".env").write_text("MISTRAL_API_KEY=votre_clé_api_ici\n", encoding="utf-8")
+        completed = subprocess.run([sys.executable, "-c", code], cwd=workdir, capture_output=True, text=True,
+                                   check=True, env={**os.environ, "PYTHONPATH": str(APP_PATH.parent)})
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="démarrages à froid mesurés")
+    parser.add_argument("--reruns", type=int, default=20, help="réexécutions mesurées par démarrage")
+    parser.add_argument("--output", default="output/benchmarks/startup.json")
+    args = parser.parse_args()
+
+    samples = [probe(args.reruns) for _ in range(args.runs)]
+    reruns = sorted(s for sample in samples for s in sample["rerun_seconds"])
+    report = {
+        "import_seconds": statistics.median(s["import_seconds"] for s in samples),
+        "first_paint_seconds": statistics.median(s["first_paint_seconds"] for s in samples),
+        "rerun_p50_seconds": statistics.median(reruns) if reruns else None,
+        "rerun_p95_seconds": reruns[int(0.95 * (len(reruns) - 1))] if reruns else None,
+        "heavy_modules": sorted({name for s in samples for name in s["heavy_modules"]}),
+        "exceptions": sorted({e for s in samples for e in s["exceptions"]}),
+    }
+
+    print(f"{'import streamlit + AppTest':<30} {report['import_seconds'] * 1000:>8.0f} ms")
+    print(f"{'premier affichage':<30} {report['first_paint_seconds'] * 1000:>8.0f} ms")
+    if reruns:
+        print(f"{'réexécution p50 / p95':<30} {report['rerun_p50_seconds'] * 1000:>8.0f} / {report['rerun_p95_seconds'] * 1000:.0f} ms")
+    print(f"{'modules lourds chargés':<30} {', '.join(report['heavy_modules']) or 'aucun'}")
+    for error in report["exceptions"]:
+        print(f"⚠️ Exception dans l'application : {error}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Faux serveur HTTP compatible avec l'endpoint chat/completions de Mistral.
+
+Permet de tester et de mesurer l'extraction sans appeler la vraie API :
+
+    python -m benchmarks.fake_mistral_server --port 8765 --latency 0.5
+    MISTRAL_API_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+FAKE_RECEIPT = {
+    "merchant": {"name": "CARREFOUR MARKET", "address": "12 rue de la Paix, Paris"},
+    "date": "2024-03-12",
+    "total": "42,50",
+    "items": [],
+    "payment_method": "CB",
+}
+
+
+class FakeMistralHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+
+        time.sleep(server.latency)
+
+        if random.random() < server.error_rate:
+            status = random.choice([429, 503])
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({
+            "id": "fake",
+            "object": "chat.completion",
+            "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps(FAKE_RECEIPT)}}],
+            "usage": {"prompt_tokens": 1200, "completion_tokens": 150, "total_tokens": 1350},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeMistralServer:
+    """Serveur de test lancé dans un thread (utilisable comme context manager)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, error_rate: float = 0.0):
+        self.httpd = ThreadingHTTPServer((host, port), FakeMistralHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.request_count = 0
+        self.httpd.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Faux serveur API Mistral")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeMistralServer(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Faux serveur Mistral sur {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,181 @@
+"""
+Générateur de données synthétiques reproductibles (graine) : relevés bancaires
+CSV au format français et factures extraites (all_receipts.json).
+
+    python -m benchmarks.synthetic_data --rows 100000 --output output/synthetic
+
+Les relevés utilisent le point-virgule, la virgule décimale, des colonnes
+Débit/Crédit et des libellés bruités (« CB CARREFOUR MARKET PARIS 12/03 »).
+Une partie des factures correspond à une ligne bancaire (montant identique,
+date décalée de quelques jours, nom de vendeur écrit autrement) ; la
+correspondance attendue est écrite dans expected_matches.json.
+Les factures suivent le format renvoyé par le faux serveur Mistral.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+# (nom sur la facture, nom dans le libellé bancaire)
+VENDORS = [
+    ("Carrefour Market", "CARREFOUR MARKET"),
+    ("Boulangerie Paul", "PAUL"),
+    ("SNCF Connect", "SNCF VOYAGEURS"),
+    ("TotalEnergies", "TOTALENERGIES"),
+    ("Fnac", "FNAC DARTY"),
+    ("Leroy Merlin", "LEROY MERLIN"),
+    ("Monoprix", "MONOPRIX"),
+    ("Picard Surgelés", "PICARD SURGELES"),
+    ("Amazon", "AMAZON EU SARL"),
+    ("Decathlon", "DECATHLON"),
+    ("Uber", "UBER BV"),
+    ("Ikea", "IKEA"),
+    ("Pharmacie du Centre", "PHARMACIE DU CENTRE"),
+    ("Restaurant Le Bistrot", "LE BISTROT"),
+    ("Orange", "ORANGE SA"),
+    ("La Poste", "LA POSTE"),
+    ("Boulanger", "BOULANGER"),
+    ("Intermarché", "INTERMARCHE"),
+    ("Hôtel Ibis", "IBIS HOTEL"),
+    ("Station Esso", "ESSO"),
+]
+PREFIXES = ["CB", "PAIEMENT CB", "CARTE X4821", "ACHAT CB", "PRLV SEPA", "TPE"]
+CITIES = ["PARIS", "LYON", "MARSEILLE", "LILLE", "NANTES", "BORDEAUX", "TOULOUSE", "RENNES", ""]
+RECEIPT_DATE_FORMATS = ["%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y"]
+
+
+def french_amounts(cents: np.ndarray) -> pd.Series:
+    """Centimes -> texte à virgule décimale (« 1234,56 »)"""
+    cents = pd.Series(np.abs(cents))
+    return (cents // 100).astype(str) + "," + (cents % 100).astype(str).str.zfill(2)
+
+
+def generate(output_dir: str, rows: int, seed: int = 42, receipt_ratio: float = 0.3, match_ratio: float = 0.8,
+             statements: int = 1, encoding: str = "cp1252") -> Dict[str, Any]:
+    """
+    Écrit `statements` relevés CSV totalisant `rows` transactions dans
+    output_dir/bank_statements et les factures dans output_dir/receipts.
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    output_dir = Path(output_dir)
+    statements_dir = output_dir / "bank_statements"
+    receipts_dir = output_dir / "receipts"
+    statements_dir.mkdir(parents=True, exist_ok=True)
+    receipts_dir.mkdir(parents=True, exist_ok=True)
+
+    # Transactions bancaires
+    vendor_ids = rng.integers(0, len(VENDORS), rows)
+    days = rng.integers(0, 365, rows)
+    dates = pd.to_datetime("2024-01-01") + pd.to_timedelta(days, unit="D")
+    cents = np.rint(rng.lognormal(3.3, 1.0, rows) * 100).astype(np.int64) + 1
+    credit = rng.random(rows) < 0.03
+
+    bank_names = np.array([bank for _, bank in VENDORS], dtype=object)[vendor_ids]
+    prefixes = np.array(PREFIXES, dtype=object)[rng.integers(0, len(PREFIXES), rows)]
+    cities = np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), rows)]
+    labels = (pd.Series(prefixes) + " " + pd.Series(bank_names) + " " + pd.Series(cities) + " "
+              + pd.Series(dates.strftime("%d/%m"))).str.replace("  ", " ", regex=False)
+    labels[credit] = "VIR SEPA REMBOURSEMENT " + pd.Series(bank_names[credit]).to_numpy()
+
+    amounts = french_amounts(cents)
+    table = pd.DataFrame({
+        "Date opération": dates.strftime("%d/%m/%Y"),
+        "Libellé": labels,
+        "Débit": np.where(credit, "", "-" + amounts),
+        "Crédit": np.where(credit, amounts, ""),
+    })
+
+    statement_files = []
+    for i, part in enumerate(np.array_split(np.arange(rows), max(1, statements))):
+        path = statements_dir / f"releve_{i + 1:03d}.csv"
+        table.iloc[part].to_csv(path, sep=";", index=False, encoding=encoding)
+        statement_files.append((path.name, int(part[0]) if len(part) else 0))
+
+    # Factures : une partie correspond à une transaction de débit
+    receipts_count = int(rows * receipt_ratio)
+    matched_count = int(receipts_count * match_ratio)
+    debit_rows = np.flatnonzero(~credit)
+    matched_rows = rng.choice(debit_rows, size=min(matched_count, len(debit_rows)), replace=False)
+    matched_count = len(matched_rows)
+    unmatched_count = receipts_count - matched_count
+
+    receipt_vendor_ids = np.concatenate([vendor_ids[matched_rows], rng.integers(0, len(VENDORS), unmatched_count)])
+    receipt_days = np.concatenate([
+        days[matched_rows] - rng.integers(0, 4, matched_count),
+        rng.integers(0, 365, unmatched_count),
+    ])
+    receipt_cents = np.concatenate([
+        cents[matched_rows],
+        np.rint(rng.lognormal(3.3, 1.0, unmatched_count) * 100).astype(np.int64) + 1,
+    ])
+    receipt_dates = pd.to_datetime("2024-01-01") + pd.to_timedelta(receipt_days, unit="D")
+    date_formats = rng.integers(0, len(RECEIPT_DATE_FORMATS), receipts_count)
+    receipt_date_text = pd.Series(receipt_dates.strftime(RECEIPT_DATE_FORMATS[0]))
+    for format_id, date_format in enumerate(RECEIPT_DATE_FORMATS[1:], start=1):
+        mask = date_formats == format_id
+        receipt_date_text[mask] = receipt_dates[mask].strftime(date_format)
+    euro_suffix = np.where(rng.random(receipts_count) < 0.5, " €", "")
+    totals = french_amounts(receipt_cents) + euro_suffix
+
+    order = rng.permutation(receipts_count).tolist()
+    vendor_names = np.array([name for name, _ in VENDORS], dtype=object)[receipt_vendor_ids].tolist()
+    receipt_date_text = receipt_date_text.tolist()
+    totals = totals.tolist()
+    first_rows = [first_row for _, first_row in statement_files]
+    file_ids = (np.searchsorted(first_rows, matched_rows, side="right") - 1).tolist()
+    matched_rows = matched_rows.tolist()
+
+    receipts, expected = [], {}
+    for number, position in enumerate(order):
+        filename = f"receipt_{number:07d}.jpg"
+        receipts.append({
+            "receipt_filename": filename,
+            "merchant": {"name": vendor_names[position]},
+            "date": receipt_date_text[position],
+            "total": totals[position],
+            "payment_method": "CB",
+        })
+        if position < matched_count:
+            name, first_row = statement_files[file_ids[position]]
+            expected[Path(filename).stem] = {"source_file": name, "row": matched_rows[position] - first_row}
+
+    receipts_path = receipts_dir / "all_receipts.json"
+    with open(receipts_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(receipts, ensure_ascii=False))
+    with open(output_dir / "expected_matches.json", "w", encoding="utf-8") as f:
+        f.write(json.dumps(expected))
+
+    return {
+        "rows": rows,
+        "receipts": receipts_count,
+        "expected_matches": matched_count,
+        "statements": [str(statements_dir / name) for name, _ in statement_files],
+        "statements_dir": str(statements_dir),
+        "receipts_json": str(receipts_path),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--output", default="output/synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--receipt-ratio", type=float, default=0.3)
+    parser.add_argument("--match-ratio", type=float, default=0.8)
+    parser.add_argument("--statements", type=int, default=1)
+    args = parser.parse_args()
+
+    summary = generate(args.output, args.rows, args.seed, args.receipt_ratio, args.match_ratio, args.statements)
+    print(f"{summary['rows']} transactions, {summary['receipts']} factures "
+          f"({summary['expected_matches']} correspondances attendues) en {summary['seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
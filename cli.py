@@ -0,0 +1,93 @@
+"""
+Traitement sans interface (analyse -> matching -> enrichissement) d'un ou
+plusieurs workspaces, en parallèle dans un pool de processus.
+
+    python cli.py clients/* --workers 4
+    python cli.py clients/dupont --skip-analysis --days-delta 5
+
+Chaque workspace suit l'arborescence de l'application (uploads/receipts,
+uploads/bank_statements, uploads/prompts/prompt.txt, output/...). Les
+paramètres par défaut sont ceux de l'onglet Matching.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from config import Config
+from logic.pipeline import run_workspace
+
+
+def parse_args(argv=None):
+    defaults = Config.MATCHING_DEFAULTS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workspaces", nargs="+", help="dossiers racine des workspaces")
+    parser.add_argument("--workers", type=int, default=4, help="nombre de workspaces traités en parallèle")
+    parser.add_argument("--skip-analysis", action="store_true", help="réutiliser les factures déjà analysées")
+    parser.add_argument("--env", default=".env", help="fichier .env contenant MISTRAL_API_KEY")
+    parser.add_argument("--preprocess-workers", type=int, default=1,
+                        help="processus de pré-traitement d'images par workspace")
+    parser.add_argument("--days-delta", type=int, default=defaults["days_delta"])
+    parser.add_argument("--similarity-threshold", type=int, default=defaults["similarity_threshold"])
+    parser.add_argument("--amount-tolerance-tier1", type=float, default=defaults["amount_tolerance_tier1"])
+    parser.add_argument("--amount-tolerance-tier2", type=float, default=defaults["amount_tolerance_tier2"])
+    parser.add_argument("--report", default="output/cli_report.json", help="rapport JSON récapitulatif")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    matching_params = {
+        "days_delta": args.days_delta,
+        "amount_tolerance_tier1": args.amount_tolerance_tier1,
+        "amount_tolerance_tier2": args.amount_tolerance_tier2,
+        "similarity_threshold": args.similarity_threshold,
+    }
+    workspaces = [w for w in dict.fromkeys(args.workspaces) if Path(w).is_dir()]
+    for missing in sorted(set(args.workspaces) - set(workspaces)):
+        print(f"⚠️ Workspace ignoré (dossier introuvable) : {missing}", file=sys.stderr)
+
+    start = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(workspaces) or 1))) as executor:
+        futures = {
+            executor.submit(run_workspace, workspace, matching_params, args.skip_analysis, args.env,
+                            args.preprocess_workers): workspace
+            for workspace in workspaces
+        }
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                # Un workspace en échec n'interrompt pas les autres
+                summary = {"workspace": futures[future], "success": False, "seconds": None,
+                           "messages": [{"stage": "cli", "level": "error", "message": str(e)}]}
+            summaries.append(summary)
+            status = "✅" if summary["success"] else "❌"
+            detail = (f"{summary['matched']}/{summary['total']} factures matchées" if summary["success"]
+                      else next((m["message"] for m in reversed(summary["messages"]) if m["level"] == "error"), "échec"))
+            print(f"{status} {summary['workspace']} : {detail}", flush=True)
+
+    summaries.sort(key=lambda s: s["workspace"])
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": matching_params,
+        "skip_analysis": args.skip_analysis,
+        "seconds": time.perf_counter() - start,
+        "succeeded": sum(1 for s in summaries if s["success"]),
+        "failed": sum(1 for s in summaries if not s["success"]),
+        "workspaces": summaries,
+    }
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{report['succeeded']}/{len(summaries)} workspaces traités en {report['seconds']:.1f} s — rapport : {report_path}")
+    return 0 if not report["failed"] and summaries else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import os
+
+
+class Config:
+    """Configuration centrale de l'application"""
+
+    # Dossiers utilisés par l'application
+    UPLOAD_FOLDERS = {
+        "receipts": "uploads/receipts",
+        "bank_statements": "uploads/bank_statements",
+        "prompts": "uploads/prompts",
+        "output_receipts": "output/receipts",
+        "output_matching": "output/matching",
+    }
+
+    # Formats de date reconnus (du plus courant au moins courant)
+    DATE_FORMATS = [
+        "%Y-%m-%d",
+        "%d/%m/%Y",
+        "%d-%m-%Y",
+        "%d.%m.%Y",
+        "%d/%m/%y",
+        "%Y/%m/%d",
+    ]
+
+    # Paramètres de matching par défaut (onglet Matching et ligne de commande)
+    MATCHING_DEFAULTS = {
+        "days_delta": 3,
+        "similarity_threshold": 85,
+        "amount_tolerance_tier1": 0.05,
+        "amount_tolerance_tier2": 0.10,
+    }
+
+    # API Mistral
+    MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai")
+    MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "pixtral-12b-2409")
+    MISTRAL_TIMEOUT = 120
+
+    # Extraction concurrente des factures
+    EXTRACTION_WORKERS = 4
+    EXTRACTION_REQUESTS_PER_SECOND = 1.0
+    EXTRACTION_TOKENS_PER_MINUTE = 500000
+    EXTRACTION_MAX_RETRIES = 5
+    EXTRACTION_BACKOFF_BASE = 1.0
+    EXTRACTION_BACKOFF_MAX = 60.0
+    # Estimation du coût en tokens d'une image (avant de connaître l'usage réel)
+    EXTRACTION_IMAGE_TOKEN_ESTIMATE = 1500
+
+    # Cache des extractions (clé : image + prompt + modèle)
+    EXTRACTION_CACHE_DIR = "output/cache/extractions"
+    EXTRACTION_CACHE_MAX_BYTES = 500 * 1024 * 1024
+    EXTRACTION_CACHE_MAX_ENTRIES = 100000
+    EXTRACTION_CACHE_MAX_AGE_DAYS = 90
+    # Synchronisation disque de chaque extraction reçue (reprise d'un lot interrompu par une coupure)
+    EXTRACTION_CACHE_FSYNC = True
+
+    # Stockage incrémental des factures extraites (JSONL en ajout seul)
+    RECEIPT_STORE_PATH = "output/receipts/receipts.jsonl"
+    # Champs possibles contenant le nom du fichier d'une facture
+    RECEIPT_KEY_FIELDS = ["receipt_filename", "filename", "file_name", "image_path"]
+
+    # Similarité des noms de vendeurs
+    VENDOR_NGRAM_SIZE = 3
+    VENDOR_CACHE_SIZE = 65536
+    # Nombre de vecteurs de scores conservés par index (un par nom de facture)
+    VENDOR_SCORE_CACHE_SIZE = 1024
+    # Nombre minimum de n-grammes pour accepter l'inclusion d'un nom dans l'autre
+    VENDOR_MIN_NGRAMS_FOR_OVERLAP = 5
+    # Mots ajoutés par la banque au libellé, sans rapport avec le vendeur
+    VENDOR_NOISE_TOKENS = [
+        "CB", "CARTE", "PAIEMENT", "ACHAT", "PRLV", "PRELEVEMENT", "SEPA",
+        "VIR", "VIREMENT", "RETRAIT", "DAB", "FACTURE", "FACT", "TPE", "SARL", "SAS",
+    ]
+
+    # Affectation factures / lignes bancaires
+    ASSIGNMENT_MODES = {"greedy": "Glouton (premier bon score)", "optimal": "Optimal (affectation globale)"}
+    ASSIGNMENT_DEFAULT_MODE = "greedy"
+    # Au-delà de cette taille (factures x lignes), une composante est affectée en glouton
+    ASSIGNMENT_MAX_COMPONENT_CELLS = 250000
+
+    # Graphe des candidats, calculé une fois aux bornes les plus larges des curseurs du matching
+    CANDIDATE_GRAPH_LIMITS = {
+        "days_delta": 10,
+        "amount_tolerance": 0.20,
+        "similarity_threshold": 50,
+    }
+    CANDIDATE_GRAPH_CACHE_DIR = "output/cache/candidate_graphs"
+    # Champs des factures extraites (« a.b » : champ b de l'objet a), par ordre de priorité
+    RECEIPT_DATE_FIELDS = ["date", "receipt_date", "transaction_date"]
+    RECEIPT_AMOUNT_FIELDS = ["total", "total_amount", "amount", "montant"]
+    RECEIPT_VENDOR_FIELDS = ["merchant.name", "vendor", "vendor_name", "merchant"]
+
+    # Balayage des paramètres de matching (valeurs proposées dans l'onglet Matching)
+    SWEEP_GRID = {
+        "days_delta": [1, 2, 3, 5, 7, 10],
+        "amount_tolerance_tier1": [0.0, 0.02, 0.05],
+        "amount_tolerance_tier2": [0.05, 0.10, 0.20],
+        "similarity_threshold": [60, 70, 80, 85, 90],
+    }
+    SWEEP_WORKERS = os.cpu_count() or 2
+    # Nombre maximum de combinaisons évaluées par balayage
+    SWEEP_MAX_POINTS = 5000
+
+    # Ingestion des relevés bancaires
+    STATEMENT_CACHE_DIR = "output/cache/statements"
+    STATEMENT_CHUNK_ROWS = 100000
+    STATEMENT_ENCODINGS = ["utf-8-sig", "cp1252"]
+    # Noms de colonnes reconnus (en minuscules, sans accents)
+    STATEMENT_DATE_COLUMNS = ["date", "date operation", "date op", "date de l'operation", "date comptable", "date valeur"]
+    STATEMENT_LABEL_COLUMNS = ["libelle", "libelle operation", "description", "label", "vendeur", "intitule"]
+    STATEMENT_AMOUNT_COLUMNS = ["montant", "montant eur", "montant (eur)", "amount", "somme"]
+    STATEMENT_DEBIT_COLUMNS = ["debit", "debit eur", "debit (eur)"]
+    STATEMENT_CREDIT_COLUMNS = ["credit", "credit eur", "credit (eur)"]
+
+    # Tâches de fond (import, doublons, analyse, matching, grille de paramètres).
+    # Le pool est unique pour le serveur et partagé par toutes les sessions :
+    # au-delà de JOB_WORKERS tâches simultanées, les suivantes attendent leur tour
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_POLL_INTERVAL = 1.0
+    # Durée de conservation des tâches terminées en mémoire (secondes)
+    JOB_RETENTION_SECONDS = 3600
+
+    # Import en masse des factures (archive ZIP ou dossier du serveur)
+    BULK_ALLOWED_EXTENSIONS = [".jpg", ".jpeg", ".png"]
+    # Dossiers du serveur depuis lesquels un import est autorisé
+    BULK_IMPORT_ROOTS = [os.getenv("BULK_IMPORT_ROOT", "imports")]
+    BULK_MAX_FILE_BYTES = 50 * 1024 * 1024
+    # Fréquence d'écriture du manifeste des fichiers téléchargés pendant un import
+    BULK_MANIFEST_EVERY = 500
+
+    # Pré-traitement des images avant envoi à l'API
+    PREPROCESS_ENABLED = True
+    PREPROCESSED_DIR = "output/receipts_preprocessed"
+    PREPROCESS_CACHE_DIR = "output/cache/preprocessed"
+    PREPROCESS_REPORT = "output/receipts/preprocessing_report.json"
+    PREPROCESS_MAX_EDGE = 1600
+    PREPROCESS_JPEG_QUALITY = 80
+    PREPROCESS_GRAYSCALE = True
+    PREPROCESS_WORKERS = os.cpu_count() or 2
+
+    # Détection des factures en double (hash perceptuel) avant l'extraction
+    DUPLICATE_DETECTION_ENABLED = True
+    DUPLICATE_INDEX_PATH = "output/receipts/duplicates.json"
+    DUPLICATE_HASH_SIZE = 16
+    # Écart maximal (en bits sur DUPLICATE_HASH_SIZE ** 2) entre deux copies d'une même facture
+    DUPLICATE_MAX_DISTANCE = 20
+    DUPLICATE_WORKERS = os.cpu_count() or 2
+
+    # Vignettes des factures (onglet Résultats)
+    THUMBNAIL_DIR = "output/cache/thumbnails"
+    THUMBNAIL_SIZE = (360, 360)
+    THUMBNAIL_FORMAT = "WEBP"
+    THUMBNAIL_QUALITY = 70
+    THUMBNAIL_WORKERS = 2
+
+    # Onglet Résultats
+    RESULTS_PAGE_SIZES = [25, 50, 100, 250]
+    # Nombre maximum de factures proposées dans le sélecteur d'image
+    RESULTS_SELECTOR_LIMIT = 200
+
+    # Logs structurés
+    LOG_BUFFER_SIZE = 2000
+    LOG_SPILL_DIR = "output/logs"
+    LOG_SPILL_MAX_BYTES = 10 * 1024 * 1024
+    LOG_PAGE_SIZE = 100
+    # Entrées conservées par tâche de fond en attente de recopie dans la session
+    JOB_LOG_LIMIT = 5000
+
+    # Télémétrie (rapport JSON et fichier Prometheus à côté de output/matching)
+    TELEMETRY_DIR = "output/telemetry"
+    TELEMETRY_METRIC_PREFIX = "bill_rec"
+    TELEMETRY_BUCKETS = {
+        "api_latency_seconds": [0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60],
+        "api_payload_bytes": [16384, 65536, 262144, 1048576, 4194304, 16777216],
+        "api_tokens": [500, 1000, 2000, 4000, 8000, 16000],
+        "api_retries": [0, 1, 2, 3, 5],
+    }
+
+    # Workspaces isolés (un par session, ou partagé par nom de projet)
+    WORKSPACES_DIR = "workspaces"
+    WORKSPACE_MAX_AGE_HOURS = 24
+    WORKSPACE_CLEANUP_INTERVAL = 600
+    FILE_LOCK_TIMEOUT = 30
+
+    # Mesure des temps de rendu de l'interface (réexécutions conservées par session)
+    RENDER_TIMINGS_LIMIT = 50
@@ -0,0 +1,185 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy est optionnel
+    linear_sum_assignment = None
+
+
+# Coût des paires absentes du graphe (jamais retenues)
+_FORBIDDEN = 1e12
+
+
+def connected_components(receipt_ids: np.ndarray, bank_ids: np.ndarray) -> np.ndarray:
+    """
+    Étiquette de composante connexe de chaque arête du graphe biparti
+    (union-find sur les factures et les lignes bancaires).
+    """
+    receipt_nodes, receipt_local = np.unique(receipt_ids, return_inverse=True)
+    bank_nodes, bank_local = np.unique(bank_ids, return_inverse=True)
+    offset = len(receipt_nodes)
+    parent = list(range(offset + len(bank_nodes)))
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for r, b in zip(receipt_local.tolist(), bank_local.tolist()):
+        root_r, root_b = find(r), find(b + offset)
+        if root_r != root_b:
+            parent[root_b] = root_r
+
+    return np.array([find(r) for r in receipt_local.tolist()], dtype=np.int64)
+
+
+def hungarian(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Affectation de coût minimal d'une matrice rectangulaire (lignes <= colonnes
+    après transposition éventuelle). Utilise scipy si disponible.
+    """
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    transposed = cost.shape[0] > cost.shape[1]
+    matrix = cost.T if transposed else cost
+    n, m = matrix.shape
+
+    # Algorithme hongrois par potentiels, O(n^2 m)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            current = matrix[i0 - 1] - u[i0] - v[1:]
+            better = free & (current < minv[1:])
+            minv[1:][better] = current[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j] != 0]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+def greedy_assignment(receipt_ids: Sequence[int], bank_ids: Sequence[int], scores: Sequence[float]) -> List[int]:
+    """Positions des arêtes retenues en prenant d'abord les meilleurs scores"""
+    order = np.argsort(-np.asarray(scores, dtype=float), kind="stable")
+    used_receipts, used_banks = set(), set()
+    selected = []
+    for position in order.tolist():
+        receipt, bank = receipt_ids[position], bank_ids[position]
+        if receipt in used_receipts or bank in used_banks:
+            continue
+        used_receipts.add(receipt)
+        used_banks.add(bank)
+        selected.append(position)
+    return selected
+
+
+def assign(receipt_ids: Sequence[int], bank_ids: Sequence[int], scores: Sequence[float],
+           mode: str = Config.ASSIGNMENT_DEFAULT_MODE,
+           max_component_cells: int = Config.ASSIGNMENT_MAX_COMPONENT_CELLS) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    Affectation un-à-un factures / lignes bancaires à partir des arêtes candidates.
+
+    Les scores doivent être plus élevés pour les meilleures paires (par exemple
+    les candidats tier1 au-dessus des tier2). En mode "optimal", chaque
+    composante connexe du graphe maximise d'abord le nombre de factures
+    matchées, puis la somme des scores à nombre égal ; les composantes trop
+    grandes sont traitées en glouton.
+
+    Renvoie (positions des arêtes retenues, statistiques).
+    """
+    receipt_ids = np.asarray(receipt_ids, dtype=np.int64)
+    bank_ids = np.asarray(bank_ids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=float)
+    stats = {"mode": mode, "edges": int(len(scores)), "components": 0,
+             "optimal_components": 0, "greedy_components": 0, "largest_component": 0}
+
+    if mode not in Config.ASSIGNMENT_MODES:
+        raise ValueError(f"Mode d'affectation inconnu : {mode}")
+    if len(scores) == 0:
+        return [], stats
+    if mode == "greedy":
+        return sorted(greedy_assignment(receipt_ids.tolist(), bank_ids.tolist(), scores)), stats
+
+    labels = connected_components(receipt_ids, bank_ids)
+    components: Dict[int, List[int]] = {}
+    for position, label in enumerate(labels.tolist()):
+        components.setdefault(label, []).append(position)
+
+    receipt_list, bank_list, score_list = receipt_ids.tolist(), bank_ids.tolist(), scores.tolist()
+    selected = []
+
+    for edges in components.values():
+        stats["components"] += 1
+        rows = sorted({receipt_list[e] for e in edges})
+        cols = sorted({bank_list[e] for e in edges})
+        stats["largest_component"] = max(stats["largest_component"], len(rows) + len(cols))
+
+        # Étoile (une facture ou une ligne) : la meilleure arête est optimale
+        if len(rows) == 1 or len(cols) == 1:
+            stats["optimal_components"] += 1
+            selected.append(max(edges, key=lambda e: score_list[e]))
+            continue
+
+        if len(rows) * len(cols) > max_component_cells:
+            stats["greedy_components"] += 1
+            local = greedy_assignment([receipt_list[e] for e in edges], [bank_list[e] for e in edges],
+                                      [score_list[e] for e in edges])
+            selected.extend(edges[i] for i in local)
+            continue
+
+        stats["optimal_components"] += 1
+        row_pos = {r: i for i, r in enumerate(rows)}
+        col_pos = {c: j for j, c in enumerate(cols)}
+        # Bonus par paire supérieur à tout écart de score cumulé : une paire de
+        # plus l'emporte toujours sur de meilleurs scores (cardinalité d'abord)
+        component_scores = [score_list[e] for e in edges]
+        low = min(component_scores)
+        bonus = (max(component_scores) - low) * min(len(rows), len(cols)) + 1.0
+        cost = np.full((len(rows), len(cols)), _FORBIDDEN)
+        edge_at = {}
+        for e in edges:
+            r, c = row_pos[receipt_list[e]], col_pos[bank_list[e]]
+            weight = -(score_list[e] - low + bonus)
+            # En cas d'arêtes multiples pour une même paire, garder la meilleure
+            if weight < cost[r, c]:
+                cost[r, c] = weight
+                edge_at[(r, c)] = e
+        for r, c in hungarian(cost):
+            if cost[r, c] < _FORBIDDEN:
+                selected.append(edge_at[(r, c)])
+
+    return sorted(selected), stats
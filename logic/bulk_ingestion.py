@@ -0,0 +1,150 @@
+import os
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from config import Config
+from logic.upload_store import UploadStore
+from utils import Utils
+
+
+# (chemin relatif dans la source, taille annoncée, ouverture du flux)
+Entry = Tuple[str, int, Callable[[], IO[bytes]]]
+
+# Dossiers et fichiers ajoutés par les systèmes d'exploitation dans les archives
+_IGNORED_PARTS = {"__MACOSX", ".DS_Store", "Thumbs.db"}
+
+
+def resolve_source(path: str, roots: Sequence[str] = Config.BULK_IMPORT_ROOTS) -> Path:
+    """
+    Chemin absolu d'une archive ou d'un dossier du serveur, qui doit se trouver
+    sous l'un des dossiers autorisés (ValueError sinon).
+    """
+    resolved = Path(path).expanduser().resolve()
+    if not any(resolved.is_relative_to(Path(root).resolve()) for root in roots):
+        raise ValueError(f"Import refusé : {path} n'est pas dans un dossier autorisé ({', '.join(roots)})")
+    if not resolved.exists():
+        raise ValueError(f"Introuvable : {path}")
+    if resolved.is_file() and not zipfile.is_zipfile(resolved):
+        raise ValueError(f"{path} n'est ni un dossier ni une archive ZIP")
+    return resolved
+
+
+class BulkIngestor:
+    """
+    Import en flux des factures d'une archive ZIP ou d'un dossier.
+
+    Les entrées sont lues une à une et recopiées par blocs dans le dossier des
+    factures, sans jamais charger l'archive en mémoire. Via UploadStore, un
+    contenu déjà présent n'est pas réécrit et un fichier existant de contenu
+    différent n'est jamais écrasé : le nouveau est renommé. Seules les images
+    autorisées sont retenues ; `on_file` est appelé dès qu'un fichier est
+    écrit, ce qui permet de lancer son traitement sans attendre la fin de l'import.
+    """
+
+    def __init__(self, directory: str, on_file: Optional[Callable[[Path], Any]] = None,
+                 max_file_bytes: int = Config.BULK_MAX_FILE_BYTES,
+                 allowed_extensions: Sequence[str] = Config.BULK_ALLOWED_EXTENSIONS):
+        self.store = UploadStore(directory)
+        self.on_file = on_file
+        self.max_file_bytes = max_file_bytes
+        self.allowed_extensions = {extension.lower() for extension in allowed_extensions}
+
+    def _accepted(self, relative: str) -> bool:
+        parts = PurePosixPath(relative).parts
+        if not parts or any(part in _IGNORED_PARTS or part.startswith(".") for part in parts):
+            return False
+        return PurePosixPath(relative).suffix.lower() in self.allowed_extensions
+
+    @staticmethod
+    def _zip_entries(archive: zipfile.ZipFile) -> Iterator[Entry]:
+        # Seul le répertoire central est lu ici ; le contenu l'est entrée par entrée
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, lambda info=info: archive.open(info)
+
+    @staticmethod
+    def _folder_entries(folder: Path) -> Iterator[Entry]:
+        for root, directories, files in os.walk(folder):
+            directories.sort()
+            for name in sorted(files):
+                path = Path(root) / name
+                yield path.relative_to(folder).as_posix(), path.stat().st_size, lambda path=path: open(path, "rb")
+
+    @staticmethod
+    def target_name(relative: str, taken: Set[str]) -> str:
+        """
+        Nom du fichier dans le dossier des factures : nom de base nettoyé, ou
+        chemin complet aplati si ce nom est déjà pris par un autre fichier de l'import.
+        """
+        path = PurePosixPath(relative)
+        name = Utils.sanitize_filename(path.name)
+        if name in taken:
+            name = Utils.sanitize_filename("_".join(path.parts))
+        stem, suffix, counter = Path(name).stem, Path(name).suffix, 1
+        while name in taken:
+            counter += 1
+            name = f"{stem}_{counter}{suffix}"
+        return name
+
+    def ingest(self, source: str, report: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """
+        Importe les images d'une archive ZIP ou d'un dossier.
+
+        Renvoie les compteurs de l'import (entrées, images, fichiers écrits,
+        dont renommés, déjà présents, ignorés, en erreur) et la liste des erreurs.
+        """
+        source = Path(source)
+        if source.is_dir():
+            return self._ingest(self._folder_entries(source), report)
+        with zipfile.ZipFile(source) as archive:
+            return self._ingest(self._zip_entries(archive), report)
+
+    def _ingest(self, entries: Iterable[Entry], report: Optional[Callable[..., None]]) -> Dict[str, Any]:
+        # Métadonnées seulement (noms et tailles) : le contenu est lu plus bas, entrée par entrée
+        entries = list(entries)
+        images = [entry for entry in entries if self._accepted(entry[0])]
+        stats = {"entries": len(entries), "images": len(images), "written": 0, "unchanged": 0, "renamed": 0,
+                 "skipped": len(entries) - len(images), "errors": 0, "bytes": 0}
+        errors: List[str] = []
+        taken: Set[str] = set()
+        try:
+            for done, (relative, size, open_entry) in enumerate(images, start=1):
+                if report:
+                    report(done - 1, len(images), f"Import en cours : {relative}")
+                if size > self.max_file_bytes:
+                    stats["errors"] += 1
+                    errors.append(f"{relative} : fichier trop volumineux ({size} octets)")
+                    continue
+
+                name = self.target_name(relative, taken)
+                taken.add(name)
+                try:
+                    with open_entry() as stream:
+                        written = self.store.save_stream(name, stream, max_bytes=self.max_file_bytes,
+                                                         save_manifest=False, keep_existing=True)
+                except (OSError, ValueError, RuntimeError, zipfile.BadZipFile) as e:
+                    # Entrée chiffrée, corrompue ou plus grande qu'annoncé
+                    stats["errors"] += 1
+                    errors.append(f"{relative} : {str(e)}")
+                    continue
+
+                if not written:
+                    stats["unchanged"] += 1
+                    continue
+                # Renommé si un fichier déjà présent de contenu différent portait ce nom
+                taken.add(written)
+                if written != name:
+                    stats["renamed"] += 1
+                stats["written"] += 1
+                stats["bytes"] += size
+                if stats["written"] % Config.BULK_MANIFEST_EVERY == 0:
+                    self.store.flush()
+                if self.on_file:
+                    self.on_file(self.store.directory / written)
+        finally:
+            self.store.flush()
+        if report:
+            report(len(images), len(images), "Import terminé")
+        stats["error_messages"] = errors
+        return stats
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from logic.assignment import assign
+from logic.candidate_index import TransactionIndex
+from logic.columnar import receipts_table
+from logic.statement_ingestion import StatementIngestor
+from logic.vendor_similarity import VendorIndex
+
+
+# Version du format des fichiers de cache (à incrémenter si le calcul change)
+_FORMAT_VERSION = 3
+# Bonus des arêtes tier1 : toujours préférées aux arêtes tier2 (similarité <= 100)
+_TIER1_BONUS = 100.0
+
+
+def _epoch_days(values) -> np.ndarray:
+    """Dates en jours depuis 1970 (-1 pour les dates manquantes)"""
+    days = np.asarray(values, dtype="datetime64[D]")
+    return np.where(np.isnat(days), -1, days.astype(np.int64))
+
+
+class CandidateGraph:
+    """
+    Paires candidates factures / lignes bancaires, calculées une seule fois aux
+    bornes les plus larges des curseurs (Config.CANDIDATE_GRAPH_LIMITS).
+
+    Chaque arête garde son écart de jours, son écart relatif de montant et la
+    similarité des vendeurs : tout jeu de paramètres plus étroit se réduit à un
+    filtre sur ces colonnes suivi d'une nouvelle affectation, sans relire les
+    fichiers ni recalculer les scores.
+    """
+
+    def __init__(self, receipt_ids: np.ndarray, bank_ids: np.ndarray, day_gaps: np.ndarray,
+                 amount_gaps: np.ndarray, similarities: np.ndarray, receipts_count: int, bank_count: int,
+                 limits: Optional[Dict[str, float]] = None):
+        self.receipt_ids = np.asarray(receipt_ids, dtype=np.int64)
+        self.bank_ids = np.asarray(bank_ids, dtype=np.int64)
+        self.day_gaps = np.asarray(day_gaps, dtype=np.int64)
+        self.amount_gaps = np.asarray(amount_gaps, dtype=float)
+        self.similarities = np.asarray(similarities, dtype=float)
+        self.receipts_count = int(receipts_count)
+        self.bank_count = int(bank_count)
+        self.limits = dict(limits or Config.CANDIDATE_GRAPH_LIMITS)
+
+    def __len__(self) -> int:
+        return len(self.receipt_ids)
+
+    @classmethod
+    def build(cls, receipts: pd.DataFrame, bank: pd.DataFrame,
+              limits: Optional[Dict[str, float]] = None) -> "CandidateGraph":
+        """
+        Graphe à partir de la table des factures (receipts_table) et de la table
+        normalisée des relevés (StatementIngestor).
+        """
+        limits = dict(limits or Config.CANDIDATE_GRAPH_LIMITS)
+        max_days, max_tolerance = limits["days_delta"], limits["amount_tolerance"]
+
+        receipt_days = _epoch_days(receipts["date"].to_numpy())
+        # Montants signés dans les tables : la tolérance compare les valeurs absolues
+        receipt_cents = receipts["amount_cents"].abs().to_numpy(dtype=float, na_value=np.nan)
+        bank_days = _epoch_days(bank["date"].to_numpy())
+        bank_cents = bank["amount_cents"].abs().to_numpy(dtype=float, na_value=np.nan)
+        index = TransactionIndex(bank["date"].to_numpy(), bank_cents / 100)
+
+        receipt_ids, bank_ids = [], []
+        for receipt_id in np.flatnonzero((receipt_days >= 0) & ~np.isnan(receipt_cents)).tolist():
+            candidates = index.candidates(np.datetime64(int(receipt_days[receipt_id]), "D"),
+                                          receipt_cents[receipt_id] / 100, max_days, max_tolerance)
+            if candidates is not None and len(candidates):
+                receipt_ids.append(np.full(len(candidates), receipt_id, dtype=np.int64))
+                bank_ids.append(candidates)
+
+        if not receipt_ids:
+            empty = np.empty(0)
+            return cls(empty, empty, empty, empty, empty, len(receipts), len(bank), limits)
+        receipt_ids = np.concatenate(receipt_ids)
+        bank_ids = np.concatenate(bank_ids)
+
+        # Tests exacts aux bornes larges (l'index renvoie un sur-ensemble)
+        day_gaps = np.abs(receipt_days[receipt_ids] - bank_days[bank_ids])
+        expected, actual = receipt_cents[receipt_ids], bank_cents[bank_ids]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            amount_gaps = np.where(expected > 0, np.abs(expected - actual) / expected,
+                                   np.where(actual == expected, 0.0, np.inf))
+        keep = (bank_days[bank_ids] >= 0) & (day_gaps <= max_days) & (amount_gaps <= max_tolerance)
+        receipt_ids, bank_ids = receipt_ids[keep], bank_ids[keep]
+        day_gaps, amount_gaps = day_gaps[keep], amount_gaps[keep]
+
+        labels = bank["label"].astype("string").fillna("").to_numpy(dtype=object)
+        vendors = receipts["vendor"].to_numpy(dtype=object)
+        similarities = VendorIndex(labels).score_pairs(vendors[receipt_ids], labels[bank_ids])
+        keep = similarities >= limits["similarity_threshold"]
+
+        return cls(receipt_ids[keep], bank_ids[keep], day_gaps[keep], amount_gaps[keep], similarities[keep],
+                   len(receipts), len(bank), limits)
+
+    @staticmethod
+    def cache_key(receipts_json: str, statements_dir: str, limits: Optional[Dict[str, float]] = None) -> str:
+        """Clé du graphe : hash des factures, des relevés et des bornes"""
+        digest = hashlib.sha256(f"v{_FORMAT_VERSION}".encode("utf-8"))
+        digest.update(StatementIngestor.file_hash(receipts_json).encode("utf-8"))
+        for path in sorted(Path(statements_dir).glob("*.csv")):
+            digest.update(f"{path.name}:{StatementIngestor.file_hash(str(path))}".encode("utf-8"))
+        digest.update(json.dumps(limits or Config.CANDIDATE_GRAPH_LIMITS, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, receipts_json: str, statements_dir: str, cache_dir: str = Config.CANDIDATE_GRAPH_CACHE_DIR,
+             limits: Optional[Dict[str, float]] = None,
+             ingestor: Optional[StatementIngestor] = None) -> "CandidateGraph":
+        """Graphe des fichiers donnés, depuis le cache disque si les entrées sont inchangées"""
+        cache_path = Path(cache_dir) / f"{cls.cache_key(receipts_json, statements_dir, limits)}.npz"
+        if cache_path.exists():
+            try:
+                return cls.from_file(str(cache_path))
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with open(receipts_json, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        bank = (ingestor or StatementIngestor()).load_directory(statements_dir)
+        graph = cls.build(receipts_table(records if isinstance(records, list) else []), bank, limits)
+        graph.save(str(cache_path))
+        return graph
+
+    def save(self, path: str):
+        """Enregistre le graphe (écriture atomique)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            receipt_ids=self.receipt_ids,
+            bank_ids=self.bank_ids,
+            day_gaps=self.day_gaps,
+            amount_gaps=self.amount_gaps,
+            similarities=self.similarities,
+            counts=np.array([self.receipts_count, self.bank_count], dtype=np.int64),
+            limits=np.array(json.dumps(self.limits)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CandidateGraph":
+        with np.load(path) as data:
+            receipts_count, bank_count = data["counts"].tolist()
+            return cls(data["receipt_ids"], data["bank_ids"], data["day_gaps"], data["amount_gaps"],
+                       data["similarities"], receipts_count, bank_count, json.loads(str(data["limits"])))
+
+    def covers(self, params: Dict[str, float]) -> bool:
+        """Vrai si les paramètres sont dans les bornes du graphe (résultat identique à un calcul complet)"""
+        return (params["days_delta"] <= self.limits["days_delta"]
+                and max(params["amount_tolerance_tier1"], params["amount_tolerance_tier2"]) <= self.limits["amount_tolerance"]
+                and params["similarity_threshold"] >= self.limits["similarity_threshold"])
+
+    def edges(self, params: Dict[str, float]) -> np.ndarray:
+        """Positions des arêtes acceptées par les paramètres de matching"""
+        if not self.covers(params):
+            raise ValueError(f"Paramètres hors des bornes du graphe des candidats : {self.limits}")
+        return np.flatnonzero(
+            (self.day_gaps <= params["days_delta"])
+            & (self.amount_gaps <= params["amount_tolerance_tier2"])
+            & (self.similarities >= params["similarity_threshold"])
+        )
+
+    def match(self, params: Dict[str, float], mode: str = Config.ASSIGNMENT_DEFAULT_MODE) -> Dict[str, Any]:
+        """
+        Affectation un-à-un pour un jeu de paramètres : filtre des arêtes puis
+        affectation (tier1 avant tier2, puis similarité, puis écart de jours).
+        """
+        edges = self.edges(params)
+        receipt_ids, bank_ids = self.receipt_ids[edges], self.bank_ids[edges]
+        tier1 = self.amount_gaps[edges] <= params["amount_tolerance_tier1"]
+        # L'écart de jours ne départage que des arêtes de même similarité (pénalité < 1)
+        weights = (self.similarities[edges] + np.where(tier1, _TIER1_BONUS, 0.0)
+                   - self.day_gaps[edges] / (self.limits["days_delta"] + 1))
+        selected, stats = assign(receipt_ids, bank_ids, weights, mode=mode)
+
+        candidates_per_receipt = np.bincount(receipt_ids, minlength=self.receipts_count)
+        return {
+            "pairs": dict(zip(receipt_ids[selected].tolist(), bank_ids[selected].tolist())),
+            "tier1": int(tier1[selected].sum()),
+            "matching_count": len(selected),
+            "matching_total": self.receipts_count,
+            "edges": int(len(edges)),
+            "ambiguous": int((candidates_per_receipt > 1).sum()),
+            "assignment": stats,
+        }
+
+    def preview(self, params: Dict[str, float], mode: str = Config.ASSIGNMENT_DEFAULT_MODE) -> Dict[str, Any]:
+        """Résumé du matching pour un jeu de paramètres (sans les paires)"""
+        result = self.match(params, mode)
+        result.pop("pairs")
+        total = result["matching_total"]
+        result["match_rate"] = result["matching_count"] / total if total else 0.0
+        return result
@@ -0,0 +1,127 @@
+import math
+from datetime import date, datetime
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+
+# Décalage entre jours dans la clé combinée (jour, centimes) : ~1e10 €
+_DAY_STRIDE = 1 << 40
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_cents(amount: Optional[float]) -> Optional[int]:
+    """Montant en centimes (valeur absolue) ou None"""
+    if amount is None:
+        return None
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value):
+        return None
+    return int(round(abs(value) * 100))
+
+
+def to_day(value: Union[date, datetime, np.datetime64, None]) -> Optional[int]:
+    """Date en nombre de jours (ordinal) ou None"""
+    if value is None:
+        return None
+    if isinstance(value, np.datetime64):
+        if np.isnat(value):
+            return None
+        value = value.astype("datetime64[D]").item()
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.toordinal()
+    # pandas.Timestamp / NaT
+    if hasattr(value, "to_pydatetime"):
+        try:
+            return value.to_pydatetime().date().toordinal()
+        except ValueError:
+            return None
+    return None
+
+
+class TransactionIndex:
+    """
+    Index trié des transactions bancaires par (date, montant en centimes).
+
+    La recherche de candidats pour une facture devient une requête par
+    intervalle : au plus 2 * days_delta + 1 recherches dichotomiques au lieu
+    d'un parcours de toutes les transactions. Les bornes sont arrondies vers
+    l'extérieur : le résultat est un sur-ensemble des transactions acceptées
+    par les tests exacts du matcher, qui restent à appliquer aux candidats.
+    """
+
+    def __init__(self, dates: Sequence, amounts: Sequence, amounts_in_cents: bool = False):
+        if len(dates) != len(amounts):
+            raise ValueError("dates et amounts doivent avoir la même longueur")
+
+        days, day_ok = self._days_array(dates)
+        cents, cents_ok = self._cents_array(amounts, amounts_in_cents)
+        valid = day_ok & cents_ok
+
+        # Transactions sans date ou sans montant : toujours candidates
+        self.unindexed = np.flatnonzero(~valid).astype(np.int64)
+
+        ids = np.flatnonzero(valid).astype(np.int64)
+        keys = days[valid] * _DAY_STRIDE + cents[valid]
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._ids = ids[order]
+        self.size = len(dates)
+
+    @staticmethod
+    def _days_array(dates):
+        values = np.asarray(dates)
+        if np.issubdtype(values.dtype, np.datetime64):
+            ok = ~np.isnat(values)
+            days = values.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+            return np.where(ok, days, 0), ok
+        converted = [to_day(d) for d in values]
+        ok = np.array([d is not None for d in converted], dtype=bool)
+        return np.array([d or 0 for d in converted], dtype=np.int64), ok
+
+    @staticmethod
+    def _cents_array(amounts, in_cents: bool):
+        values = np.asarray(amounts)
+        if in_cents and np.issubdtype(values.dtype, np.integer):
+            return np.abs(values.astype(np.int64)), np.ones(len(values), dtype=bool)
+        if np.issubdtype(values.dtype, np.floating):
+            ok = ~np.isnan(values)
+            return np.where(ok, np.rint(np.abs(np.nan_to_num(values)) * 100), 0).astype(np.int64), ok
+        converted = [to_cents(a) for a in values]
+        ok = np.array([c is not None for c in converted], dtype=bool)
+        return np.array([c or 0 for c in converted], dtype=np.int64), ok
+
+    def __len__(self) -> int:
+        return self.size
+
+    def candidates(self, receipt_date, receipt_amount, days_delta: int, tolerance: float) -> Optional[np.ndarray]:
+        """
+        Indices (triés) des transactions dont la date est à ±days_delta jours et
+        le montant à ±tolerance (relative) du montant de la facture.
+
+        Renvoie None si la facture n'a ni date ni montant exploitables :
+        aucun élagage n'est alors possible.
+        """
+        day = to_day(receipt_date)
+        cents = to_cents(receipt_amount)
+        if day is None or cents is None:
+            return None
+
+        low_cents = max(0, math.floor(cents * (1 - tolerance)) - 1)
+        high_cents = math.ceil(cents * (1 + tolerance)) + 1
+
+        window = np.arange(day - days_delta, day + days_delta + 1, dtype=np.int64) * _DAY_STRIDE
+        starts = np.searchsorted(self._keys, window + low_cents, side="left")
+        ends = np.searchsorted(self._keys, window + high_cents, side="right")
+
+        parts = [self._ids[s:e] for s, e in zip(starts, ends) if e > s]
+        if len(self.unindexed):
+            parts.append(self.unindexed)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
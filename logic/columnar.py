@@ -0,0 +1,147 @@
+from typing import Any, Dict, Iterable, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from utils import Utils
+
+
+# Table des résultats du matching : colonne typée -> champ du JSON de matching
+RESULT_FIELDS = {
+    "receipt_filename": "receipt_filename",
+    "receipt_cents": "receipt_total",
+    "receipt_date": "receipt_date",
+    "vendor_receipt": "vendor_receipt",
+    "bank_cents": "bank_amount",
+    "bank_date": "bank_date",
+    "bank_vendor": "bank_vendor",
+    "matched": "matched",
+    "reason": "reason",
+}
+
+# Colonnes de montants (centimes) et de dates de la table des résultats
+RESULT_CENTS_COLUMNS = ["receipt_cents", "bank_cents"]
+RESULT_DATE_COLUMNS = ["receipt_date", "bank_date"]
+# Colonnes de texte très répétitif, internées (codes + dictionnaire des valeurs distinctes)
+RESULT_CATEGORY_COLUMNS = ["vendor_receipt", "bank_vendor", "reason"]
+
+UNMATCHED_REASON = "Aucune transaction correspondante"
+
+
+def field_value(record: Dict[str, Any], fields: Iterable[str]) -> Any:
+    """Première valeur renseignée parmi `fields` (« a.b » : champ b de l'objet a)"""
+    for field in fields:
+        value = record
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value not in (None, "") and not isinstance(value, dict):
+            return value
+    return None
+
+
+def interned(values: Iterable[Any]) -> pd.Series:
+    """
+    Texte interné : un code entier par ligne et un dictionnaire trié des
+    valeurs distinctes (tri et recherche se font sur le dictionnaire).
+    """
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        # Déjà internée : seul le dictionnaire est complété et trié
+        if "" not in values.cat.categories:
+            values = values.cat.add_categories([""])
+        values = values.fillna("")
+        return values.cat.set_categories(sorted(values.cat.categories))
+    values = pd.Series(values, dtype="string").fillna("")
+    return values.astype(pd.CategoricalDtype(sorted(values.unique())))
+
+
+def cents_series(values: Iterable[Any]) -> pd.Series:
+    """
+    Montants signés en centimes (Int64) : nombres, ou texte (« 12,50 € »)
+    analysé une seule fois par valeur distincte.
+    """
+    raw = pd.Series(values, dtype=object)
+    amounts = pd.to_numeric(raw, errors="coerce")
+    is_text = raw.map(lambda value: isinstance(value, str))
+    if is_text.any():
+        amounts[is_text] = Utils.extract_amount_series(raw[is_text]).fillna(amounts[is_text])
+    return pd.Series(np.rint(amounts * 100), dtype="float64").astype("Int64")
+
+
+def date_series(values: Iterable[Any]) -> pd.Series:
+    """Dates en datetime64 (NaT si absente ou illisible)"""
+    raw = pd.Series(values, dtype=object)
+    return Utils.parse_date_series(raw.fillna("")).reset_index(drop=True)
+
+
+def receipts_table(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Table des factures extraites (nom de fichier, date en datetime64, montant
+    en centimes, vendeur interné), dans l'ordre de `records`.
+    """
+    return pd.DataFrame({
+        "filename": pd.Series([field_value(r, Config.RECEIPT_KEY_FIELDS) for r in records], dtype="string"),
+        "date": date_series([field_value(r, Config.RECEIPT_DATE_FIELDS) for r in records]),
+        "amount_cents": cents_series([field_value(r, Config.RECEIPT_AMOUNT_FIELDS) for r in records]),
+        "vendor": interned(str(field_value(r, Config.RECEIPT_VENDOR_FIELDS) or "") for r in records),
+    })
+
+
+def results_table(records: List[Mapping[str, Any]]) -> pd.DataFrame:
+    """
+    Table typée des résultats du matching à partir des enregistrements du
+    JSON de matching (une ligne par facture). Les champs hors RESULT_FIELDS
+    ne sont pas conservés.
+    """
+    def column(field: str) -> List[Any]:
+        return [record.get(field) for record in records]
+
+    table = pd.DataFrame({
+        "receipt_filename": pd.Series(column("receipt_filename"), dtype=object).astype("string"),
+        # Booléen nullable d'abord : pas de conversion implicite des objets par fillna
+        "matched": pd.Series(column("matched"), dtype="boolean").fillna(False).astype(bool),
+    })
+    for name in RESULT_CENTS_COLUMNS:
+        table[name] = cents_series(column(RESULT_FIELDS[name]))
+    for name in RESULT_DATE_COLUMNS:
+        table[name] = date_series(column(RESULT_FIELDS[name]))
+    for name in RESULT_CATEGORY_COLUMNS:
+        table[name] = interned("" if value is None else str(value) for value in column(RESULT_FIELDS[name]))
+    return table[list(RESULT_FIELDS)]
+
+
+def results_from_pairs(receipts: pd.DataFrame, bank: pd.DataFrame, pairs: Dict[int, int]) -> pd.DataFrame:
+    """
+    Table des résultats directement à partir des tables des factures
+    (receipts_table) et des relevés (StatementIngestor) et des paires
+    {position de la facture: position de la ligne bancaire} : les colonnes
+    sont recopiées par indexation, sans passer par des dictionnaires. Les
+    montants gardent leur signe (débits négatifs).
+    """
+    receipt_ids = np.fromiter(pairs.keys(), dtype=np.int64, count=len(pairs))
+    bank_ids = np.fromiter(pairs.values(), dtype=np.int64, count=len(pairs))
+    matched = np.zeros(len(receipts), dtype=bool)
+    matched[receipt_ids] = True
+    # Position de la ligne bancaire de chaque facture (-1 : non matchée)
+    bank_position = np.full(len(receipts), -1, dtype=np.int64)
+    bank_position[receipt_ids] = bank_ids
+
+    def bank_column(values: pd.Series) -> pd.Series:
+        if not len(values):
+            return pd.Series([pd.NA] * len(receipts), dtype=values.dtype)
+        return values.take(np.where(matched, bank_position, 0)).reset_index(drop=True).where(matched)
+
+    table = pd.DataFrame({
+        "receipt_filename": receipts["filename"].astype("string").reset_index(drop=True),
+        "receipt_cents": receipts["amount_cents"].reset_index(drop=True),
+        "receipt_date": receipts["date"].reset_index(drop=True),
+        "vendor_receipt": receipts["vendor"].reset_index(drop=True),
+        "bank_cents": bank_column(bank["amount_cents"]),
+        "bank_date": bank_column(bank["date"]),
+        "bank_vendor": bank_column(bank["label"]),
+        "matched": matched,
+        "reason": pd.Categorical(np.where(matched, "", UNMATCHED_REASON), categories=["", UNMATCHED_REASON]),
+    })
+    for name in RESULT_CATEGORY_COLUMNS:
+        table[name] = interned(table[name])
+    return table[list(RESULT_FIELDS)]
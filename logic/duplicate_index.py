@@ -0,0 +1,181 @@
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from logic.file_lock import FileLock
+from logic.receipt_store import receipt_key
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow est optionnel : sans lui, pas de détection des doublons
+    Image = None
+    ImageOps = None
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def image_hash(path: str, hash_size: int = Config.DUPLICATE_HASH_SIZE) -> Optional[int]:
+    """
+    Hash perceptuel (dHash) d'une image : signe du gradient horizontal sur une
+    vignette en niveaux de gris. Insensible à la taille, à la compression et
+    aux petites variations d'exposition. None si l'image est illisible.
+    """
+    try:
+        with Image.open(path) as image:
+            # Décodage JPEG réduit : la vignette finale ne fait que quelques pixels
+            image.draft("L", (hash_size * 8, hash_size * 8))
+            image = ImageOps.exif_transpose(image).convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels = list(image.getdata())
+    except (OSError, ValueError):
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        line = pixels[row * (hash_size + 1):(row + 1) * (hash_size + 1)]
+        for left, right in zip(line, line[1:]):
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class DuplicateIndex:
+    """
+    Index des hash perceptuels des factures d'un dossier.
+
+    Les hash sont calculés en parallèle (pool de processus) pour les seuls
+    fichiers nouveaux ou modifiés, puis persistés. Chaque facture est comparée
+    aux factures canoniques qui la précèdent (ordre d'arrivée) : à moins de
+    `max_distance` bits d'écart, elle est le doublon probable de la première
+    trouvée. La recherche découpe les hash en max_distance + 1 bandes : deux
+    hash proches ont au moins une bande identique (principe des tiroirs).
+    """
+
+    def __init__(self, receipts_dir: str, index_path: str, max_distance: int = Config.DUPLICATE_MAX_DISTANCE,
+                 hash_size: int = Config.DUPLICATE_HASH_SIZE, workers: int = Config.DUPLICATE_WORKERS):
+        self.receipts_dir = Path(receipts_dir)
+        self.index_path = Path(index_path)
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.workers = workers
+        # {nom de fichier: {"size", "mtime_ns", "hash"}}, dans l'ordre d'arrivée
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("hash_size") == self.hash_size:
+            self.entries = data.get("entries", {})
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"hash_size": self.hash_size, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def update(self) -> Dict[str, str]:
+        """Hash des fichiers nouveaux ou modifiés ; renvoie les doublons {doublon: facture canonique}"""
+        if not self.available():
+            return {}
+
+        files = {}
+        if self.receipts_dir.exists():
+            for path in sorted(self.receipts_dir.iterdir()):
+                if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                    stat = path.stat()
+                    files[path.name] = (stat.st_size, stat.st_mtime_ns)
+
+        # Plusieurs sessions d'un même projet peuvent mettre l'index à jour en même temps
+        with FileLock(str(self.index_path) + ".lock"):
+            self._load()
+            stale = [name for name, entry in self.entries.items()
+                     if files.get(name) != (entry["size"], entry["mtime_ns"])]
+            for name in stale:
+                del self.entries[name]
+            pending = [name for name in files if name not in self.entries]
+
+            if pending:
+                paths = [str(self.receipts_dir / name) for name in pending]
+                workers = max(1, min(self.workers, len(pending)))
+                if workers == 1:
+                    hashes = [image_hash(path, self.hash_size) for path in paths]
+                else:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        hashes = list(executor.map(image_hash, paths, [self.hash_size] * len(paths),
+                                                   chunksize=max(1, len(paths) // (workers * 4))))
+                for name, value in zip(pending, hashes):
+                    size, mtime_ns = files[name]
+                    self.entries[name] = {"size": size, "mtime_ns": mtime_ns,
+                                          "hash": None if value is None else f"{value:x}"}
+            if stale or pending:
+                self._save()
+        return self.duplicates()
+
+    def _bands(self, value: int) -> List[Tuple[int, int]]:
+        bits = self.hash_size * self.hash_size
+        count = min(bits, self.max_distance + 1)
+        width = math.ceil(bits / count)
+        mask = (1 << width) - 1
+        return [(band, (value >> (band * width)) & mask) for band in range(count)]
+
+    def duplicates(self) -> Dict[str, str]:
+        """{doublon probable: facture canonique}, la canonique étant la première arrivée"""
+        buckets: Dict[Tuple[int, int], List[Tuple[str, int]]] = {}
+        result = {}
+        for name, entry in self.entries.items():
+            if entry["hash"] is None:
+                continue
+            value = int(entry["hash"], 16)
+            bands = self._bands(value)
+            canonical = None
+            seen = set()
+            for band in bands:
+                for other, other_value in buckets.get(band, ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    if hamming(value, other_value) <= self.max_distance:
+                        canonical = other
+                        break
+                if canonical:
+                    break
+            if canonical:
+                result[name] = canonical
+                continue
+            for band in bands:
+                buckets.setdefault(band, []).append((name, value))
+        return result
+
+
+def share_duplicates(records: List[Dict], duplicates: Dict[str, str],
+                     lookup: Optional[Callable[[str], Optional[Dict]]] = None) -> List[Dict]:
+    """
+    Données des doublons recopiées de leur facture canonique (cherchée dans
+    `records`, puis via `lookup`), avec le nom du doublon et un champ
+    `duplicate_of` ; les doublons dont la canonique n'a pas été extraite sont ignorés.
+    """
+    by_key = {receipt_key(record): record for record in records}
+    shared = []
+    for duplicate, canonical in duplicates.items():
+        record = by_key.get(canonical) or (lookup(canonical) if lookup else None)
+        if record is None:
+            continue
+        copy = {field: value for field, value in record.items() if field not in Config.RECEIPT_KEY_FIELDS}
+        shared.append({"receipt_filename": duplicate, "duplicate_of": canonical, **copy})
+    return shared
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from logic.file_lock import FileLock
+from utils import Utils
+
+
+class ExtractionCache:
+    """
+    Cache disque des extractions, adressé par le contenu.
+
+    La clé combine le SHA-256 des octets de l'image, le hash du prompt et le nom
+    du modèle : une image inchangée analysée avec le même prompt n'est jamais
+    renvoyée à l'API.
+
+    Chaque extraction est écrite (et synchronisée sur disque) dès sa réception :
+    un lot interrompu (panne de l'API, onglet fermé, redémarrage) reprend au
+    lot suivant sans repayer les extractions déjà reçues.
+    """
+
+    STATS_FILE = "stats.json"
+
+    def __init__(self, cache_dir: str = Config.EXTRACTION_CACHE_DIR,
+                 max_bytes: int = Config.EXTRACTION_CACHE_MAX_BYTES,
+                 max_entries: int = Config.EXTRACTION_CACHE_MAX_ENTRIES,
+                 max_age_days: float = Config.EXTRACTION_CACHE_MAX_AGE_DAYS,
+                 fsync: bool = Config.EXTRACTION_CACHE_FSYNC):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.fsync = fsync
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def make_key(image_hash: str, prompt: str, model: str) -> str:
+        """Clé de cache pour (hash de l'image, prompt, modèle)"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{image_hash}:{prompt_hash}:{model}".encode("utf-8")).hexdigest()
+
+    def key_for_file(self, image_path: str, prompt: str, model: str) -> str:
+        with open(image_path, "rb") as f:
+            return self.make_key(self.hash_bytes(f.read()), prompt, model)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Renvoie la donnée en cache ou None (entrée absente ou expirée)"""
+        path = self._entry_path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if self.max_age and age > self.max_age:
+                path.unlink()
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Rafraîchit la date pour l'éviction LRU
+            os.utime(path, None)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: Any):
+        """Enregistre une extraction (écriture atomique, durable si `fsync`)"""
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def partition(self, image_paths: Iterable[str], prompt: str, model: str) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """
+        Sépare les images déjà extraites des autres.
+
+        Renvoie ({chemin: donnée en cache}, [(chemin, clé)] à envoyer à l'API).
+        """
+        cached = {}
+        missing = []
+        for image_path in image_paths:
+            key = self.key_for_file(image_path, prompt, model)
+            data = self.get(key)
+            if data is None:
+                missing.append((image_path, key))
+            else:
+                cached[image_path] = data
+        return cached, missing
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Supprime les entrées expirées puis les plus anciennes au-delà des limites"""
+        now = time.time()
+        entries = sorted(self._entries())
+        kept = []
+        removed = 0
+        for mtime, size, path in entries:
+            if self.max_age and now - mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                kept.append((mtime, size, path))
+
+        total_bytes = sum(size for _, size, _ in kept)
+        while kept and (total_bytes > self.max_bytes or len(kept) > self.max_entries):
+            _, size, path = kept.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+
+        with self._lock:
+            self.evictions += removed
+            # Taille après éviction, persistée par save_stats (affichage sans parcourir le cache)
+            self._size = {"entries": len(kept), "bytes": total_bytes}
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs cumulés (sur disque) et taille actuelle du cache"""
+        totals = self._load_stats()
+        entries = self._entries()
+        return {
+            "hits": totals["hits"] + self.hits,
+            "misses": totals["misses"] + self.misses,
+            "evictions": totals["evictions"] + self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    @classmethod
+    def load_stats(cls, cache_dir: str = Config.EXTRACTION_CACHE_DIR) -> Dict[str, int]:
+        """
+        Compteurs persistés par save_stats (taille du cache à la dernière
+        éviction), lus sans parcourir ni créer le dossier du cache.
+        """
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        try:
+            with open(Path(cache_dir) / cls.STATS_FILE, "r", encoding="utf-8") as f:
+                stats.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+        return stats
+
+    def _load_stats(self) -> Dict[str, int]:
+        return self.load_stats(str(self.cache_dir))
+
+    def save_stats(self):
+        """Ajoute les compteurs de cette instance aux totaux persistés"""
+        # Cache global : plusieurs analyses (sessions, processus) peuvent enregistrer en même temps
+        with self._lock, FileLock(str(self.cache_dir / self.STATS_FILE) + ".lock"):
+            totals = self._load_stats()
+            totals["hits"] += self.hits
+            totals["misses"] += self.misses
+            totals["evictions"] += self.evictions
+            if self._size is not None:
+                totals.update(self._size)
+            self.hits = self.misses = self.evictions = 0
+            Utils.atomic_write(str(self.cache_dir / self.STATS_FILE), json.dumps(totals))
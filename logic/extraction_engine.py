@@ -0,0 +1,288 @@
+import base64
+import contextlib
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from config import Config
+
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+class ApiError(Exception):
+    """Erreur renvoyée par l'API (avec code HTTP et délai Retry-After éventuels)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ApiResponse:
+    """Réponse d'un appel d'extraction : données extraites et métriques de l'appel"""
+
+    def __init__(self, data: Any, total_tokens: int = 0, payload_bytes: int = 0, latency: float = 0.0):
+        self.data = data
+        self.total_tokens = total_tokens
+        self.payload_bytes = payload_bytes
+        self.latency = latency
+
+
+class ExtractionResult:
+    """Résultat d'extraction d'un élément du lot (dans l'ordre d'entrée)"""
+
+    def __init__(self, index: int, item: Any):
+        self.index = index
+        self.item = item
+        self.value = None
+        self.error = None
+        self.attempts = 0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe : `rate` jetons/seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount: float = 1.0):
+        """Bloque jusqu'à ce que `amount` jetons soient disponibles puis les consomme"""
+        if self.rate <= 0:
+            return
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def adjust(self, delta: float):
+        """Corrige le solde après coup (ex. usage réel différent de l'estimation)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class RateLimiter:
+    """Limiteur combiné : requêtes par seconde et tokens par minute"""
+
+    def __init__(self, requests_per_second: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """
+        Remplace l'estimation d'un appel réussi par l'usage réel. Sans usage
+        connu (absent ou nul dans la réponse), l'estimation reste décomptée.
+        """
+        if actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+class ExtractionEngine:
+    """Moteur d'extraction concurrent avec limitation de débit et reprise sur erreur"""
+
+    def __init__(self, max_workers: int = Config.EXTRACTION_WORKERS,
+                 requests_per_second: float = Config.EXTRACTION_REQUESTS_PER_SECOND,
+                 tokens_per_minute: float = Config.EXTRACTION_TOKENS_PER_MINUTE,
+                 max_retries: int = Config.EXTRACTION_MAX_RETRIES,
+                 backoff_base: float = Config.EXTRACTION_BACKOFF_BASE,
+                 backoff_max: float = Config.EXTRACTION_BACKOFF_MAX,
+                 sleep: Callable[[float], None] = time.sleep,
+                 telemetry=None):
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = RateLimiter(requests_per_second, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        # Telemetry (logic.telemetry) optionnelle : latence, taille, tokens et reprises par appel
+        self.telemetry = telemetry
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Indique si une erreur justifie une nouvelle tentative (429, 5xx, réseau)"""
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError))
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Délai exponentiel avec gigue, au moins égal au Retry-After de l'API"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay *= random.uniform(0.5, 1.0)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(float(retry_after), self.backoff_max))
+        return delay
+
+    def _process(self, result: ExtractionResult, extract_fn: Callable[[Any], Any],
+                 estimate_tokens: Callable[[Any], int]) -> ExtractionResult:
+        estimated = estimate_tokens(result.item)
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            # Chaque tentative est décomptée ; seule celle qui réussit est corrigée par l'usage réel
+            self.limiter.acquire(estimated)
+            try:
+                value = extract_fn(result.item)
+            except Exception as e:
+                if attempt < self.max_retries and self.is_retryable(e):
+                    self._sleep(self.backoff_delay(attempt, e))
+                    continue
+                result.error = e
+                if self.telemetry:
+                    self.telemetry.record_api_call(result.attempts, error=e)
+                return result
+
+            if isinstance(value, ApiResponse):
+                self.limiter.record_usage(estimated, value.total_tokens)
+            if self.telemetry:
+                self.telemetry.record_api_call(result.attempts, response=value)
+            result.value = value
+            return result
+        return result
+
+    def run(self, items: List[Any], extract_fn: Callable[[Any], Any],
+            estimate_tokens: Optional[Callable[[Any], int]] = None,
+            progress_callback: Optional[Callable[[int, int, ExtractionResult], None]] = None) -> List[ExtractionResult]:
+        """
+        Applique `extract_fn` à chaque élément en parallèle.
+
+        Les résultats sont renvoyés dans l'ordre des éléments d'entrée ; une erreur
+        sur un élément n'interrompt pas le lot (voir `ExtractionResult.error`).
+        """
+        if estimate_tokens is None:
+            estimate_tokens = lambda item: Config.EXTRACTION_IMAGE_TOKEN_ESTIMATE
+
+        results = [ExtractionResult(i, item) for i, item in enumerate(items)]
+        if not results:
+            return results
+
+        done = 0
+        with self._span("extraction", items=len(results)):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self._process, r, extract_fn, estimate_tokens) for r in results]
+                for future in as_completed(futures):
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, len(results), future.result())
+        return results
+
+    def _span(self, name: str, **attributes):
+        return self.telemetry.span(name, **attributes) if self.telemetry else contextlib.nullcontext()
+
+
+class MistralVisionClient:
+    """Client HTTP minimal pour l'extraction de factures via l'API Mistral"""
+
+    def __init__(self, api_key: str, model: str = Config.MISTRAL_MODEL,
+                 base_url: str = Config.MISTRAL_API_URL, timeout: float = Config.MISTRAL_TIMEOUT):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    @staticmethod
+    def estimate_tokens(prompt: str) -> int:
+        """Estimation grossière des tokens consommés par un appel (prompt + image)"""
+        return len(prompt) // 4 + Config.EXTRACTION_IMAGE_TOKEN_ESTIMATE
+
+    def build_payload(self, image_bytes: bytes, mime_type: str, prompt: str) -> bytes:
+        """Construit le corps JSON de la requête chat/completions"""
+        image_b64 = base64.b64encode(image_bytes).decode("ascii")
+        body = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": f"data:{mime_type};base64,{image_b64}"},
+                    ],
+                }
+            ],
+            "response_format": {"type": "json_object"},
+        }
+        return json.dumps(body).encode("utf-8")
+
+    def extract(self, image_path: str, prompt: str) -> ApiResponse:
+        """Envoie une image et le prompt à l'API et renvoie le JSON extrait"""
+        path = Path(image_path)
+        mime_type = IMAGE_MIME_TYPES.get(path.suffix.lower(), "image/jpeg")
+        payload = self.build_payload(path.read_bytes(), mime_type, prompt)
+
+        request = urllib.request.Request(
+            f"{self.base_url}/v1/chat/completions",
+            data=payload,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+            method="POST",
+        )
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise ApiError(f"Erreur API {e.code} pour {path.name}", status_code=e.code, retry_after=retry_after)
+        latency = time.perf_counter() - start
+
+        content = body["choices"][0]["message"]["content"]
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError):
+            data = {"raw_response": content}
+
+        usage = body.get("usage") or {}
+        return ApiResponse(
+            data=data,
+            total_tokens=int(usage.get("total_tokens", 0)),
+            payload_bytes=len(payload),
+            latency=latency,
+        )
@@ -0,0 +1,70 @@
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou exclusif par création de fichier
+    fcntl = None
+
+
+class FileLock:
+    """
+    Verrou inter-processus (et inter-threads) sur un fichier, utilisable comme
+    context manager. Un verrou partagé (`shared=True`) autorise d'autres
+    verrous partagés mais exclut les verrous exclusifs.
+    """
+
+    def __init__(self, path: str, shared: bool = False, timeout: Optional[float] = Config.FILE_LOCK_TIMEOUT,
+                 poll_interval: float = 0.05):
+        self.path = Path(path)
+        self.shared = shared and fcntl is not None
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def _try_acquire(self) -> bool:
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, (fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            return True
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            return True
+        except FileExistsError:
+            return False
+
+    def acquire(self) -> "FileLock":
+        """Attend le verrou au plus `timeout` secondes (None : sans limite) ; TimeoutError sinon"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_acquire():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Verrou occupé : {self.path}")
+            time.sleep(self.poll_interval)
+        return self
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            self.path.unlink(missing_ok=True)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,168 @@
+import hashlib
+import io
+import os
+import shutil
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow est optionnel : sans lui, les images partent telles quelles
+    Image = None
+    ImageOps = None
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Seuil de gris au-delà duquel un pixel est considéré comme fond (papier blanc)
+_BACKGROUND_THRESHOLD = 235
+_CROP_MARGIN = 16
+
+
+def _settings_signature(max_edge: int, quality: int, grayscale: bool) -> bytes:
+    return f"{max_edge}:{quality}:{int(grayscale)}".encode("ascii")
+
+
+def _autocrop(image):
+    """Rogne les bords uniformes clairs autour du ticket"""
+    gray = image if image.mode == "L" else image.convert("L")
+    mask = gray.point(lambda value: 255 if value < _BACKGROUND_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    left, top = max(0, left - _CROP_MARGIN), max(0, top - _CROP_MARGIN)
+    right, bottom = min(image.width, right + _CROP_MARGIN), min(image.height, bottom + _CROP_MARGIN)
+    return image.crop((left, top, right, bottom))
+
+
+def preprocess_image(source_path: str, output_dir: str, cache_dir: str, max_edge: int,
+                     quality: int, grayscale: bool) -> Dict[str, Any]:
+    """
+    Prépare une image pour l'API : orientation EXIF, niveaux de gris, rognage,
+    réduction au bord maximal et ré-encodage JPEG. Le résultat est mis en cache
+    par hash de la source et des réglages.
+    """
+    start = time.perf_counter()
+    source = Path(source_path)
+    data = source.read_bytes()
+    digest = hashlib.sha256(data + _settings_signature(max_edge, quality, grayscale)).hexdigest()
+    cache_path = Path(cache_dir) / f"{digest}.jpg"
+
+    cached = cache_path.exists()
+    if not cached:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("L") if grayscale else image.convert("RGB")
+            image = _autocrop(image)
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            image.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+            os.replace(tmp_path, cache_path)
+
+    # Garder l'original s'il est déjà plus léger que la version pré-traitée
+    if cache_path.stat().st_size < len(data):
+        # Nom complet conservé : a.jpg et a.png sont deux factures distinctes
+        target = Path(output_dir) / f"{source.name}.jpg"
+        shutil.copyfile(cache_path, target)
+    else:
+        target = Path(output_dir) / source.name
+        target.write_bytes(data)
+
+    return {
+        "source": source.name,
+        "output": target.name,
+        "original_bytes": len(data),
+        "processed_bytes": target.stat().st_size,
+        "seconds": time.perf_counter() - start,
+        "cached": cached,
+    }
+
+
+class ImagePreprocessor:
+    """Pré-traitement parallèle (pool de processus) d'un dossier de factures"""
+
+    def __init__(self, output_dir: str = Config.PREPROCESSED_DIR, cache_dir: str = Config.PREPROCESS_CACHE_DIR,
+                 max_edge: int = Config.PREPROCESS_MAX_EDGE, quality: int = Config.PREPROCESS_JPEG_QUALITY,
+                 grayscale: bool = Config.PREPROCESS_GRAYSCALE, workers: int = Config.PREPROCESS_WORKERS):
+        self.output_dir = Path(output_dir)
+        self.cache_dir = Path(cache_dir)
+        self.max_edge = max_edge
+        self.quality = quality
+        self.grayscale = grayscale
+        self.workers = workers
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def submit(self, executor: Executor, source_path: str) -> Future:
+        """Pré-traite une seule image dans `executor` (dès son arrivée lors d'un import, par exemple)"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return executor.submit(preprocess_image, str(source_path), str(self.output_dir), str(self.cache_dir),
+                               self.max_edge, self.quality, self.grayscale)
+
+    def run(self, source_dir: str, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Pré-traite les images de `source_dir` (sauf les noms de `exclude`) vers le dossier de sortie"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        exclude = set(exclude)
+        sources = sorted(
+            str(path) for path in Path(source_dir).iterdir()
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and path.name not in exclude
+        )
+
+        stats = []
+        if sources:
+            with ProcessPoolExecutor(max_workers=max(1, min(self.workers, len(sources)))) as executor:
+                futures = [self.submit(executor, source) for source in sources]
+                for source, future in zip(sources, futures):
+                    try:
+                        stats.append(future.result())
+                    except Exception as e:
+                        # Image illisible ou corrompue : l'original est envoyé tel quel
+                        stats.append(self._fallback(source, e))
+
+        # Retirer les images pré-traitées dont la source a disparu
+        expected = {s["output"] for s in stats}
+        for path in self.output_dir.iterdir():
+            if path.is_file() and path.name not in expected:
+                path.unlink()
+        return stats
+
+    def _fallback(self, source_path: str, error: Exception) -> Dict[str, Any]:
+        """Statistiques d'une image non pré-traitée, recopiée telle quelle dans le dossier de sortie"""
+        source = Path(source_path)
+        target = self.output_dir / source.name
+        shutil.copyfile(source, target)
+        size = target.stat().st_size
+        return {
+            "source": source.name,
+            "output": target.name,
+            "original_bytes": size,
+            "processed_bytes": size,
+            "seconds": 0.0,
+            "cached": False,
+            "error": str(error),
+        }
+
+    @staticmethod
+    def summarize(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Totaux d'un lot : octets avant/après, gain et temps de traitement"""
+        original = sum(s["original_bytes"] for s in stats)
+        processed = sum(s["processed_bytes"] for s in stats)
+        return {
+            "images": len(stats),
+            "cached": sum(1 for s in stats if s["cached"]),
+            "original_bytes": original,
+            "processed_bytes": processed,
+            "bytes_saved": original - processed,
+            "ratio": processed / original if original else 1.0,
+            "preprocess_seconds": sum(s["seconds"] for s in stats),
+            "errors": {s["source"]: s["error"] for s in stats if s.get("error")},
+        }
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from logic.log_buffer import INFO, LogRecord
+
+
+class Job:
+    """Tâche de fond : état, progression, messages de log et résultat"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = Job.PENDING
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        # Seules les dernières entrées sont gardées ; `log_count` compte toutes les entrées
+        self.logs = deque(maxlen=Config.JOB_LOG_LIMIT)
+        self.log_count = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (Job.PENDING, Job.RUNNING)
+
+    @property
+    def progress(self) -> float:
+        """Avancement entre 0 et 1"""
+        if self.status == Job.DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(1.0, self.done / self.total)
+
+    def report(self, done: int, total: int, message: Optional[str] = None):
+        """Événement de progression (ex. une facture traitée)"""
+        with self._lock:
+            self.done = done
+            self.total = total
+            if message is not None:
+                self.message = message
+
+    def log(self, stage: str, message: str, level: str = INFO, receipt: Optional[str] = None,
+            duration: Optional[float] = None):
+        with self._lock:
+            self.logs.append(LogRecord(level, stage, message, receipt=receipt, duration=duration))
+            self.log_count += 1
+
+    def logs_since(self, cursor: int) -> Tuple[List[LogRecord], int]:
+        """Entrées ajoutées depuis `cursor` et nouveau curseur"""
+        with self._lock:
+            first = self.log_count - len(self.logs)
+            return list(self.logs)[max(0, cursor - first):], self.log_count
+
+
+class JobRunner:
+    """
+    Exécute les traitements longs dans un pool de threads, hors du cycle de
+    réexécution de Streamlit. Une tâche identique (même clé) déjà en cours est
+    renvoyée au lieu d'en démarrer une nouvelle.
+
+    L'application n'en crée qu'un, partagé par toutes les sessions : la taille
+    du pool (Config.JOB_WORKERS, variable d'environnement JOB_WORKERS) borne
+    le nombre de tâches exécutées en même temps sur tout le serveur.
+    """
+
+    def __init__(self, max_workers: int = Config.JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Clé stable décrivant les entrées d'une tâche"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, kind: str, key: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Lance `fn(job, *args, **kwargs)` en arrière-plan, ou renvoie la tâche
+        en cours ayant la même clé.
+        """
+        with self._lock:
+            self._prune()
+            existing_id = self._active_by_key.get(key)
+            if existing_id and self._jobs[existing_id].active:
+                return self._jobs[existing_id]
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job.id
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        job.status = Job.RUNNING
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = Job.DONE
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc()}"
+            job.status = Job.FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active_by_key.get(job.key) == job.id:
+                    del self._active_by_key[job.key]
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and now - job.finished_at > Config.JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+
+# Niveaux de log, du moins au plus grave
+INFO = "info"
+SUCCESS = "success"
+WARNING = "warning"
+ERROR = "error"
+LEVELS = [INFO, SUCCESS, WARNING, ERROR]
+
+LEVEL_ICONS = {INFO: "ℹ️", SUCCESS: "✅", WARNING: "⚠️", ERROR: "❌"}
+
+
+class LogRecord:
+    """Entrée de log structurée"""
+
+    __slots__ = ("level", "stage", "message", "receipt", "timestamp", "duration")
+
+    def __init__(self, level: str, stage: str, message: str, receipt: Optional[str] = None,
+                 timestamp: Optional[float] = None, duration: Optional[float] = None):
+        self.level = level
+        self.stage = stage
+        self.message = message
+        self.receipt = receipt
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.duration = duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogRecord":
+        return cls(**{field: data.get(field) for field in cls.__slots__})
+
+    def matches(self, stage: Optional[str] = None, levels: Optional[Iterable[str]] = None,
+                search: str = "") -> bool:
+        if stage is not None and self.stage != stage:
+            return False
+        if levels is not None and self.level not in levels:
+            return False
+        if search:
+            search = search.lower()
+            return search in self.message.lower() or search in (self.receipt or "").lower()
+        return True
+
+
+class LogBuffer:
+    """
+    Tampon circulaire de logs structurés.
+
+    Seules les `capacity` entrées les plus récentes restent en mémoire ; les
+    plus anciennes sont déversées dans un fichier JSONL (lui-même borné par
+    rotation) et restent consultables page par page. Un index en mémoire
+    (position, étape, niveau de chaque ligne déversée) permet de ne relire
+    que les lignes de la page demandée.
+    """
+
+    def __init__(self, capacity: int = Config.LOG_BUFFER_SIZE, spill_path: Optional[str] = None,
+                 spill_max_bytes: int = Config.LOG_SPILL_MAX_BYTES):
+        self.capacity = capacity
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.spill_max_bytes = spill_max_bytes
+        self._records = deque()
+        # Lignes du fichier de débordement et de sa rotation (.1) : (position, étape, niveau)
+        self._spill_index: List[Tuple[int, str, str]] = []
+        self._rotated_index: List[Tuple[int, str, str]] = []
+        self._spill_size = 0
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        if self.spill_path:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._records) + len(self._spill_index) + len(self._rotated_index)
+
+    @property
+    def _rotated_path(self) -> Path:
+        return self.spill_path.with_suffix(self.spill_path.suffix + ".1")
+
+    def append(self, record: LogRecord):
+        with self._lock:
+            self._records.append(record)
+            key = (record.stage, record.level)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if len(self._records) > self.capacity:
+                self._spill(self._records.popleft())
+
+    def log(self, level: str, stage: str, message: str, receipt: Optional[str] = None,
+            duration: Optional[float] = None):
+        self.append(LogRecord(level, stage, message, receipt=receipt, duration=duration))
+
+    def _spill(self, record: LogRecord):
+        if self.spill_path is None:
+            self._discard(record.stage, record.level)
+            return
+        # Rotation : l'ancien fichier de débordement remplace la rotation précédente, oubliée
+        if self._spill_size > self.spill_max_bytes:
+            for _, stage, level in self._rotated_index:
+                self._discard(stage, level)
+            os.replace(self.spill_path, self._rotated_path)
+            self._rotated_index, self._spill_index = self._spill_index, []
+            self._spill_size = 0
+        if not self._spill_index:
+            # Nouveau fichier : les lignes d'une exécution précédente ne sont pas indexées
+            self.spill_path.write_bytes(b"")
+        line = (json.dumps(record.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.spill_path, "ab") as f:
+            f.write(line)
+        self._spill_index.append((self._spill_size, record.stage, record.level))
+        self._spill_size += len(line)
+
+    def _discard(self, stage: str, level: str):
+        """Retire des compteurs une entrée qui n'est plus consultable"""
+        key = (stage, level)
+        self._counts[key] -= 1
+        if not self._counts[key]:
+            del self._counts[key]
+
+    def _spilled_newest_first(self, stage: Optional[str], levels: Optional[set]) -> List[Tuple[Path, int]]:
+        """Lignes déversées (fichier, position) de l'étape et des niveaux demandés"""
+        located = []
+        for path, index in ((self.spill_path, self._spill_index), (self._rotated_path, self._rotated_index)):
+            located.extend(
+                (path, offset) for offset, record_stage, level in reversed(index)
+                if (stage is None or record_stage == stage) and (levels is None or level in levels)
+            )
+        return located
+
+    @staticmethod
+    def _read_spilled(located: List[Tuple[Path, int]]) -> Iterator[LogRecord]:
+        """Relit les lignes désignées, fichier par fichier"""
+        files = {}
+        try:
+            for path, offset in located:
+                f = files.get(path)
+                if f is None:
+                    f = files[path] = open(path, "rb")
+                f.seek(offset)
+                try:
+                    yield LogRecord.from_dict(json.loads(f.readline().decode("utf-8")))
+                except ValueError:
+                    continue
+        finally:
+            for f in files.values():
+                f.close()
+
+    def query(self, stage: Optional[str] = None, levels: Optional[Iterable[str]] = None, search: str = "",
+              page: int = 0, page_size: int = Config.LOG_PAGE_SIZE) -> Tuple[List[LogRecord], int]:
+        """
+        Page d'entrées filtrées, les plus récentes en premier, et nombre total
+        d'entrées correspondant au filtre. Sans recherche, seules les lignes
+        déversées de la page demandée sont relues ; une recherche dans le texte
+        relit les lignes déversées de l'étape et des niveaux filtrés.
+        """
+        levels = set(levels) if levels is not None else None
+        start, end = page * page_size, (page + 1) * page_size
+        with self._lock:
+            in_memory = [r for r in reversed(self._records) if r.matches(stage, levels, search)]
+            located = self._spilled_newest_first(stage, levels)
+            if not located:
+                return in_memory[start:end], len(in_memory)
+
+            if not search:
+                # Filtre étape / niveau résolu par l'index : relire la page seulement
+                spilled_page = located[max(0, start - len(in_memory)):max(0, end - len(in_memory))]
+                page_records = in_memory[start:end] + list(self._read_spilled(spilled_page))
+                return page_records, len(in_memory) + len(located)
+
+            matching = in_memory + [r for r in self._read_spilled(located) if r.matches(stage, levels, search)]
+        return matching[start:end], len(matching)
+
+    def counts(self, stage: Optional[str] = None) -> Dict[str, int]:
+        """Nombre d'entrées consultables par niveau (mémoire et fichiers de débordement)"""
+        counts = {level: 0 for level in LEVELS}
+        with self._lock:
+            for (record_stage, level), count in self._counts.items():
+                if stage is None or record_stage == stage:
+                    counts[level] = counts.get(level, 0) + count
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._counts.clear()
+            self._spill_index, self._rotated_index = [], []
+            self._spill_size = 0
+            if self.spill_path:
+                self.spill_path.unlink(missing_ok=True)
+                self._rotated_path.unlink(missing_ok=True)
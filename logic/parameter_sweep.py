@@ -0,0 +1,103 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from config import Config
+from logic.candidate_graph import CandidateGraph
+
+
+PARAMETERS = ["days_delta", "amount_tolerance_tier1", "amount_tolerance_tier2", "similarity_threshold"]
+
+# Graphe partagé par les évaluations d'un processus du pool (transmis une fois par processus)
+_worker_graph: Optional[CandidateGraph] = None
+
+
+def parameter_grid(values: Dict[str, Sequence[float]], max_points: int = Config.SWEEP_MAX_POINTS) -> List[Dict[str, float]]:
+    """
+    Produit cartésien des valeurs de chaque paramètre. Les combinaisons dont la
+    tolérance stricte dépasse la tolérance large sont écartées.
+    """
+    missing = [name for name in PARAMETERS if not values.get(name)]
+    if missing:
+        raise ValueError(f"Aucune valeur pour : {', '.join(missing)}")
+
+    grid = [
+        dict(zip(PARAMETERS, combination))
+        for combination in itertools.product(*(sorted(set(values[name])) for name in PARAMETERS))
+        if combination[1] <= combination[2]
+    ]
+    if len(grid) > max_points:
+        raise ValueError(f"{len(grid)} combinaisons : au plus {max_points} par balayage")
+    return grid
+
+
+def covering_limits(grid: Sequence[Dict[str, float]],
+                    limits: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Bornes du graphe des candidats (par défaut Config.CANDIDATE_GRAPH_LIMITS) élargies pour couvrir la grille"""
+    limits = dict(limits or Config.CANDIDATE_GRAPH_LIMITS)
+    for params in grid:
+        limits["days_delta"] = max(limits["days_delta"], params["days_delta"])
+        limits["amount_tolerance"] = max(limits["amount_tolerance"], params["amount_tolerance_tier1"],
+                                         params["amount_tolerance_tier2"])
+        limits["similarity_threshold"] = min(limits["similarity_threshold"], params["similarity_threshold"])
+    return limits
+
+
+def _init_worker(graph: CandidateGraph):
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _evaluate(params: Dict[str, float], mode: str, graph: Optional[CandidateGraph] = None) -> Dict[str, Any]:
+    preview = (graph or _worker_graph).preview(params, mode)
+    return {
+        **params,
+        "matched": preview["matching_count"],
+        "tier1": preview["tier1"],
+        "ambiguous": preview["ambiguous"],
+        "edges": preview["edges"],
+        "match_rate": preview["match_rate"],
+    }
+
+
+class ParameterSweep:
+    """
+    Évaluation d'une grille de paramètres de matching sur un même graphe des
+    candidats : fichiers, dates, montants et scores de similarité sont calculés
+    une seule fois, chaque combinaison n'est qu'un filtre suivi d'une affectation.
+    Les combinaisons sont réparties sur un pool de processus.
+    """
+
+    def __init__(self, graph: CandidateGraph, mode: str = Config.ASSIGNMENT_DEFAULT_MODE,
+                 workers: int = Config.SWEEP_WORKERS):
+        self.graph = graph
+        self.mode = mode
+        self.workers = workers
+
+    def run(self, grid: Sequence[Dict[str, float]]) -> pd.DataFrame:
+        """Une ligne par combinaison : paramètres, factures matchées, ambiguës, taux de matching"""
+        uncovered = [params for params in grid if not self.graph.covers(params)]
+        if uncovered:
+            raise ValueError(f"{len(uncovered)} combinaisons hors des bornes du graphe des candidats : {self.graph.limits}")
+
+        workers = max(1, min(self.workers, len(grid)))
+        if workers == 1:
+            rows = [_evaluate(params, self.mode, self.graph) for params in grid]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.graph,)) as executor:
+                rows = list(executor.map(_evaluate, grid, [self.mode] * len(grid),
+                                         chunksize=max(1, len(grid) // (workers * 4))))
+
+        table = pd.DataFrame(rows, columns=PARAMETERS + ["matched", "tier1", "ambiguous", "edges", "match_rate"])
+        return table.sort_values(["matched", "ambiguous"], ascending=[False, True], kind="stable").reset_index(drop=True)
+
+    @staticmethod
+    def chart_data(table: pd.DataFrame, value: str = "matched", x: str = "days_delta",
+                   series: str = "similarity_threshold") -> pd.DataFrame:
+        """
+        Valeur `value` en fonction de `x`, une colonne par valeur de `series`
+        (maximum sur les combinaisons des autres paramètres).
+        """
+        return table.pivot_table(index=x, columns=series, values=value, aggfunc="max").sort_index()
@@ -0,0 +1,424 @@
+import contextlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import Config
+from logic.log_buffer import ERROR, INFO, SUCCESS, WARNING
+from logic.receipt_store import ReceiptStore, receipt_key
+from logic.telemetry import Telemetry
+from logic.upload_store import UploadStore
+from logic.workspace import Workspace
+from utils import Utils
+
+
+# log(stage, message, level=INFO, receipt=None, duration=None) et report(done, total, message)
+LogFn = Callable[..., None]
+ReportFn = Callable[..., None]
+
+
+def _no_log(stage: str, message: str, level: str = INFO, **kwargs):
+    pass
+
+
+def _no_report(done: int, total: int, message: Optional[str] = None):
+    pass
+
+
+def _lock_workspace(workspace: Workspace, stage: str, log: LogFn,
+                    lock_name: Optional[str] = None) -> Optional[contextlib.ExitStack]:
+    """
+    Verrous d'une étape : « workspace » partagé (empêche le nettoyage) et
+    verrou exclusif de l'étape (une seule analyse ou un seul matching à la fois).
+    """
+    workspace.touch()
+    locks = contextlib.ExitStack()
+    try:
+        locks.enter_context(workspace.lock("workspace", shared=True))
+        locks.enter_context(workspace.lock(lock_name or stage, timeout=0))
+    except TimeoutError:
+        locks.close()
+        log(stage, "Un traitement identique est déjà en cours dans ce workspace", level=ERROR)
+        return None
+    return locks
+
+
+def save_preprocessing_report(report_path: Path, preprocessing: Optional[Dict[str, Any]], analysis_seconds: float,
+                              receipts_count: int):
+    """Enregistre le gain du pré-traitement et la latence d'analyse par facture"""
+    previous = {}
+    if report_path.exists():
+        with open(report_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    report = {
+        "preprocessing": preprocessing,
+        "latency_per_receipt": analysis_seconds / receipts_count if receipts_count else None,
+        "previous_latency_per_receipt": previous.get("latency_per_receipt"),
+    }
+    Utils.atomic_write(str(report_path), json.dumps(report, indent=2))
+
+
+def analyze_receipts(workspace: Workspace, prompt_content: Optional[str] = None, log: LogFn = _no_log,
+                     report: ReportFn = _no_report, env_path: str = ".env",
+                     preprocess_workers: int = Config.PREPROCESS_WORKERS) -> Tuple[bool, int]:
+    """
+    Analyse les factures du workspace (pré-traitement, extraction, stockage).
+
+    Sans `prompt_content`, le prompt déjà enregistré dans le workspace est utilisé.
+    Renvoie (succès, nombre de factures analysées).
+    """
+    # Modules lourds (Pillow, client API) chargés au premier traitement seulement
+    from logic.duplicate_index import DuplicateIndex, share_duplicates
+    from logic.image_preprocessing import ImagePreprocessor
+    from logic.receipt_extraction import ReceiptExtractor, receipt_images
+
+    telemetry = Telemetry("analysis")
+    locks = None
+    try:
+        # Vérifier la clé API du fichier .env
+        try:
+            api_key = Utils.load_api_key(env_path)
+            if not api_key:
+                log("analysis", "Aucune clé API valide trouvée dans le fichier .env", level=ERROR)
+                return False, 0
+        except Exception as e:
+            log("analysis", f"Erreur lors de la lecture du fichier .env: {str(e)}", level=ERROR)
+            return False, 0
+
+        workspace.ensure()
+        locks = _lock_workspace(workspace, "analysis", log)
+        if locks is None:
+            return False, 0
+        if prompt_content is not None:
+            Utils.atomic_write(str(workspace.prompt_path), prompt_content)
+        elif not workspace.prompt_path.exists():
+            log("analysis", f"Prompt introuvable : {workspace.prompt_path}", level=ERROR)
+            return False, 0
+
+        log("analysis", "Démarrage de l'analyse des factures...")
+        upload_store = UploadStore(str(workspace.receipts_dir))
+        log("analysis", f"{len(upload_store.new_files())} nouvelles factures depuis la dernière analyse")
+        receipts_count = sum(1 for item in workspace.receipts_dir.iterdir() if item.is_file())
+        report(0, receipts_count, "Analyse des factures en cours...")
+
+        # Doublons probables (même facture re-photographiée, redimensionnée...) : non envoyés à l'API
+        duplicates = {}
+        if Config.DUPLICATE_DETECTION_ENABLED and DuplicateIndex.available():
+            with telemetry.span("duplicates", images=receipts_count):
+                duplicates = DuplicateIndex(str(workspace.receipts_dir), str(workspace.duplicate_index_path),
+                                            workers=preprocess_workers).update()
+            for duplicate, canonical in duplicates.items():
+                log("analysis", f"Doublon probable de {canonical} : non analysé", level=WARNING, receipt=duplicate)
+
+        # Pré-traiter les images (orientation, niveaux de gris, rognage, réduction) avant l'envoi
+        preprocessing = None
+        if Config.PREPROCESS_ENABLED and ImagePreprocessor.available():
+            preprocessor = ImagePreprocessor(output_dir=str(workspace.preprocessed_dir), workers=preprocess_workers)
+            with telemetry.span("preprocessing", images=receipts_count):
+                stats = preprocessor.run(str(workspace.receipts_dir), exclude=duplicates)
+            preprocessing = ImagePreprocessor.summarize(stats)
+            for source, error in preprocessing["errors"].items():
+                log("analysis", f"Pré-traitement impossible, image envoyée telle quelle : {error}", level=WARNING, receipt=source)
+            # Image envoyée à l'API pour chaque facture d'origine
+            images = {s["source"]: preprocessor.output_dir / s["output"] for s in stats}
+            log("analysis", f"Images pré-traitées : {preprocessing['bytes_saved'] / (1024 * 1024):.1f} Mo économisés ({preprocessing['ratio']:.0%} de la taille d'origine)")
+        else:
+            if Config.PREPROCESS_ENABLED:
+                log("analysis", "Pillow n'est pas installé : les images sont envoyées sans pré-traitement", level=WARNING)
+            images = receipt_images(str(workspace.receipts_dir), exclude=duplicates)
+
+        # Extraire les factures (appels concurrents, limitation de débit, reprises sur erreur) ;
+        # les extractions déjà reçues, y compris celles d'un lot interrompu, viennent du cache
+        extractor = ReceiptExtractor(api_key, workspace.prompt_path.read_text(encoding="utf-8"), telemetry=telemetry)
+        with telemetry.span("batch_process", images=len(images)) as span:
+            results, failures = extractor.run(
+                images, lambda done, total, result: report(done, total, f"Extraction des factures : {done}/{total}"))
+        analysis_seconds = span["duration"]
+        if extractor.cache_hits:
+            log("analysis", f"{extractor.cache_hits} factures reprises du cache des extractions (sans appel à l'API)")
+        for name, error in failures:
+            log("analysis", f"Échec de l'extraction : {str(error)}", level=ERROR, receipt=name)
+
+        save_preprocessing_report(workspace.preprocess_report, preprocessing, analysis_seconds, len(results))
+
+        log("analysis", f"Analyse terminée : {len(results)} factures traitées", level=SUCCESS, duration=analysis_seconds)
+
+        # Les doublons reprennent les données de leur facture canonique, dans le stockage seulement (hors matching)
+        store = ReceiptStore(str(workspace.receipt_store_path))
+        shared = share_duplicates(results, duplicates, store.get)
+        if shared:
+            log("analysis", f"{len(shared)} doublons ont repris les données de leur facture d'origine")
+
+        # Ajouter uniquement les nouvelles factures au stockage incrémental
+        with telemetry.span("store_append", receipts=len(results) + len(shared)):
+            added = store.append(results + shared, overwrite=True)
+        log("analysis", f"{added} factures ajoutées ou mises à jour dans le stockage")
+        # Le matching ne lit que les factures analysées : les doublons ne concourent pas pour les lignes bancaires
+        store.export_json(str(workspace.receipts_json), keys=[receipt_key(record) for record in results])
+        # Seules les factures de ce lot : celles arrivées pendant l'analyse restent nouvelles
+        upload_store.mark_processed(record["receipt_filename"] for record in results + shared)
+        report(len(results), len(results), "Analyse terminée")
+
+        return True, len(results)
+    except Exception as e:
+        log("analysis", f"Erreur lors de l'analyse : {str(e)}", level=ERROR)
+        return False, 0
+    finally:
+        if locks is not None:
+            locks.close()
+        telemetry.export(str(workspace.telemetry_dir))
+
+
+def ingest_receipts(workspace: Workspace, source: str, log: LogFn = _no_log, report: ReportFn = _no_report,
+                    preprocess_workers: int = Config.PREPROCESS_WORKERS,
+                    remove_source: bool = False) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Importe en flux les factures d'une archive ZIP ou d'un dossier dans le workspace.
+
+    Chaque image est pré-traitée dès son arrivée (pool de processus) : l'analyse
+    suivante trouve le cache de pré-traitement déjà rempli. Avec `remove_source`,
+    la source (archive temporaire) est supprimée à la fin.
+    Renvoie (succès, compteurs de l'import).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from logic.bulk_ingestion import BulkIngestor
+    from logic.duplicate_index import DuplicateIndex
+    from logic.image_preprocessing import ImagePreprocessor
+
+    telemetry = Telemetry("ingestion")
+    locks = None
+    executor = None
+    try:
+        workspace.ensure()
+        # Même verrou que l'analyse : pas d'import pendant qu'une analyse lit le dossier des factures
+        locks = _lock_workspace(workspace, "analysis", log)
+        if locks is None:
+            return False, None
+        log("analysis", f"Import en masse depuis {Path(source).name}...")
+
+        futures = []
+        on_file = None
+        if Config.PREPROCESS_ENABLED and ImagePreprocessor.available():
+            preprocessor = ImagePreprocessor(output_dir=str(workspace.preprocessed_dir), workers=preprocess_workers)
+            executor = ProcessPoolExecutor(max_workers=max(1, preprocess_workers))
+            on_file = lambda path: futures.append(preprocessor.submit(executor, str(path)))
+
+        with telemetry.span("ingest") as span:
+            stats = BulkIngestor(str(workspace.receipts_dir), on_file=on_file).ingest(source, report=report)
+        for message in stats["error_messages"]:
+            log("analysis", f"Fichier ignoré : {message}", level=WARNING)
+
+        if executor is not None:
+            with telemetry.span("preprocessing", images=len(futures)):
+                executor.shutdown(wait=True)
+            stats["preprocessed"] = sum(1 for future in futures if future.exception() is None)
+        if Config.DUPLICATE_DETECTION_ENABLED and DuplicateIndex.available():
+            with telemetry.span("duplicates"):
+                stats["duplicates"] = DuplicateIndex(str(workspace.receipts_dir), str(workspace.duplicate_index_path),
+                                                     workers=preprocess_workers).update()
+
+        if stats["renamed"]:
+            log("analysis", f"{stats['renamed']} factures renommées : un fichier de même nom et de contenu différent "
+                            "était déjà présent", level=WARNING)
+        log("analysis", f"Import terminé : {stats['written']} nouvelles factures, {stats['unchanged']} déjà présentes, "
+                        f"{stats['skipped']} fichiers ignorés, {stats['errors']} en erreur",
+            level=SUCCESS, duration=span["duration"])
+        return True, stats
+    except Exception as e:
+        log("analysis", f"Erreur lors de l'import : {str(e)}", level=ERROR)
+        return False, None
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if locks is not None:
+            locks.close()
+        if remove_source and Path(source).is_file():
+            Path(source).unlink()
+        telemetry.export(str(workspace.telemetry_dir))
+
+
+def detect_duplicates(workspace: Workspace, log: LogFn = _no_log,
+                      report: ReportFn = _no_report) -> Tuple[bool, Optional[Dict[str, str]]]:
+    """
+    Met à jour l'index des doublons probables du workspace (hash des images
+    nouvelles ou modifiées seulement).
+
+    Renvoie (succès, doublons {doublon: facture canonique}).
+    """
+    from logic.duplicate_index import DuplicateIndex
+
+    if not Config.DUPLICATE_DETECTION_ENABLED or not DuplicateIndex.available():
+        return True, {}
+    telemetry = Telemetry("duplicates")
+    locks = None
+    try:
+        workspace.ensure()
+        locks = _lock_workspace(workspace, "analysis", log, lock_name="duplicates")
+        if locks is None:
+            return False, None
+        report(0, 1, "Recherche des doublons probables...")
+        with telemetry.span("duplicates"):
+            duplicates = DuplicateIndex(str(workspace.receipts_dir), str(workspace.duplicate_index_path)).update()
+        if duplicates:
+            log("analysis", f"{len(duplicates)} doublons probables parmi les factures téléchargées", level=WARNING)
+        report(1, 1, "Recherche des doublons terminée")
+        return True, duplicates
+    except Exception as e:
+        log("analysis", f"Erreur lors de la recherche des doublons : {str(e)}", level=ERROR)
+        return False, None
+    finally:
+        if locks is not None:
+            locks.close()
+        telemetry.export(str(workspace.telemetry_dir))
+
+
+def match_receipts(workspace: Workspace, matching_params: Dict[str, Any], log: LogFn = _no_log,
+                   report: ReportFn = _no_report) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Rapproche les factures analysées des relevés bancaires du workspace.
+
+    Renvoie (succès, résultats du matcher, chemin du JSON de matching).
+    """
+    from logic.receipt_matcher import ReceiptMatcher
+
+    telemetry = Telemetry("matching")
+    locks = None
+    try:
+        workspace.ensure()
+        locks = _lock_workspace(workspace, "matching", log)
+        if locks is None:
+            return False, None, None
+        log("matching", "Démarrage du processus de matching...")
+        report(0, 1, "Matching en cours...")
+
+        # Initialiser le matcher avec les paramètres fournis
+        matcher = ReceiptMatcher(
+            receipts_json_path=str(workspace.receipts_json),
+            bank_statements_dir=str(workspace.bank_statements_dir),
+            output_dir=str(workspace.matching_dir),
+            days_delta=matching_params["days_delta"],
+            amount_tolerance_tier1=matching_params["amount_tolerance_tier1"],
+            amount_tolerance_tier2=matching_params["amount_tolerance_tier2"],
+            similarity_threshold=matching_params["similarity_threshold"]
+        )
+
+        # Exécuter le processus complet
+        with telemetry.span("run_complete_process", **matching_params) as span:
+            results = matcher.run_complete_process()
+        matching_seconds = span["duration"]
+
+        if results["success"]:
+            log("matching", f"Matching terminé : {results['matching_count']}/{results['matching_total']} factures matchées", level=SUCCESS, duration=matching_seconds)
+            log("matching", f"{len(results['enriched_files'])} relevés bancaires enrichis", level=SUCCESS)
+
+            if results["matching_json"]:
+                report(1, 1, "Matching terminé")
+                return True, results, results["matching_json"]
+            log("matching", "Aucun fichier de résultats généré", level=WARNING)
+            return False, None, None
+        log("matching", f"Erreur : {results.get('error', 'Erreur inconnue')}", level=ERROR)
+        return False, None, None
+    except Exception as e:
+        log("matching", f"Erreur lors du matching : {str(e)}", level=ERROR)
+        return False, None, None
+    finally:
+        if locks is not None:
+            locks.close()
+        telemetry.export(str(workspace.telemetry_dir))
+
+
+def sweep_parameters(workspace: Workspace, values: Dict[str, Any], mode: str = Config.ASSIGNMENT_DEFAULT_MODE,
+                     log: LogFn = _no_log, report: ReportFn = _no_report,
+                     workers: int = Config.SWEEP_WORKERS) -> Tuple[bool, Optional[Any]]:
+    """
+    Évalue toutes les combinaisons des valeurs de paramètres de matching
+    ({paramètre: [valeurs]}) sur les factures et relevés du workspace.
+
+    Renvoie (succès, table des résultats) ; la table est aussi écrite dans
+    le dossier de matching (parameter_sweep.csv).
+    """
+    from logic.candidate_graph import CandidateGraph
+    from logic.parameter_sweep import ParameterSweep, covering_limits, parameter_grid
+
+    telemetry = Telemetry("sweep")
+    locks = None
+    try:
+        workspace.ensure()
+        locks = _lock_workspace(workspace, "matching", log, lock_name="sweep")
+        if locks is None:
+            return False, None
+        if not workspace.receipts_json.exists():
+            log("matching", "Aucune facture analysée : balayage impossible", level=ERROR)
+            return False, None
+
+        grid = parameter_grid(values)
+        if not grid:
+            log("matching", "Aucune combinaison à évaluer : la tolérance stricte dépasse la tolérance large "
+                            "dans toutes les combinaisons choisies", level=ERROR)
+            return False, None
+        log("matching", f"Balayage de {len(grid)} combinaisons de paramètres...")
+        report(0, len(grid), "Préparation du graphe des candidats...")
+
+        # Graphe commun à toutes les combinaisons (même cache que l'aperçu de l'onglet Matching)
+        with telemetry.span("candidate_graph"):
+            graph = CandidateGraph.load(str(workspace.receipts_json), str(workspace.bank_statements_dir),
+                                        limits=covering_limits(grid))
+        report(0, len(grid), "Balayage en cours...")
+        with telemetry.span("sweep", points=len(grid), edges=len(graph)) as span:
+            table = ParameterSweep(graph, mode=mode, workers=workers).run(grid)
+        Utils.atomic_write(str(workspace.matching_dir / "parameter_sweep.csv"), table.to_csv(index=False))
+
+        best = table.iloc[0]
+        log("matching", f"Balayage terminé : meilleur résultat {int(best['matched'])}/{graph.receipts_count} factures "
+                        f"(jours {int(best['days_delta'])}, tolérances {best['amount_tolerance_tier1']:.2f}/"
+                        f"{best['amount_tolerance_tier2']:.2f}, similarité {int(best['similarity_threshold'])})",
+            level=SUCCESS, duration=span["duration"])
+        report(len(grid), len(grid), "Balayage terminé")
+        return True, table
+    except Exception as e:
+        log("matching", f"Erreur lors du balayage des paramètres : {str(e)}", level=ERROR)
+        return False, None
+    finally:
+        if locks is not None:
+            locks.close()
+        telemetry.export(str(workspace.telemetry_dir))
+
+
+def run_workspace(root: str, matching_params: Dict[str, Any], skip_analysis: bool = False,
+                  env_path: str = ".env", preprocess_workers: int = 1) -> Dict[str, Any]:
+    """
+    Analyse puis matching (avec enrichissement des relevés) d'un workspace.
+
+    Fonction de niveau module pour être exécutée dans un pool de processus ;
+    les messages sont renvoyés dans le résumé.
+    """
+    start = time.perf_counter()
+    workspace = Workspace(root)
+    messages = []
+
+    def log(stage: str, message: str, level: str = INFO, **kwargs):
+        messages.append({"stage": stage, "level": level, "message": message})
+
+    summary = {"workspace": str(workspace.root), "success": False, "receipts": None, "matched": None,
+               "total": None, "enriched_files": 0, "matching_json": None}
+    if not skip_analysis:
+        analyzed, summary["receipts"] = analyze_receipts(workspace, log=log, env_path=env_path,
+                                                         preprocess_workers=preprocess_workers)
+        if not analyzed:
+            summary.update(seconds=time.perf_counter() - start, messages=messages)
+            return summary
+
+    matched, results, matching_json = match_receipts(workspace, matching_params, log=log)
+    if matched:
+        summary.update(
+            success=True,
+            matched=results["matching_count"],
+            total=results["matching_total"],
+            enriched_files=len(results.get("enriched_files", [])),
+            matching_json=matching_json,
+        )
+    summary.update(seconds=time.perf_counter() - start, messages=messages)
+    return summary
@@ -0,0 +1,104 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from logic.extraction_cache import ExtractionCache
+from logic.extraction_engine import ApiResponse, ExtractionEngine, ExtractionResult, MistralVisionClient
+
+
+# Extensions envoyées à l'API
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def receipt_images(directory: str, exclude: Any = ()) -> Dict[str, Path]:
+    """Images d'un dossier à extraire : {nom de la facture: chemin}, sauf les noms de `exclude`"""
+    return {
+        path.name: path for path in sorted(Path(directory).iterdir())
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and path.name not in exclude
+    }
+
+
+def to_record(name: str, value: Any) -> Dict[str, Any]:
+    """Facture extraite (réponse de l'API) avec le nom du fichier d'origine"""
+    data = value.data if isinstance(value, ApiResponse) else value
+    record = dict(data) if isinstance(data, dict) else {"raw_response": data}
+    record["receipt_filename"] = name
+    return record
+
+
+class ReceiptExtractor:
+    """
+    Extraction d'un lot de factures par l'API Mistral, via ExtractionEngine
+    (appels concurrents, limitation de débit, reprises sur erreur).
+
+    Chaque image est d'abord cherchée dans le cache des extractions (clé :
+    image envoyée, prompt, modèle) ; seules les absentes partent à l'API, et
+    chaque réponse décodée est mise en cache dès sa réception.
+
+    Ce cache sert aussi de point de reprise : après une interruption, les
+    factures déjà reçues sont relues au lancement suivant au lieu d'être
+    payées à nouveau. La reprise ne vaut que tant que les entrées restent en
+    cache : l'éviction (âge, taille, nombre d'entrées, cache partagé par tous
+    les espaces de travail) peut en supprimer, et un changement d'image
+    pré-traitée, de prompt ou de modèle change la clé ; ces factures sont
+    alors simplement ré-extraites.
+
+    Les images sont désignées par le nom de la facture d'origine : l'image
+    envoyée peut être sa version pré-traitée (autre extension).
+    """
+
+    def __init__(self, api_key: str, prompt: str, model: str = Config.MISTRAL_MODEL,
+                 engine: Optional[ExtractionEngine] = None, client: Optional[MistralVisionClient] = None,
+                 cache: Optional[ExtractionCache] = None, telemetry=None):
+        self.prompt = prompt
+        self.model = model
+        self.client = client or MistralVisionClient(api_key, model=model)
+        self.engine = engine or ExtractionEngine(telemetry=telemetry)
+        self.cache = cache or ExtractionCache()
+        # Nombre de factures du dernier lot reprises du cache
+        self.cache_hits = 0
+
+    def _extract(self, path: str, key: str) -> Any:
+        response = self.client.extract(path, self.prompt)
+        data = response.data if isinstance(response, ApiResponse) else response
+        # Réponse non décodée ({"raw_response": ...}) : pas mise en cache, la facture sera redemandée
+        if not (isinstance(data, dict) and "raw_response" in data):
+            self.cache.put(key, data)
+        return response
+
+    def run(self, images: Dict[str, Path],
+            progress_callback: Optional[Callable[[int, int, ExtractionResult], None]] = None
+            ) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Exception]]]:
+        """
+        Extrait les images {nom: chemin}. Renvoie (factures extraites dans
+        l'ordre des noms, [(nom, erreur)] des extractions en échec).
+        """
+        names = {str(path): name for name, path in images.items()}
+        cached_paths, missing = self.cache.partition(list(names), self.prompt, self.model)
+        cached = {names[path]: data for path, data in cached_paths.items()}
+        keys = {names[path]: key for path, key in missing}
+        self.cache_hits = len(cached)
+        pending = [name for name in images if name in keys]
+
+        def on_result(done: int, total: int, result: ExtractionResult):
+            if progress_callback:
+                progress_callback(len(cached) + done, len(images), result)
+
+        if progress_callback and cached:
+            progress_callback(len(cached), len(images), None)
+        estimate = MistralVisionClient.estimate_tokens(self.prompt)
+        results = self.engine.run(
+            pending,
+            lambda name: self._extract(str(images[name]), keys[name]),
+            lambda name: estimate,
+            on_result,
+        )
+        try:
+            self.cache.evict()
+        finally:
+            self.cache.save_stats()
+
+        values = {**cached, **{r.item: r.value for r in results if r.success}}
+        records = [to_record(name, values[name]) for name in images if name in values]
+        failures = [(r.item, r.error) for r in results if not r.success]
+        return records, failures
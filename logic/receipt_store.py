@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from config import Config
+from logic.file_lock import FileLock
+from utils import Utils
+
+
+# Version du format de l'index (à incrémenter si le calcul des clés change)
+_INDEX_VERSION = 2
+
+
+def receipt_key(record: Dict[str, Any]) -> Optional[str]:
+    """Nom du fichier (avec extension : a.jpg et a.png sont deux factures) identifiant une facture extraite"""
+    for field in Config.RECEIPT_KEY_FIELDS:
+        value = record.get(field)
+        if value:
+            return Path(str(value)).name
+    return None
+
+
+class ReceiptStore:
+    """
+    Stockage des factures extraites en JSONL, en ajout seul.
+
+    Chaque facture occupe une ligne ; un index {nom de fichier: position}
+    persisté à côté permet une lecture directe d'une facture sans relire
+    tout le fichier. Les nouvelles factures sont ajoutées en fin de fichier.
+    """
+
+    def __init__(self, store_path: str = Config.RECEIPT_STORE_PATH):
+        self.store_path = Path(store_path)
+        self.index_path = self.store_path.with_suffix(self.store_path.suffix + ".idx")
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.store_path.touch(exist_ok=True)
+        self._index: Dict[str, int] = {}
+        self._indexed_size = 0
+        # Une même instance peut servir plusieurs sessions (cache de l'application)
+        self._lock = threading.Lock()
+        with self._file_lock():
+            self._load_index()
+
+    def _file_lock(self) -> FileLock:
+        """Verrou inter-processus du stockage et de son index"""
+        return FileLock(str(self.store_path) + ".lock")
+
+    def _load_index(self):
+        """Charge l'index et indexe la fin du fichier (appelé sous `_file_lock`)"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != _INDEX_VERSION:
+                raise ValueError("format d'index obsolète")
+            self._index = data["offsets"]
+            self._indexed_size = data["size"]
+        except (FileNotFoundError, ValueError, KeyError):
+            self._index = {}
+            self._indexed_size = 0
+
+        # Index absent ou en retard sur le fichier : indexer la fin du fichier
+        size = self.store_path.stat().st_size
+        if size < self._indexed_size:
+            self._index = {}
+            self._indexed_size = 0
+        if size > self._indexed_size:
+            self._scan_from(self._indexed_size)
+            self._save_index()
+
+    def _scan_from(self, offset: int):
+        with open(self.store_path, "rb") as f:
+            f.seek(offset)
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    # Ligne incomplète (écriture interrompue) : ignorée
+                    break
+                try:
+                    key = receipt_key(json.loads(line))
+                except ValueError:
+                    key = None
+                if key:
+                    self._index[key] = position
+                self._indexed_size = f.tell()
+
+    def _save_index(self):
+        Utils.atomic_write(str(self.index_path), json.dumps(
+            {"version": _INDEX_VERSION, "size": self._indexed_size, "offsets": self._index}))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def append(self, records: Iterable[Dict[str, Any]], overwrite: bool = False) -> int:
+        """
+        Ajoute les factures non encore présentes et renvoie le nombre ajouté.
+
+        Avec `overwrite=True`, une facture déjà connue dont le contenu a changé
+        est ré-écrite en fin de fichier et l'index pointe vers la nouvelle
+        version ; une facture identique à la version stockée n'est pas réécrite.
+        """
+        added = 0
+        # Verrou : plusieurs sessions ou processus peuvent partager le même stockage
+        with self._file_lock():
+            if self.store_path.stat().st_size != self._indexed_size:
+                self._load_index()
+            with open(self.store_path, "ab") as f:
+                for record in records:
+                    key = receipt_key(record)
+                    if not key or (key in self._index and (not overwrite or self._read(key) == record)):
+                        continue
+                    position = f.tell()
+                    f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self._index[key] = position
+                    added += 1
+                f.flush()
+                os.fsync(f.fileno())
+                self._indexed_size = f.tell()
+
+            if added:
+                self._save_index()
+        return added
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        position = self._index.get(key)
+        if position is None:
+            return None
+        with open(self.store_path, "rb") as f:
+            f.seek(position)
+            return json.loads(f.readline())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Lecture directe d'une facture à partir de son nom de fichier ; un nom
+        sans extension désigne la première facture de ce nom
+        """
+        # Factures ajoutées entre-temps (autre instance ou processus) : seule la fin du fichier est indexée
+        with self._lock:
+            try:
+                size = self.store_path.stat().st_size
+            except FileNotFoundError:
+                # Stockage supprimé (workspace vidé) depuis la création de l'instance
+                return None
+            if size > self._indexed_size:
+                self._scan_from(self._indexed_size)
+            elif size < self._indexed_size:
+                with self._file_lock():
+                    self._load_index()
+        key = Path(key).name
+        if key not in self._index and not Path(key).suffix:
+            key = min((name for name in self._index if Path(name).stem == key), default=key)
+        return self._read(key)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Parcourt les factures en flux (dernière version de chacune uniquement)"""
+        with open(self.store_path, "rb") as f:
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                if self._index.get(receipt_key(record)) == position:
+                    yield record
+
+    def export_json(self, json_path: str, keys: Optional[Iterable[str]] = None):
+        """
+        Écrit les factures (celles de `keys` seulement, si donné) au format
+        tableau JSON d'all_receipts.json, en flux depuis le stockage
+        """
+        json_path = Path(json_path)
+        keys = None if keys is None else set(keys)
+        tmp_path = json_path.with_name(f".{json_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            written = 0
+            for record in self.iter_records():
+                if keys is not None and receipt_key(record) not in keys:
+                    continue
+                f.write(",\n" if written else "\n")
+                json.dump(record, f, ensure_ascii=False)
+                written += 1
+            f.write("\n]")
+        os.replace(tmp_path, json_path)
@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logic.columnar import RESULT_CENTS_COLUMNS, results_table
+from utils import Utils
+
+
+# Version du format de la copie Parquet (à incrémenter si le schéma change)
+_FORMAT_VERSION = 3
+
+# Colonnes affichées et leurs libellés
+MATCHED_COLUMNS = {
+    "receipt_filename": "Nom du fichier",
+    "receipt_cents": "Montant facture",
+    "receipt_date": "Date facture",
+    "vendor_receipt": "Vendeur facture",
+    "bank_cents": "Montant banque",
+    "bank_date": "Date banque",
+    "bank_vendor": "Vendeur banque",
+}
+
+UNMATCHED_COLUMNS = {
+    "receipt_filename": "Nom du fichier",
+    "receipt_cents": "Montant",
+    "receipt_date": "Date",
+    "vendor_receipt": "Vendeur",
+    "reason": "Raison",
+}
+
+# Colonnes dans lesquelles porte la recherche
+SEARCH_COLUMNS = ["receipt_filename", "vendor_receipt", "bank_vendor"]
+
+
+class ResultsView:
+    """
+    Résultats du matching sous forme de table colonne typée (voir
+    logic.columnar.results_table), avec filtre, tri et pagination côté
+    serveur : seule la page demandée est convertie pour l'affichage et envoyée
+    au navigateur.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        # Dernier masque calculé ((matchées, recherche), masque), remplacé d'un bloc :
+        # la vue est partagée entre les sessions
+        self._last_mask: Optional[Tuple[Tuple[bool, str], np.ndarray]] = None
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "ResultsView":
+        return cls(results_table(records))
+
+    @classmethod
+    def from_json(cls, json_path: str) -> "ResultsView":
+        """
+        Charge le JSON de matching. La table typée est gardée à côté du
+        fichier au format Parquet pour les chargements suivants (si un moteur
+        Parquet est installé) : ils ne passent plus par les dictionnaires.
+        """
+        json_path = Path(json_path)
+        parquet_path = json_path.with_suffix(f".v{_FORMAT_VERSION}.parquet")
+        if parquet_path.exists() and parquet_path.stat().st_mtime_ns >= json_path.stat().st_mtime_ns:
+            try:
+                return cls(pd.read_parquet(parquet_path))
+            except (ImportError, OSError, ValueError):
+                # Pas de moteur Parquet, ou copie illisible : relecture du JSON
+                pass
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        table = results_table(records if isinstance(records, list) else [])
+        try:
+            # Écriture atomique : la copie est partagée par toutes les sessions
+            Utils.atomic_write(str(parquet_path), table.to_parquet(index=False))
+        except (ImportError, OSError):
+            pass
+        return cls(table)
+
+    def counts(self) -> Tuple[int, int]:
+        """(nombre de factures matchées, nombre de non matchées)"""
+        matched = int(self.table["matched"].sum())
+        return matched, len(self.table) - matched
+
+    def columns(self, matched: bool) -> Dict[str, str]:
+        mapping = MATCHED_COLUMNS if matched else UNMATCHED_COLUMNS
+        return {column: label for column, label in mapping.items() if column in self.table.columns}
+
+    def _search_mask(self, search: str) -> np.ndarray:
+        search = search.lower()
+        mask = np.zeros(len(self.table), dtype=bool)
+        for column in SEARCH_COLUMNS:
+            values = self.table[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Recherche sur le dictionnaire des valeurs distinctes, puis lecture des codes
+                found = values.cat.categories.str.lower().str.contains(search, regex=False)
+                codes = values.cat.codes.to_numpy()
+                mask |= (codes >= 0) & np.append(found, False)[codes]
+            else:
+                mask |= values.str.lower().str.contains(search, regex=False).fillna(False).to_numpy(dtype=bool)
+        return mask
+
+    def _filtered(self, matched: bool, search: str = "") -> pd.DataFrame:
+        # Masque de la dernière recherche gardé : changer de page ou de tri ne le recalcule pas
+        last = self._last_mask
+        if last is not None and last[0] == (matched, search):
+            return self.table[last[1]]
+        mask = self.table["matched"].to_numpy() == matched
+        if search:
+            mask &= self._search_mask(search)
+        self._last_mask = ((matched, search), mask)
+        return self.table[mask]
+
+    def _display(self, rows: pd.DataFrame, matched: bool) -> pd.DataFrame:
+        """Colonnes affichées, montants en euros et libellés des colonnes"""
+        columns = self.columns(matched)
+        rows = rows[list(columns)].copy()
+        for column in RESULT_CENTS_COLUMNS:
+            if column in rows.columns:
+                rows[column] = rows[column].astype("Float64") / 100
+        return rows.rename(columns=columns)
+
+    def query(self, matched: bool, search: str = "", sort_by: Optional[str] = None, ascending: bool = True,
+              page: int = 0, page_size: int = 50) -> Tuple[pd.DataFrame, int]:
+        """Page de résultats (colonnes renommées pour l'affichage) et nombre total de lignes"""
+        rows = self._filtered(matched, search)
+        total = len(rows)
+        if sort_by and sort_by in rows.columns:
+            rows = rows.sort_values(sort_by, ascending=ascending, kind="stable")
+        start = page * page_size
+        return self._display(rows.iloc[start:start + page_size], matched), total
+
+    def filenames(self, matched: bool, search: str = "", limit: int = 200) -> List[str]:
+        """Noms de fichiers correspondant à la recherche (pour le sélecteur d'image)"""
+        rows = self._filtered(matched, search)
+        return rows["receipt_filename"].dropna().head(limit).tolist()
+
+    def to_csv(self, matched: bool, search: str = "") -> bytes:
+        """Export CSV complet (filtré), généré uniquement à la demande"""
+        return self._display(self._filtered(matched, search), matched).to_csv(index=False).encode("utf-8")
@@ -0,0 +1,249 @@
+import codecs
+import csv
+import hashlib
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from logic.columnar import interned
+from utils import Utils
+
+
+_DECIMAL_COMMA_RE = re.compile(r"\d,\d{2}(?!\d)")
+_DECIMAL_POINT_RE = re.compile(r"\d\.\d{2}(?!\d)")
+# Version du format des tables en cache (à incrémenter si l'analyse des fichiers change)
+_CACHE_VERSION = 2
+# Dernier séparateur d'un montant suivi d'un ou deux chiffres : séparateur décimal
+_AMOUNT_DECIMAL_RE = r"\d([.,])\d{1,2}$"
+
+
+def _normalize_column(name: str) -> str:
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(name.lower().replace("_", " ").split())
+
+
+class StatementIngestor:
+    """
+    Chargement des relevés bancaires CSV en table normalisée.
+
+    Le dialecte (encodage, séparateur, séparateur décimal, format de date) est
+    détecté une seule fois par fichier sur un échantillon, puis le fichier est
+    lu par blocs. La table obtenue (date en datetime64, montant en centimes
+    entiers, libellé interné, numéro de ligne d'origine) est mise en cache au format
+    Parquet, indexée par le hash du fichier.
+    """
+
+    def __init__(self, cache_dir: str = Config.STATEMENT_CACHE_DIR, chunksize: int = Config.STATEMENT_CHUNK_ROWS):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.chunksize = chunksize
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """SHA-256 du fichier, lu par blocs"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def detect_dialect(path: str, sample_size: int = 64 * 1024) -> Dict[str, str]:
+        """Détecte encodage, séparateur de colonnes et séparateur décimal"""
+        with open(path, "rb") as f:
+            raw = f.read(sample_size)
+
+        # Échantillon tronqué : un caractère multi-octets coupé en fin de lecture
+        # ne doit pas faire écarter le bon encodage
+        truncated = len(raw) == sample_size
+        encoding, sample = Config.STATEMENT_ENCODINGS[-1], None
+        for candidate in Config.STATEMENT_ENCODINGS:
+            try:
+                sample = codecs.getincrementaldecoder(candidate)().decode(raw, final=not truncated)
+                encoding = candidate
+                break
+            except UnicodeDecodeError:
+                continue
+        if sample is None:
+            sample = raw.decode(encoding, errors="replace")
+
+        # Ne pas analyser une ligne coupée en fin d'échantillon
+        if truncated and "\n" in sample:
+            sample = sample[:sample.rindex("\n")]
+
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=";,\t|").delimiter
+        except csv.Error:
+            delimiter = ";"
+
+        if delimiter == ",":
+            decimal = "."
+        else:
+            decimal = "," if len(_DECIMAL_COMMA_RE.findall(sample)) >= len(_DECIMAL_POINT_RE.findall(sample)) else "."
+
+        return {"encoding": encoding, "delimiter": delimiter, "decimal": decimal}
+
+    @staticmethod
+    def detect_columns(columns: List[str]) -> Dict[str, Optional[str]]:
+        """Associe les colonnes du fichier aux rôles date / libellé / montant / débit / crédit"""
+        normalized = {_normalize_column(c): c for c in columns}
+
+        def find(candidates):
+            for candidate in candidates:
+                if candidate in normalized:
+                    return normalized[candidate]
+            for name, original in normalized.items():
+                if any(name.startswith(candidate) for candidate in candidates):
+                    return original
+            return None
+
+        return {
+            "date": find(Config.STATEMENT_DATE_COLUMNS),
+            "label": find(Config.STATEMENT_LABEL_COLUMNS),
+            "amount": find(Config.STATEMENT_AMOUNT_COLUMNS),
+            "debit": find(Config.STATEMENT_DEBIT_COLUMNS),
+            "credit": find(Config.STATEMENT_CREDIT_COLUMNS),
+        }
+
+    @staticmethod
+    def detect_date_format(values: pd.Series) -> Optional[str]:
+        """Format de Config.DATE_FORMATS qui reconnaît le plus de valeurs de l'échantillon"""
+        values = values.dropna().astype(str).str.strip()
+        if values.empty:
+            return None
+        best_format, best_count = None, 0
+        for date_format in Config.DATE_FORMATS:
+            count = pd.to_datetime(values, format=date_format, errors="coerce").notna().sum()
+            if count > best_count:
+                best_format, best_count = date_format, count
+        return best_format
+
+    @staticmethod
+    def detect_decimal(values: pd.Series) -> Optional[str]:
+        """
+        Séparateur décimal des valeurs d'une colonne de montants (« -12,50 »,
+        « 1 234.56 »), ou None si l'échantillon ne permet pas de trancher
+        """
+        text = values.dropna().astype("string").str.replace(r"[\s €]|EUR", "", regex=True)
+        separators = text.str.extract(_AMOUNT_DECIMAL_RE, expand=False).dropna()
+        if separators.empty:
+            return None
+        commas = int((separators == ",").sum())
+        return "," if commas >= len(separators) - commas else "."
+
+    @staticmethod
+    def parse_amounts(values: pd.Series, decimal: str) -> pd.Series:
+        """Montants texte (« 1 234,56 € ») en centimes entiers (Int64, vide si illisible)"""
+        text = values.astype("string").str.replace(r"[\s €]|EUR", "", regex=True)
+        if decimal == ",":
+            text = text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        else:
+            text = text.str.replace(",", "", regex=False)
+        amounts = pd.to_numeric(text, errors="coerce")
+        return np.rint(amounts * 100).astype("Int64")
+
+    @staticmethod
+    def empty_table() -> pd.DataFrame:
+        return pd.DataFrame({
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "label": pd.Series(dtype="category"),
+            "amount_cents": pd.Series(dtype="Int64"),
+            "row": pd.Series(dtype="int64"),
+            "source_file": pd.Series(dtype="category"),
+        })
+
+    def _normalize_chunk(self, chunk: pd.DataFrame, columns: Dict[str, Optional[str]], dialect: Dict[str, str],
+                         date_format: Optional[str], source_file: str) -> pd.DataFrame:
+        if columns["amount"]:
+            amount_cents = self.parse_amounts(chunk[columns["amount"]], dialect["decimal"])
+        else:
+            missing = pd.Series(pd.NA, index=chunk.index, dtype="Int64")
+            debit = self.parse_amounts(chunk[columns["debit"]], dialect["decimal"]) if columns["debit"] else missing
+            credit = self.parse_amounts(chunk[columns["credit"]], dialect["decimal"]) if columns["credit"] else missing
+            # Débit en négatif, crédit en positif
+            amount_cents = credit.fillna(0) - debit.abs().fillna(0)
+            amount_cents[debit.isna() & credit.isna()] = pd.NA
+
+        dates = chunk[columns["date"]].astype("string").str.strip() if columns["date"] else pd.Series(pd.NA, index=chunk.index)
+        return pd.DataFrame({
+            "date": Utils.parse_date_series(dates, formats=[date_format] if date_format else None),
+            "label": chunk[columns["label"]].astype("string").fillna("") if columns["label"] else "",
+            "amount_cents": amount_cents,
+            "row": chunk.index.to_numpy(dtype=np.int64),
+            "source_file": source_file,
+        })
+
+    def _parse(self, path: Path) -> pd.DataFrame:
+        dialect = self.detect_dialect(str(path))
+        reader = pd.read_csv(
+            path,
+            sep=dialect["delimiter"],
+            encoding=dialect["encoding"],
+            dtype=str,
+            chunksize=self.chunksize,
+            skipinitialspace=True,
+        )
+
+        chunks = []
+        columns, date_format = None, None
+        for chunk in reader:
+            if columns is None:
+                columns = self.detect_columns(list(chunk.columns))
+                if columns["date"]:
+                    date_format = self.detect_date_format(chunk[columns["date"]].head(1000))
+                # Séparateur décimal lu dans les montants eux-mêmes : un CSV séparé par
+                # des virgules peut contenir des montants français entre guillemets
+                amount_columns = [columns[role] for role in ("amount", "debit", "credit") if columns[role]]
+                if amount_columns:
+                    sample = pd.concat([chunk[column].head(1000) for column in amount_columns])
+                    dialect = {**dialect, "decimal": self.detect_decimal(sample) or dialect["decimal"]}
+            chunks.append(self._normalize_chunk(chunk, columns, dialect, date_format, path.name))
+
+        if not chunks:
+            return self.empty_table()
+        table = pd.concat(chunks, ignore_index=True)
+        table["label"] = interned(table["label"])
+        table["source_file"] = table["source_file"].astype("category")
+        return table
+
+    def load(self, path: str) -> pd.DataFrame:
+        """Table normalisée d'un relevé (depuis le cache Parquet si le fichier est inchangé)"""
+        path = Path(path)
+        cache_path = self.cache_dir / f"{self.file_hash(str(path))}.v{_CACHE_VERSION}.parquet"
+        if cache_path.exists():
+            try:
+                table = pd.read_parquet(cache_path, memory_map=True)
+                table["label"] = interned(table["label"])
+                table["source_file"] = path.name
+                table["source_file"] = table["source_file"].astype("category")
+                return table
+            except ImportError:
+                pass
+            except (OSError, ValueError):
+                # Cache illisible (fichier tronqué ou corrompu) : relevé relu et cache réécrit
+                pass
+
+        table = self._parse(path)
+        try:
+            # Nom temporaire propre à chaque écrivain (sessions concurrentes sur le même relevé)
+            Utils.atomic_write(str(cache_path), table.to_parquet(index=False))
+        except ImportError:
+            # pyarrow/fastparquet absent : pas de cache, le relevé sera relu
+            pass
+        return table
+
+    def load_directory(self, directory: str) -> pd.DataFrame:
+        """Concatène les tables normalisées de tous les CSV d'un dossier"""
+        tables = [self.load(str(path)) for path in sorted(Path(directory).glob("*.csv"))]
+        if not tables:
+            return self.empty_table()
+        table = pd.concat(tables, ignore_index=True)
+        # Dictionnaires des libellés propres à chaque fichier : réunis après concaténation
+        table["label"] = interned(table["label"])
+        table["source_file"] = table["source_file"].astype("category")
+        return table
@@ -0,0 +1,206 @@
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import Config
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (compatible Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(float(b) for b in buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        value = float(value)
+        position = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                position = i
+                break
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile estimé : borne supérieure du seau qui le contient"""
+        if not self.count:
+            return None
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, count in zip(self.buckets + [self.max], self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": self.buckets,
+            "counts": self.counts,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Telemetry:
+    """
+    Mesures d'une exécution : spans (durée de chaque étape, imbriqués par
+    thread), compteurs et histogrammes des appels API.
+    """
+
+    def __init__(self, run: str, run_id: Optional[str] = None):
+        self.run = run
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """Mesure la durée du bloc ; les spans ouverts dans le bloc en deviennent les enfants"""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        record = {
+            "name": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "start": time.time() - self.started_at,
+            "duration": None,
+            "attributes": attributes,
+        }
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    def increment(self, counter: str, value: float = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def observe(self, metric: str, value: float):
+        with self._lock:
+            histogram = self.histograms.get(metric)
+            if histogram is None:
+                histogram = self.histograms[metric] = Histogram(Config.TELEMETRY_BUCKETS[metric])
+            histogram.observe(value)
+
+    def record_api_call(self, attempts: int, response=None, error: Optional[Exception] = None):
+        """Enregistre un appel API (réponse de type ApiResponse, ou erreur finale)"""
+        self.increment("api_calls")
+        self.increment("api_retry_attempts_total", max(0, attempts - 1))
+        self.observe("api_retries", max(0, attempts - 1))
+        if error is not None:
+            self.increment("api_errors")
+        if response is not None and hasattr(response, "latency"):
+            self.observe("api_latency_seconds", response.latency)
+            self.observe("api_payload_bytes", response.payload_bytes)
+            self.observe("api_tokens", response.total_tokens)
+            self.increment("api_tokens_consumed_total", response.total_tokens)
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Durée cumulée par nom de span"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration"]
+        return totals
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+            counters = dict(self.counters)
+            histograms = {name: h.to_dict() for name, h in self.histograms.items()}
+        return {
+            "run": self.run,
+            "run_id": self.run_id,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "stages": self.stage_totals(),
+            "spans": spans,
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Export au format texte Prometheus (collecteur textfile). Un compteur et
+        un histogramme de même nom déclareraient deux fois la même famille :
+        ValueError plutôt qu'un fichier rejeté par le collecteur.
+        """
+        prefix = Config.TELEMETRY_METRIC_PREFIX
+        run = f'run="{self.run}"'
+        report = self.report()
+        families = ["stage_seconds", *report["counters"], *report["histograms"]]
+        duplicates = sorted({name for name in families if families.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Métriques déclarées plusieurs fois : {', '.join(duplicates)}")
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Durée cumulée par étape de la dernière exécution",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for stage, seconds in sorted(self.stage_totals().items()):
+            lines.append(f'{prefix}_stage_seconds{{{run},stage="{stage}"}} {seconds:.6f}')
+
+        for counter, value in sorted(report["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{counter} counter")
+            lines.append(f"{prefix}_{counter}{{{run}}} {value}")
+
+        for name, histogram in sorted(report["histograms"].items()):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"] + ["+Inf"], histogram["counts"]):
+                cumulative += count
+                lines.append(f'{prefix}_{name}_bucket{{{run},le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_sum{{{run}}} {histogram['sum']}")
+            lines.append(f"{prefix}_{name}_count{{{run}}} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, output_dir: str = Config.TELEMETRY_DIR) -> Tuple[Path, Path]:
+        """Écrit le rapport JSON et le fichier Prometheus de l'exécution"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        json_path = output_dir / f"{self.run}_report.json"
+        prom_path = output_dir / f"{self.run}.prom"
+        for path, content in ((json_path, json.dumps(self.report(), indent=2)), (prom_path, self.to_prometheus())):
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return json_path, prom_path
+
+    @staticmethod
+    def load_report(run: str, output_dir: str = Config.TELEMETRY_DIR) -> Optional[Dict[str, Any]]:
+        try:
+            with open(Path(output_dir) / f"{run}_report.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import Config
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow est optionnel : sans lui, pas de vignettes
+    Image = None
+    ImageOps = None
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Version du format de l'index (clé : nom de fichier complet)
+_INDEX_VERSION = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """Pool de génération des vignettes, commun à tous les ThumbnailStore du processus"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=Config.THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+        return _executor
+
+
+class ThumbnailStore:
+    """
+    Index nom de facture -> fichier image et vignettes de taille fixe.
+
+    L'index remplace la recherche de l'image par essai d'extensions ; il n'est
+    reconstruit que lorsque le dossier des factures change. Les vignettes sont
+    générées une fois, en arrière-plan (pool partagé par tous les stores), et
+    régénérées si la source change.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, receipts_dir: str = Config.UPLOAD_FOLDERS["receipts"],
+                 thumbnails_dir: str = Config.THUMBNAIL_DIR,
+                 size=Config.THUMBNAIL_SIZE, image_format: str = Config.THUMBNAIL_FORMAT,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.receipts_dir = Path(receipts_dir)
+        self.thumbnails_dir = Path(thumbnails_dir)
+        self.thumbnails_dir.mkdir(parents=True, exist_ok=True)
+        self.size = tuple(size)
+        self.image_format = image_format
+        self.extension = ".webp" if image_format.upper() == "WEBP" else ".jpg"
+        self._executor = executor or shared_executor()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        # Nom sans extension -> nom de fichier (noms de factures enregistrés sans extension)
+        self._stems: Dict[str, str] = {}
+        self._index_mtime = None
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def _index_path(self) -> Path:
+        return self.thumbnails_dir / self.INDEX_FILE
+
+    def index(self) -> Dict[str, str]:
+        """Index {nom de fichier: nom de fichier}, reconstruit si le dossier a changé"""
+        try:
+            mtime = self.receipts_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        with self._lock:
+            if self._index_mtime == mtime:
+                return self._index
+
+            # Index persisté par une exécution précédente
+            try:
+                with open(self._index_path(), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == _INDEX_VERSION and data.get("mtime") == mtime:
+                    self._set_index(data["files"], mtime)
+                    return self._index
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+
+            files = {}
+            with os.scandir(self.receipts_dir) as entries:
+                for entry in entries:
+                    path = Path(entry.name)
+                    if entry.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                        files[entry.name] = entry.name
+
+            tmp_path = self._index_path().with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": _INDEX_VERSION, "mtime": mtime, "files": files}, f)
+            os.replace(tmp_path, self._index_path())
+            self._set_index(files, mtime)
+            return self._index
+
+    def _set_index(self, files: Dict[str, str], mtime: int):
+        self._index, self._index_mtime = files, mtime
+        self._stems = {}
+        for name in sorted(files):
+            self._stems.setdefault(Path(name).stem, name)
+
+    def image_path(self, receipt_filename: str) -> Optional[Path]:
+        """Image pleine résolution d'une facture (ou None) ; un nom sans extension désigne la première image de ce nom"""
+        receipt_filename = Path(receipt_filename).name
+        name = self.index().get(receipt_filename)
+        if name is None and not Path(receipt_filename).suffix:
+            name = self._stems.get(receipt_filename)
+        return self.receipts_dir / name if name else None
+
+    def _thumbnail_file(self, receipt_filename: str) -> Path:
+        # Nom complet : a.jpg et a.png ont chacune leur vignette
+        return self.thumbnails_dir / f"{Path(receipt_filename).name}{self.extension}"
+
+    def _is_fresh(self, source: Path, thumbnail: Path) -> bool:
+        try:
+            return thumbnail.stat().st_mtime_ns >= source.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def generate(self, receipt_filename: str) -> Optional[Path]:
+        """Crée (ou recrée si la source a changé) la vignette d'une facture"""
+        source = self.image_path(receipt_filename)
+        if source is None or not self.available():
+            return None
+        thumbnail = self._thumbnail_file(source.name)
+        if self._is_fresh(source, thumbnail):
+            return thumbnail
+
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(self.size)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            tmp_path = thumbnail.with_suffix(f".{threading.get_ident()}.tmp")
+            image.save(tmp_path, format=self.image_format, quality=Config.THUMBNAIL_QUALITY)
+            os.replace(tmp_path, thumbnail)
+        return thumbnail
+
+    def thumbnail_path(self, receipt_filename: str) -> Optional[Path]:
+        """Vignette d'une facture, générée à la demande si elle manque encore"""
+        source = self.image_path(receipt_filename)
+        if source is None:
+            return None
+        thumbnail = self._thumbnail_file(source.name)
+        if self._is_fresh(source, thumbnail):
+            return thumbnail
+        return self.generate(receipt_filename)
+
+    def schedule_missing(self) -> int:
+        """Programme en arrière-plan les vignettes manquantes ou périmées"""
+        if not self.available():
+            return 0
+        scheduled = 0
+        for name in self.index():
+            if self._is_fresh(self.receipts_dir / name, self._thumbnail_file(name)):
+                continue
+            with self._lock:
+                if name in self._pending:
+                    continue
+                self._pending.add(name)
+            self._executor.submit(self._generate_pending, name)
+            scheduled += 1
+        return scheduled
+
+    def _generate_pending(self, name: str):
+        try:
+            self.generate(name)
+        except OSError:
+            # Image illisible : l'onglet Résultats affichera l'original
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(name)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from logic.file_lock import FileLock
+from utils import Utils
+
+
+class UploadStore:
+    """
+    Dossier de fichiers téléchargés, adressé par le contenu.
+
+    Un manifeste (nom -> SHA-256, taille, date, traité ou non) évite de
+    réécrire un fichier dont le contenu est déjà sur disque et indique aux
+    étapes suivantes quels fichiers sont nouveaux. Il est rangé hors du
+    dossier pour ne pas être lu comme un fichier téléchargé, et relu sous
+    verrou de fichier avant chaque écriture (sessions partageant un projet).
+    """
+
+    MANIFEST_DIR = ".manifests"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest_dir = self.directory.parent / self.MANIFEST_DIR
+        manifest_dir.mkdir(exist_ok=True)
+        self.manifest_path = manifest_dir / f"{self.directory.name}.json"
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Dict] = self._load_manifest()
+        # Entrées pas encore écrites dans le manifeste (save_stream(save_manifest=False))
+        self._pending: Dict[str, Dict] = {}
+        # Contenus présents (SHA-256), recalculés après chaque relecture du manifeste
+        self._digests: Optional[set] = None
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        # Oublier les fichiers supprimés depuis
+        return {name: entry for name, entry in manifest.items() if (self.directory / name).exists()}
+
+    @contextmanager
+    def _updating(self) -> Iterator[Dict[str, Dict]]:
+        """
+        Modification du manifeste : relu sur disque sous verrou (entrées des
+        autres sessions), complété des entrées en attente, puis réécrit.
+        """
+        with self._lock, FileLock(str(self.manifest_path) + ".lock"):
+            manifest = self._load_manifest()
+            manifest.update(self._pending)
+            self._pending = {}
+            self.manifest = manifest
+            self._digests = None
+            yield manifest
+            Utils.atomic_write(str(self.manifest_path), json.dumps(manifest, ensure_ascii=False, indent=1))
+
+    @staticmethod
+    def hash_bytes(data) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def contains(self, name: str, digest: str) -> bool:
+        """Vrai si le fichier `name` est déjà sur disque avec ce contenu"""
+        entry = self.manifest.get(Utils.sanitize_filename(name))
+        return bool(entry) and entry["sha256"] == digest
+
+    def _stored(self, digest: str) -> bool:
+        """Vrai si ce contenu est déjà sur disque, sous n'importe quel nom"""
+        if self._digests is None:
+            self._digests = {entry["sha256"] for entry in self.manifest.values()}
+        return digest in self._digests
+
+    def _free_name(self, name: str) -> str:
+        """`name`, ou `nom_2.ext`, `nom_3.ext`... s'il désigne déjà un autre fichier"""
+        stem, suffix, counter = Path(name).stem, Path(name).suffix, 1
+        while name in self.manifest or (self.directory / name).exists():
+            counter += 1
+            name = f"{stem}_{counter}{suffix}"
+        return name
+
+    def save(self, name: str, data, digest: Optional[str] = None) -> bool:
+        """
+        Enregistre un fichier si son contenu n'est pas déjà sur disque.
+
+        Renvoie True si le fichier a été écrit.
+        """
+        name = Utils.sanitize_filename(name)
+        digest = digest or self.hash_bytes(data)
+        with self._updating() as manifest:
+            if self.contains(name, digest):
+                return False
+
+            path = self.directory / name
+            tmp_path = self.manifest_path.parent / f"{self.directory.name}.{name}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            manifest[name] = {
+                "sha256": digest,
+                "size": len(data),
+                "saved_at": time.time(),
+                "processed": False,
+            }
+        return True
+
+    def save_stream(self, name: str, stream: BinaryIO, max_bytes: Optional[int] = None,
+                    chunk_size: int = 1024 * 1024, save_manifest: bool = True,
+                    keep_existing: bool = False) -> Optional[str]:
+        """
+        Enregistre un fichier lu par blocs depuis `stream` (hash calculé au fil
+        de l'écriture), sauf si son contenu est déjà sur disque.
+
+        Avec `keep_existing=True` (imports en masse), un contenu déjà présent
+        sous un autre nom n'est pas recopié, et un fichier existant de contenu
+        différent n'est jamais écrasé : le nouveau est renommé (`nom_2.ext`).
+        Avec `save_manifest=False`, le manifeste n'est écrit qu'au prochain
+        `flush()` (imports de milliers de fichiers).
+        Renvoie le nom du fichier écrit (None s'il était déjà présent) ;
+        ValueError au-delà de `max_bytes`.
+        """
+        name = Utils.sanitize_filename(name)
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.manifest_path.parent / f"{self.directory.name}.{name}.{threading.get_ident()}.stream.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for block in iter(lambda: stream.read(chunk_size), b""):
+                    size += len(block)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"{name} dépasse la taille maximale ({max_bytes} octets)")
+                    digest.update(block)
+                    f.write(block)
+
+            with self._lock:
+                if self.contains(name, digest.hexdigest()):
+                    return None
+                if keep_existing:
+                    if self._stored(digest.hexdigest()):
+                        return None
+                    name = self._free_name(name)
+                os.replace(tmp_path, self.directory / name)
+                self.manifest[name] = self._pending[name] = {
+                    "sha256": digest.hexdigest(),
+                    "size": size,
+                    "saved_at": time.time(),
+                    "processed": False,
+                }
+                if self._digests is not None:
+                    self._digests.add(digest.hexdigest())
+            if save_manifest:
+                self.flush()
+            return name
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def flush(self):
+        """Écrit le manifeste sur disque (avec les entrées en attente)"""
+        with self._updating():
+            pass
+
+    def new_files(self) -> List[str]:
+        """Fichiers enregistrés qui n'ont pas encore été traités"""
+        return sorted(name for name, entry in self.manifest.items() if not entry.get("processed"))
+
+    def mark_processed(self, names: Iterable[str]):
+        """
+        Marque comme traités les fichiers donnés (ceux effectivement analysés :
+        un fichier arrivé pendant l'analyse reste nouveau)
+        """
+        with self._updating() as manifest:
+            for name in names:
+                if name in manifest:
+                    manifest[name]["processed"] = True
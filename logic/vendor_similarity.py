@@ -0,0 +1,149 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+
+_NOISE_TOKENS = frozenset(Config.VENDOR_NOISE_TOKENS)
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9 ]+")
+# Dates (12/03, 12/03/24, 12.03.2024) et numéros de carte (X1234, *1234)
+_DATE_RE = re.compile(r"\b\d{1,2}[/.\-]\d{1,2}(?:[/.\-]\d{2,4})?\b")
+_CARD_RE = re.compile(r"[X*]\d{4}\b")
+_DIGITS_RE = re.compile(r"\b\d+\b")
+
+
+@lru_cache(maxsize=Config.VENDOR_CACHE_SIZE)
+def normalize_vendor(text: str) -> str:
+    """Normalise un nom de vendeur ou un libellé bancaire (calculé une seule fois par chaîne)"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii").upper()
+    text = _DATE_RE.sub(" ", text)
+    text = _CARD_RE.sub(" ", text)
+    text = _NON_ALNUM_RE.sub(" ", text)
+    text = _DIGITS_RE.sub(" ", text)
+    return " ".join(token for token in text.split() if token not in _NOISE_TOKENS)
+
+
+@lru_cache(maxsize=Config.VENDOR_CACHE_SIZE)
+def vendor_tokens(text: str) -> Tuple[str, ...]:
+    """Mots du nom de vendeur normalisé"""
+    return tuple(normalize_vendor(text).split())
+
+
+@lru_cache(maxsize=Config.VENDOR_CACHE_SIZE)
+def vendor_ngrams(text: str, n: int = Config.VENDOR_NGRAM_SIZE) -> FrozenSet[str]:
+    """N-grammes de caractères du nom normalisé (chaque mot est encadré d'espaces)"""
+    grams = set()
+    for token in vendor_tokens(text):
+        padded = f" {token} "
+        for i in range(max(1, len(padded) - n + 1)):
+            grams.add(padded[i:i + n])
+    return frozenset(grams)
+
+
+def vendor_similarity(a: str, b: str) -> float:
+    """Similarité (0-100) entre deux noms, même mesure que VendorIndex"""
+    grams_a, grams_b = vendor_ngrams(a), vendor_ngrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    common = len(grams_a & grams_b)
+    return float(_combine(np.array([common]), len(grams_a), np.array([len(grams_b)]))[0])
+
+
+def _combine(common: np.ndarray, query_size: int, sizes: np.ndarray) -> np.ndarray:
+    """
+    Score = max(Dice, recouvrement). Le recouvrement (part du plus court nom
+    contenue dans l'autre) n'est retenu que pour des noms assez longs, comme
+    « CARREFOUR » contenu dans « CARREFOUR MARKET PARIS ».
+    """
+    sizes = np.maximum(sizes, 1)
+    dice = 200.0 * common / (query_size + sizes)
+    shortest = np.minimum(sizes, query_size)
+    overlap = np.where(
+        shortest >= Config.VENDOR_MIN_NGRAMS_FOR_OVERLAP,
+        100.0 * common / np.maximum(shortest, 1),
+        0.0,
+    )
+    return np.maximum(dice, overlap)
+
+
+class VendorIndex:
+    """
+    Index inversé de n-grammes sur les vendeurs bancaires distincts.
+
+    Chaque libellé distinct est normalisé et découpé une seule fois ; le score
+    d'un nom de facture contre tous les vendeurs est calculé en un seul
+    passage NumPy (comptage des n-grammes communs via les listes inversées).
+    """
+
+    def __init__(self, bank_vendors: Sequence[str]):
+        self.vendors: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for vendor in bank_vendors:
+            vendor = vendor or ""
+            if vendor not in self._ids:
+                self._ids[vendor] = len(self.vendors)
+                self.vendors.append(vendor)
+
+        postings: Dict[str, List[int]] = {}
+        sizes = np.zeros(len(self.vendors), dtype=np.int64)
+        for vendor_id, vendor in enumerate(self.vendors):
+            grams = vendor_ngrams(vendor)
+            sizes[vendor_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(vendor_id)
+
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+        self._sizes = sizes
+        self._score_cache: Dict[str, np.ndarray] = {}
+
+    def vendor_id(self, vendor: str) -> int:
+        return self._ids[vendor or ""]
+
+    def scores(self, query: str) -> np.ndarray:
+        """Similarité (0-100) du nom `query` avec chaque vendeur distinct de l'index"""
+        query = query or ""
+        cached = self._score_cache.get(query)
+        if cached is not None:
+            return cached
+
+        grams = vendor_ngrams(query)
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not grams or not lists:
+            result = np.zeros(len(self.vendors))
+        else:
+            common = np.bincount(np.concatenate(lists), minlength=len(self.vendors))
+            result = _combine(common, len(grams), self._sizes)
+            result[self._sizes == 0] = 0.0
+
+        if len(self._score_cache) >= Config.VENDOR_SCORE_CACHE_SIZE:
+            self._score_cache.pop(next(iter(self._score_cache)))
+        self._score_cache[query] = result
+        return result
+
+    def score_pairs(self, receipt_vendors: Sequence[str], bank_vendors: Sequence[str]) -> np.ndarray:
+        """
+        Scores d'une liste de paires (vendeur facture, vendeur banque).
+
+        Les paires sont regroupées par vendeur de facture : un seul calcul
+        vectoriel par nom distinct, puis lecture des scores des paires.
+        """
+        result = np.zeros(len(receipt_vendors))
+        groups: Dict[str, List[int]] = {}
+        for position, receipt_vendor in enumerate(receipt_vendors):
+            groups.setdefault(receipt_vendor or "", []).append(position)
+
+        for receipt_vendor, positions in groups.items():
+            scores = self.scores(receipt_vendor)
+            bank_ids = [self._ids[bank_vendors[p] or ""] for p in positions]
+            result[positions] = scores[bank_ids]
+        return result
+
+    def similar(self, query: str, threshold: float) -> np.ndarray:
+        """Identifiants des vendeurs dont la similarité atteint `threshold`"""
+        return np.flatnonzero(self.scores(query) >= threshold)
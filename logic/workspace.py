@@ -0,0 +1,136 @@
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from config import Config
+from logic.file_lock import FileLock
+
+
+class Workspace:
+    """
+    Arborescence de travail d'un client ou d'un projet : fichiers téléchargés
+    et sorties de chaque étape, sous une même racine. Workspace(".") correspond
+    à l'arborescence historique de l'application.
+    """
+
+    SESSIONS = "sessions"
+    PROJECTS = "projects"
+    LAST_USED_FILE = ".last_used"
+    LOCKS_DIR = ".locks"
+
+    def __init__(self, root: str = "."):
+        self.root = Path(root)
+        self.receipts_dir = self.root / Config.UPLOAD_FOLDERS["receipts"]
+        self.bank_statements_dir = self.root / Config.UPLOAD_FOLDERS["bank_statements"]
+        self.prompts_dir = self.root / Config.UPLOAD_FOLDERS["prompts"]
+        self.prompt_path = self.prompts_dir / "prompt.txt"
+        self.receipts_output_dir = self.root / Config.UPLOAD_FOLDERS["output_receipts"]
+        self.receipts_json = self.receipts_output_dir / "all_receipts.json"
+        self.matching_dir = self.root / Config.UPLOAD_FOLDERS["output_matching"]
+        self.receipt_store_path = self.root / Config.RECEIPT_STORE_PATH
+        self.preprocessed_dir = self.root / Config.PREPROCESSED_DIR
+        self.preprocess_report = self.root / Config.PREPROCESS_REPORT
+        self.duplicate_index_path = self.root / Config.DUPLICATE_INDEX_PATH
+        self.telemetry_dir = self.root / Config.TELEMETRY_DIR
+        self.thumbnails_dir = self.root / Config.THUMBNAIL_DIR
+        self.logs_dir = self.root / Config.LOG_SPILL_DIR
+
+    def __repr__(self) -> str:
+        return f"Workspace({str(self.root)!r})"
+
+    @classmethod
+    def for_session(cls, session_id: str, base_dir: str = Config.WORKSPACES_DIR) -> "Workspace":
+        """Workspace privé d'une session (supprimé après inactivité)"""
+        return cls(Path(base_dir) / cls.SESSIONS / re.sub(r"[^\w\-]", "_", session_id))
+
+    @classmethod
+    def for_project(cls, project: str, base_dir: str = Config.WORKSPACES_DIR) -> "Workspace":
+        """Workspace partagé d'un projet nommé (conservé)"""
+        return cls(Path(base_dir) / cls.PROJECTS / re.sub(r"[^\w\-]", "_", project.strip()))
+
+    @property
+    def name(self) -> str:
+        return self.root.resolve().name
+
+    def directories(self) -> List[Path]:
+        return [self.receipts_dir, self.bank_statements_dir, self.prompts_dir, self.receipts_output_dir, self.matching_dir]
+
+    def ensure(self) -> "Workspace":
+        """Crée les dossiers du workspace s'ils n'existent pas"""
+        for directory in self.directories():
+            directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def touch(self):
+        """Marque le workspace comme utilisé (repousse son nettoyage)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / self.LAST_USED_FILE).touch()
+
+    def last_used(self) -> Optional[float]:
+        try:
+            return (self.root / self.LAST_USED_FILE).stat().st_mtime
+        except FileNotFoundError:
+            try:
+                return self.root.stat().st_mtime
+            except FileNotFoundError:
+                return None
+
+    def lock(self, name: str, shared: bool = False, timeout: Optional[float] = Config.FILE_LOCK_TIMEOUT) -> FileLock:
+        """
+        Verrou nommé du workspace. Les traitements tiennent le verrou
+        « workspace » en mode partagé ; le nettoyage le prend en exclusif.
+        """
+        return FileLock(str(self.root / self.LOCKS_DIR / f"{name}.lock"), shared=shared, timeout=timeout)
+
+
+class WorkspaceCleaner:
+    """Supprime en arrière-plan les workspaces de session inactifs"""
+
+    def __init__(self, base_dir: str = Config.WORKSPACES_DIR,
+                 max_age_seconds: float = Config.WORKSPACE_MAX_AGE_HOURS * 3600,
+                 interval: float = Config.WORKSPACE_CLEANUP_INTERVAL):
+        self.sessions_dir = Path(base_dir) / Workspace.SESSIONS
+        self.max_age_seconds = max_age_seconds
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def cleanup(self) -> List[str]:
+        """Supprime les workspaces inactifs depuis plus de `max_age_seconds` ; renvoie leurs noms"""
+        if not self.sessions_dir.exists():
+            return []
+        removed = []
+        now = time.time()
+        for root in self.sessions_dir.iterdir():
+            workspace = Workspace(str(root))
+            last_used = workspace.last_used()
+            if not root.is_dir() or last_used is None or now - last_used < self.max_age_seconds:
+                continue
+            try:
+                # Un traitement en cours tient le verrou partagé : ne pas y toucher
+                with workspace.lock("workspace", timeout=0):
+                    shutil.rmtree(root, ignore_errors=True)
+                removed.append(root.name)
+            except TimeoutError:
+                continue
+        return removed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.cleanup()
+            except OSError:
+                pass
+
+    def start(self) -> "WorkspaceCleaner":
+        if self._thread is None:
+            self.cleanup()
+            self._thread = threading.Thread(target=self._loop, name="workspace-cleaner", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -1,12 +1,31 @@
 import os
 from pathlib import Path
 import re
-from typing import List, Dict, Tuple, Optional, Any
+import threading
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional, Any
 from datetime import datetime, timedelta
 
+# pandas n'est importé qu'à l'usage des versions colonne (démarrage de l'application)
+if TYPE_CHECKING:
+    import pandas as pd
+
 from config import Config
 
 
+# Motifs de montants, par ordre de priorité (avec ou sans devise)
+AMOUNT_PATTERNS = [
+    re.compile(r'(\d+[,.]\d{2})\s*€'),  # Format: 123,45 € ou 123.45 €
+    re.compile(r'€\s*(\d+[,.]\d{2})'),  # Format: € 123,45 ou € 123.45
+    re.compile(r'(\d+[,.]\d{2})\s*EUR'),  # Format: 123,45 EUR
+    re.compile(r'(\d+[,.]\d{2})'),  # Format simple: 123,45 ou 123.45
+]
+
+# Motifs d'extraction de date à partir de texte plus complexe
+DATE_PATTERNS = [
+    re.compile(r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{2,4})'),  # Format: DD/MM/YYYY ou variations
+    re.compile(r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})'),  # Format: YYYY/MM/DD ou variations
+]
+
 
 class Utils:
     """Classe utilitaire avec des méthodes statiques"""
@@ -17,6 +36,30 @@ class Utils:
         for folder in Config.UPLOAD_FOLDERS.values():
             Path(folder).mkdir(parents=True, exist_ok=True)
     
+    @staticmethod
+    def load_api_key(env_path: str = ".env") -> str:
+        """Clé API Mistral lue dans le fichier .env (chaîne vide si absente ou non renseignée)"""
+        with open(env_path, "r") as f:
+            for line in f:
+                if line.startswith("MISTRAL_API_KEY="):
+                    api_key = line.split("=")[1].strip()
+                    return "" if api_key == "votre_clé_api_ici" else api_key
+        return ""
+    
+    @staticmethod
+    def atomic_write(path: str, data) -> None:
+        """Écrit un fichier (texte ou octets) via un fichier temporaire renommé : jamais de fichier à moitié écrit"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        if isinstance(data, str):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+        else:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    
     @staticmethod
     def sanitize_filename(filename: str) -> str:
         """Nettoie un nom de fichier pour éviter les problèmes"""
@@ -29,15 +72,8 @@ class Utils:
             return None
         
         # Cherche des motifs qui ressemblent à des montants (avec ou sans devise)
-        amount_patterns = [
-            r'(\d+[,.]\d{2})\s*€',  # Format: 123,45 € ou 123.45 €
-            r'€\s*(\d+[,.]\d{2})',  # Format: € 123,45 ou € 123.45
-            r'(\d+[,.]\d{2})\s*EUR',  # Format: 123,45 EUR
-            r'(\d+[,.]\d{2})',  # Format simple: 123,45 ou 123.45
-        ]
-        
-        for pattern in amount_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in AMOUNT_PATTERNS:
+            matches = pattern.findall(text)
             if matches:
                 # Prendre le premier montant trouvé
                 amount_str = matches[0]
@@ -63,13 +99,8 @@ class Utils:
                 continue
                 
         # Essai d'extraction de date à partir de texte plus complexe
-        date_patterns = [
-            r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{2,4})', # Format: DD/MM/YYYY ou variations
-            r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})'   # Format: YYYY/MM/DD ou variations
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, date_string)
+        for pattern in DATE_PATTERNS:
+            match = pattern.search(date_string)
             if match:
                 groups = match.groups()
                 if len(groups) == 3:
@@ -83,4 +114,61 @@ class Utils:
                     except ValueError:
                         continue
         
-        return None
\ No newline at end of file
+        return None
+
+    @staticmethod
+    def extract_amount_series(texts: "pd.Series") -> "pd.Series":
+        """
+        Version colonne de extract_amount_from_string : chaque valeur distincte
+        est analysée une seule fois avec les motifs précompilés.
+        """
+        import pandas as pd
+        
+        codes, uniques = pd.factorize(texts.astype(object))
+        parsed = [Utils.extract_amount_from_string(value) for value in uniques]
+        amounts = pd.Series(parsed, dtype="float64").to_numpy()
+        result = pd.Series(float("nan"), index=texts.index, dtype="float64")
+        found = codes >= 0
+        result[found] = amounts[codes[found]]
+        return result
+    
+    @staticmethod
+    def parse_date_series(date_strings: "pd.Series", formats: Optional[List[str]] = None, sample_size: int = 1000) -> "pd.Series":
+        """
+        Version colonne de parse_date.
+        
+        Les valeurs distinctes sont analysées une seule fois. Les formats de
+        Config.DATE_FORMATS qui reconnaissent au moins une valeur d'un échantillon
+        sont appliqués en un passage vectorisé chacun, dans l'ordre de la
+        configuration ; seules les valeurs restantes passent par parse_date.
+        """
+        import pandas as pd
+        
+        codes, uniques = pd.factorize(date_strings.astype("string").str.strip())
+        texts = pd.Series(uniques, dtype="string")
+        dates = pd.Series(pd.NaT, index=texts.index, dtype="datetime64[ns]")
+        remaining = texts != ""
+        
+        if formats is None:
+            sample = texts[remaining].head(sample_size)
+            formats = [
+                date_format for date_format in Config.DATE_FORMATS
+                if pd.to_datetime(sample, format=date_format, errors="coerce").notna().any()
+            ]
+        
+        for date_format in formats:
+            if not remaining.any():
+                break
+            parsed = pd.to_datetime(texts[remaining], format=date_format, errors="coerce").dropna()
+            dates[parsed.index] = parsed
+            remaining[parsed.index] = False
+        
+        # Chemin lent pour les valeurs restantes
+        leftovers = texts[remaining]
+        if not leftovers.empty:
+            dates[leftovers.index] = pd.to_datetime(leftovers.map(Utils.parse_date), errors="coerce")
+        
+        result = pd.Series(pd.NaT, index=date_strings.index, dtype="datetime64[ns]")
+        found = codes >= 0
+        result[found] = dates.to_numpy()[codes[found]]
+        return result